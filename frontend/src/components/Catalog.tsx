@@ -33,6 +33,12 @@ interface CatalogItem {
   name: string;
   image: string;
   type: string;
+  // Files written at upload time; the grid shows the thumbnail and the item view the WebP
+  derivatives?: {
+    thumbnail?: string;
+    webp?: string;
+    mask?: string;
+  };
 }
 
 interface CatalogData {
@@ -40,6 +46,22 @@ interface CatalogData {
   pants: CatalogItem[];
 }
 
+// Uploads are processed on a server queue: poll the job status until it finishes
+const UPLOAD_POLL_INTERVAL_MS = 1000;
+const UPLOAD_POLL_ATTEMPTS = 120;
+
+const waitForUpload = async (statusUrl: string) => {
+  for (let attempt = 0; attempt < UPLOAD_POLL_ATTEMPTS; attempt++) {
+    const response = await fetch(statusUrl);
+    const body = await response.json();
+    if (body.status === 'done' || body.status === 'failed') {
+      return body;
+    }
+    await new Promise((resolve) => setTimeout(resolve, UPLOAD_POLL_INTERVAL_MS));
+  }
+  throw new Error("The item is taking too long to process. Please refresh the catalog later.");
+};
+
 const Catalog = () => {
   const [catalogData, setCatalogData] = useState<CatalogData | null>(null);
   const [isLoading, setIsLoading] = useState(true);
@@ -49,6 +71,7 @@ const Catalog = () => {
   const [uploadFile, setUploadFile] = useState<File | null>(null);
   const [uploadPreview, setUploadPreview] = useState<string | null>(null);
   const [isDialogOpen, setIsDialogOpen] = useState(false);
+  const [viewItem, setViewItem] = useState<CatalogItem | null>(null);
   const { toast } = useToast();
 
   useEffect(() => {
@@ -119,20 +142,27 @@ const Catalog = () => {
       const result = await response.json();
       
       if (result.success) {
+        // The item only exists once the queued job is done
+        const status = await waitForUpload(result.status_url);
+        if (status.status === 'failed') {
+          throw new Error(status.error || "Failed to process the item");
+        }
+
         // Add new item to local catalog data
-        if (catalogData) {
-          const updatedCatalog = { ...catalogData };
+        const item: CatalogItem = status.item;
+        setCatalogData((current) => {
+          if (!current) return current;
           if (uploadType === 'shirt') {
-            updatedCatalog.shirts.push(result.item);
+            return { ...current, shirts: [...current.shirts, item] };
           } else if (uploadType === 'pant') {
-            updatedCatalog.pants.push(result.item);
+            return { ...current, pants: [...current.pants, item] };
           }
-          setCatalogData(updatedCatalog);
-        }
+          return current;
+        });
         
         toast({
           title: "Upload successful",
-          description: result.message,
+          description: status.message,
         });
         
         // Reset form
@@ -159,7 +189,11 @@ const Catalog = () => {
     return (
       <div className="grid grid-cols-2 md:grid-cols-3 lg:grid-cols-4 gap-4">
         {items.map((item) => (
-          <Card key={item.id} className="relative overflow-hidden group border shadow-sm hover:shadow-md transition-all">
+          <Card
+            key={item.id}
+            className="relative overflow-hidden group border shadow-sm hover:shadow-md transition-all cursor-pointer"
+            onClick={() => setViewItem(item)}
+          >
             <div className="absolute inset-0 bg-gradient-to-t from-black/70 to-black/0 opacity-0 group-hover:opacity-100 transition-opacity flex items-end justify-center pb-4 z-10">
               <Button variant="secondary" className="mx-1">
                 Try On
@@ -167,11 +201,16 @@ const Catalog = () => {
             </div>
             <div className="aspect-square bg-gray-100 relative">
               <img 
-                src={item.image} 
+                src={item.derivatives?.thumbnail ?? item.image} 
                 alt={item.name}
                 className="w-full h-full object-contain p-2"
                 onError={(e) => {
-                  console.error(`Failed to load image: ${item.image}`);
+                  console.error(`Failed to load image: ${e.currentTarget.src}`);
+                  // A missing thumbnail falls back to the full image first
+                  if (item.derivatives?.thumbnail && !e.currentTarget.src.endsWith(item.image)) {
+                    e.currentTarget.src = item.image;
+                    return;
+                  }
                   // Fallback to a placeholder image
                   e.currentTarget.src = "/placeholder-image.png";
                   // Try with absolute URL if relative URL fails
@@ -363,6 +402,29 @@ const Catalog = () => {
             )}
           </TabsContent>
         </Tabs>
+
+        <Dialog open={viewItem !== null} onOpenChange={(open) => !open && setViewItem(null)}>
+          <DialogContent className="max-w-2xl">
+            <DialogHeader>
+              <DialogTitle>{viewItem?.name}</DialogTitle>
+            </DialogHeader>
+            {viewItem && (
+              <div className="w-full max-h-[70vh] bg-gray-100 flex items-center justify-center rounded-md overflow-hidden">
+                <img
+                  src={viewItem.derivatives?.webp ?? viewItem.image}
+                  alt={viewItem.name}
+                  className="max-w-full max-h-[70vh] object-contain"
+                  onError={(e) => {
+                    // A missing WebP falls back to the original image
+                    if (viewItem.derivatives?.webp && !e.currentTarget.src.endsWith(viewItem.image)) {
+                      e.currentTarget.src = viewItem.image;
+                    }
+                  }}
+                />
+              </div>
+            )}
+          </DialogContent>
+        </Dialog>
       </div>
     </section>
   );
@@ -2,6 +2,8 @@ import functools
 import logging
 import math
 import re
+import threading
+import time
 import urllib.error
 from pathlib import Path
 from urllib.request import urlopen
@@ -104,6 +106,36 @@ TONE_ALIAS = {
     "bw": ["black-white"],
 }
 
+FACE_CASCADE_PATH = str(Path(cv2.data.haarcascades, "haarcascade_frontalface_default.xml").resolve())
+
+# One CascadeClassifier per thread; `FACE_CASCADE_STATS` counts how often the XML is actually parsed.
+_face_cascades = threading.local()
+_face_cascade_lock = threading.Lock()
+FACE_CASCADE_STATS = {"loads": 0, "load_seconds": 0.0}
+
+
+def face_cascade(path=FACE_CASCADE_PATH):
+    """
+    Get the Haar cascade of the current thread, loading it on first use.
+    :param path: Absolute path of the cascade XML file.
+    :return:
+    """
+    cascades = getattr(_face_cascades, "cascades", None)
+    if cascades is None:
+        cascades = _face_cascades.cascades = {}
+    cascade = cascades.get(path)
+    if cascade is None:
+        started = time.perf_counter()
+        cascade = cv2.CascadeClassifier(path)
+        if cascade.empty():
+            raise IOError(f"Could not load face cascade from {path}")
+        with _face_cascade_lock:
+            FACE_CASCADE_STATS["loads"] += 1
+            FACE_CASCADE_STATS["load_seconds"] += time.perf_counter() - started
+        cascades[path] = cascade
+    return cascade
+
+
 def build_full_palette():
     return {alias: palette for name, palette in DEFAULT_TONE_PALETTE.items() for alias in [name] + TONE_ALIAS.get(name, [])}
 
@@ -225,7 +257,7 @@ def detect_faces(
     gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
     gray = cv2.equalizeHist(gray)
 
-    cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
+    cascade = face_cascade()
 
     flags = (cv2.CASCADE_SCALE_IMAGE | cv2.CASCADE_FIND_BIGGEST_OBJECT) if biggest_only else cv2.CASCADE_SCALE_IMAGE
     faces = cascade.detectMultiScale(
@@ -0,0 +1,66 @@
+"""
+Benchmark of the background blur applied around the face
+
+Compares the four GaussianBlur calls predict() used to run (top, bottom,
+midleft, midright) with tryon.effects.blur_background, for today's 5x5
+kernel and for a stronger blur that goes through the downscaled path.
+
+    python -m benchmarks.blur --repeat 100
+"""
+import argparse
+import timeit
+
+import cv2
+import numpy as np
+
+from tryon.effects import blur_background
+
+FRAME_SIZES = {'720p': (720, 1280), '1080p': (1080, 1920)}
+
+
+def legacy_blur(img, face, blurvalue=5):
+    """
+    The per-slice blur predict() ran before the fused background stage
+    """
+    x, y, w, h = face
+    resizewidth = int(img.shape[1]*3/2)
+    resizeheight = int(img.shape[0]*3/2)
+    top = cv2.GaussianBlur(img[0:y, 0:resizewidth], (blurvalue, blurvalue), 0)
+    bottom = cv2.GaussianBlur(img[y+h:resizeheight, 0:resizewidth], (blurvalue, blurvalue), 0)
+    midleft = cv2.GaussianBlur(img[y:y+h, 0:x], (blurvalue, blurvalue), 0)
+    midright = cv2.GaussianBlur(img[y:y+h, x+w:resizewidth], (blurvalue, blurvalue), 0)
+    img[0:y, 0:resizewidth] = top
+    img[y+h:resizeheight, 0:resizewidth] = bottom
+    img[y:y+h, 0:x] = midleft
+    img[y:y+h, x+w:resizewidth] = midright
+
+
+def run(size, repeat=100):
+    height, width = FRAME_SIZES[size]
+    frame = np.random.default_rng(0).integers(0, 255, (height, width, 3), dtype=np.uint8)
+    face_w = height // 5
+    face = (width // 2 - face_w // 2, height // 6, face_w, face_w)
+
+    cases = {
+        'legacy 5x5 (4 slices)': lambda: legacy_blur(frame, face),
+        'fused 5x5 (full resolution)': lambda: blur_background(frame, [face], ksize=5),
+        'legacy 21x21 (4 slices)': lambda: legacy_blur(frame, face, blurvalue=21),
+        'fused 21x21 (downscaled)': lambda: blur_background(frame, [face], ksize=21),
+    }
+    return {name: timeit.timeit(case, number=repeat) / repeat * 1000 for name, case in cases.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Background blur benchmark')
+    parser.add_argument('--size', choices=sorted(FRAME_SIZES), action='append')
+    parser.add_argument('--repeat', type=int, default=100)
+    args = parser.parse_args()
+
+    for size in args.size or ['720p', '1080p']:
+        print(f"Frame {size}, {args.repeat} iterations per case")
+        for name, ms in run(size, args.repeat).items():
+            print(f"  {name:<36} {ms:8.3f} ms/frame")
+
+
+if __name__ == '__main__':
+    main()
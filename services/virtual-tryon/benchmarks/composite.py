@@ -0,0 +1,72 @@
+"""
+Micro-benchmark of the per-garment compositing cost
+
+Compares the bitwise_and/add path predict() used to run for each garment
+with the alpha compositing in tryon.compositor.
+
+    python -m benchmarks.composite --size 720p --repeat 200
+"""
+import argparse
+import os
+import timeit
+
+import cv2
+import numpy as np
+
+from tryon.compositor import load_garment, premultiply, composite_premultiplied, place_garment
+
+SERVICE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FRAME_SIZES = {'480p': (480, 640), '720p': (720, 1280), '1080p': (1080, 1920)}
+
+
+def legacy_blend(img, garment, region):
+    """
+    The compositing predict() ran per garment before the alpha engine
+    """
+    x1, y1, x2, y2 = region
+    width, height = x2 - x1, y2 - y1
+    resized = cv2.resize(garment.image, (width, height), interpolation=cv2.INTER_AREA)
+    mask = cv2.resize(garment.mask, (width, height), interpolation=cv2.INTER_AREA)
+    mask_inv = cv2.resize(garment.mask_inv, (width, height), interpolation=cv2.INTER_AREA)
+    roi = img[y1:y2, x1:x2]
+    roi_bg = cv2.bitwise_and(roi, roi, mask=mask_inv)
+    roi_fg = cv2.bitwise_and(resized, resized, mask=mask)
+    img[y1:y2, x1:x2] = cv2.add(roi_bg, roi_fg)
+
+
+def run(size='720p', repeat=200):
+    height, width = FRAME_SIZES[size]
+    frame = np.random.default_rng(0).integers(0, 255, (height, width, 3), dtype=np.uint8)
+    garment = load_garment(os.path.join(SERVICE_ROOT, 'static', 'assets', 'shirt1.png'), 'shirt')
+
+    # Garment box for a face a fifth of the frame height wide
+    face_w = height // 5
+    region = (width // 2 - 3 * face_w // 2, height // 4, width // 2 + 3 * face_w // 2, height // 4 + 4 * face_w)
+    region = (region[0], region[1], region[2], min(region[3], height))
+    bgra = cv2.resize(garment.bgra, (region[2] - region[0], region[3] - region[1]), interpolation=cv2.INTER_AREA)
+    color, inv_alpha = premultiply(bgra)
+
+    cases = {
+        'legacy (resize x3 + bitwise_and + add)': lambda: legacy_blend(frame, garment, region),
+        'alpha (resize BGRA + blend)': lambda: place_garment(frame, garment, region),
+        'alpha, pre-scaled garment': lambda: composite_premultiplied(frame, color, inv_alpha, region[0], region[1]),
+    }
+    results = {}
+    for name, case in cases.items():
+        results[name] = timeit.timeit(case, number=repeat) / repeat * 1000
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Per-garment compositing micro-benchmark')
+    parser.add_argument('--size', choices=sorted(FRAME_SIZES), default='720p')
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"Frame {args.size}, {args.repeat} iterations per case")
+    for name, ms in run(args.size, args.repeat).items():
+        print(f"  {name:<40} {ms:8.3f} ms/garment")
+
+
+if __name__ == '__main__':
+    main()
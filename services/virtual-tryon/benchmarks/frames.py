@@ -0,0 +1,99 @@
+"""
+Synthetic frames and garments for the benchmarks
+
+Frames are a noisy gradient with the face of a bundled sample photo pasted
+in, scaled to a fifth of the frame height so the cascade finds it at every
+resolution. Garments are flat shirt and pant silhouettes on black, like
+the bundled catalog images, written to disk so loading them costs a real
+imread.
+"""
+import os
+
+import cv2
+import numpy as np
+
+SERVICE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FRAME_SIZES = {'480p': (480, 640), '720p': (720, 1280), '1080p': (1080, 1920)}
+
+# Sample photo and the face the cascade finds in it, with a margin around it
+SAMPLE_PHOTO = os.path.join(SERVICE_ROOT, 'static', 'react-app', 'assets', 'tryondemo.jpg')
+SAMPLE_FACE = (200, 137, 124, 124)
+FACE_MARGIN = 0.4
+# Face height as a fraction of the frame height
+FACE_RATIO = 1 / 5
+
+
+def sample_face():
+    """
+    Crop of the sample photo around its face, and the face box inside the crop
+    """
+    photo = cv2.imread(SAMPLE_PHOTO, cv2.IMREAD_COLOR)
+    if photo is None:
+        raise IOError(f"Could not read sample photo {SAMPLE_PHOTO}")
+    x, y, w, h = SAMPLE_FACE
+    mx, my = int(w * FACE_MARGIN), int(h * FACE_MARGIN)
+    x1, y1 = max(0, x - mx), max(0, y - my)
+    x2, y2 = min(photo.shape[1], x + w + mx), min(photo.shape[0], y + h + my)
+    return photo[y1:y2, x1:x2].copy(), (x - x1, y - y1, w, h)
+
+
+def synthetic_frame(size, seed=0):
+    """
+    A frame of the given size with one face in its upper third
+
+    Returns:
+        (frame, face box where the face was pasted)
+    """
+    height, width = FRAME_SIZES[size]
+    rng = np.random.default_rng(seed)
+    ramp = np.linspace(40, 200, width, dtype=np.float32)[None, :, None]
+    frame = np.broadcast_to(ramp, (height, width, 3)).astype(np.int16)
+    frame += rng.integers(-20, 20, (height, width, 3), dtype=np.int16)
+    frame = np.clip(frame, 0, 255).astype(np.uint8)
+
+    crop, (fx, fy, fw, fh) = sample_face()
+    scale = height * FACE_RATIO / fh
+    crop = cv2.resize(crop, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    ch, cw = crop.shape[:2]
+    x, y = (width - cw) // 2, max(0, height // 12 - int(fy * scale))
+    frame[y:y + ch, x:x + cw] = crop[:height - y, :width - x]
+    return frame, (x + int(fx * scale), y + int(fy * scale), int(fw * scale), int(fh * scale))
+
+
+def synthetic_garment(kind, size=(400, 300), color=(180, 90, 40)):
+    """
+    A flat shirt or pant silhouette on a black background
+    """
+    height, width = size
+    image = np.zeros((height, width, 3), dtype=np.uint8)
+    if kind == 'pant':
+        outline = [(0.1, 0.0), (0.9, 0.0), (0.95, 1.0), (0.55, 1.0), (0.5, 0.3), (0.45, 1.0), (0.05, 1.0)]
+    else:
+        outline = [(0.3, 0.0), (0.7, 0.0), (1.0, 0.2), (0.85, 0.35), (0.8, 1.0), (0.2, 1.0), (0.15, 0.35),
+                   (0.0, 0.2)]
+    points = np.array([(int(px * (width - 1)), int(py * (height - 1))) for px, py in outline], dtype=np.int32)
+    cv2.fillPoly(image, [points], color)
+    return image
+
+
+def write_garments(directory):
+    """
+    Write a synthetic shirt and pant into `directory`
+
+    Returns:
+        {'shirt': path, 'pant': path}
+    """
+    os.makedirs(directory, exist_ok=True)
+    paths = {}
+    for kind, color in (('shirt', (180, 90, 40)), ('pant', (60, 60, 60))):
+        paths[kind] = os.path.join(directory, f'synthetic_{kind}.png')
+        cv2.imwrite(paths[kind], synthetic_garment(kind, color=color))
+    return paths
+
+
+def bundled_garments():
+    """
+    Paths of the default catalog shirt and pant
+    """
+    assets = os.path.join(SERVICE_ROOT, 'static', 'assets')
+    return {'shirt': os.path.join(assets, 'shirt1.png'), 'pant': os.path.join(assets, 'pant7.jpg')}
@@ -0,0 +1,68 @@
+"""
+Benchmark of group try-on frames
+
+Renders a frame with one person and with four people side by side, with
+the scaled garments already cached as in a live session. Four faces share
+one background blur pass and their disjoint composites run concurrently,
+so the four-face frame costs far less than four one-face frames.
+
+    python -m benchmarks.group --repeat 100
+"""
+import argparse
+import os
+import timeit
+
+import numpy as np
+
+from tryon.assets import ScaledGarmentCache
+from tryon.compositor import load_garment, render_tryon
+
+SERVICE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FRAME_SIZES = {'720p': (720, 1280), '1080p': (1080, 1920)}
+
+
+def group_faces(height, width, count):
+    """
+    `count` faces of the same size spread across the frame, far enough apart
+    for up to four people not to overlap
+    """
+    face_w = min(height // 6, width // 16)
+    step = width // count
+    return [(step * index + (step - face_w) // 2, height // 10, face_w, face_w) for index in range(count)]
+
+
+def run(size, repeat=100):
+    height, width = FRAME_SIZES[size]
+    frame = np.random.default_rng(0).integers(0, 255, (height, width, 3), dtype=np.uint8)
+    shirt = load_garment(os.path.join(SERVICE_ROOT, 'static', 'assets', 'shirt1.png'), 'shirt')
+    pant = load_garment(os.path.join(SERVICE_ROOT, 'static', 'assets', 'pant7.jpg'), 'pant')
+    one = group_faces(height, width, 1)
+    four = group_faces(height, width, 4)
+    cache = ScaledGarmentCache()
+
+    def render(faces):
+        return lambda: render_tryon(frame.copy(), shirt, pant, faces=faces, scaled_cache=cache,
+                                    max_faces=len(faces))
+
+    cases = {'1 face': render(one), '4 faces': render(four)}
+    for case in cases.values():
+        case()  # warm the scaled garment cache
+    return {name: timeit.timeit(case, number=repeat) / repeat * 1000 for name, case in cases.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Group try-on benchmark')
+    parser.add_argument('--size', choices=sorted(FRAME_SIZES), action='append')
+    parser.add_argument('--repeat', type=int, default=100)
+    args = parser.parse_args()
+
+    for size in args.size or ['720p', '1080p']:
+        print(f"Frame {size}, {args.repeat} iterations per case")
+        results = run(size, args.repeat)
+        for name, ms in results.items():
+            print(f"  {name:<36} {ms:8.3f} ms/frame")
+        print(f"  {'4 faces / (4 x 1 face)':<36} {results['4 faces'] / (4 * results['1 face']):8.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+Benchmark of layered outfits
+
+Renders one face wearing a pant and a shirt, then the same outfit with a
+jacket and an accessory on top, with the scaled garments already cached as
+in a live session. The cached outfit is blended as one flattened layer;
+the sequential case blends every garment into the frame in turn.
+
+    python -m benchmarks.layers --repeat 100
+"""
+import argparse
+import os
+import timeit
+
+import numpy as np
+
+from tryon.assets import ScaledGarmentCache
+from tryon.compositor import (composite_premultiplied, layer_region, load_garment, prepare_garment, render_tryon,
+                              stack_layers)
+
+SERVICE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FRAME_SIZES = {'720p': (720, 1280), '1080p': (1080, 1920)}
+
+
+def outfit():
+    assets = os.path.join(SERVICE_ROOT, 'static', 'assets')
+    shirt = load_garment(os.path.join(assets, 'shirt1.png'), 'shirt')
+    pant = load_garment(os.path.join(assets, 'pant7.jpg'), 'pant')
+    jacket = load_garment(os.path.join(assets, 'shirt2.png'), 'jacket')
+    accessory = load_garment(os.path.join(assets, 'shirt6.png'), 'accessory')
+    return shirt, pant, [jacket, accessory]
+
+
+def run(size, repeat=100):
+    height, width = FRAME_SIZES[size]
+    frame = np.random.default_rng(0).integers(0, 255, (height, width, 3), dtype=np.uint8)
+    shirt, pant, extra = outfit()
+    face_w = height // 12
+    face = (width // 2 - face_w // 2, height // 10, face_w, face_w)
+    cache = ScaledGarmentCache()
+
+    def flattened(layers):
+        return lambda: render_tryon(frame.copy(), shirt, pant, faces=[face], draw_face=False, blur=False,
+                                    scaled_cache=cache, layers=layers)
+
+    def sequential(layers):
+        worn = stack_layers([(pant, 'pant'), (shirt, 'shirt')] + [(g, g.kind) for g in layers])
+
+        def render():
+            img = frame.copy()
+            for garment, kind in worn:
+                prepared = prepare_garment(garment, layer_region(face, garment, kind), cache)
+                if prepared is not None:
+                    composite_premultiplied(img, *prepared)
+            return img
+        return render
+
+    cases = {
+        '2 layers, sequential': sequential([]),
+        '2 layers, flattened': flattened([]),
+        '4 layers, sequential': sequential(extra),
+        '4 layers, flattened': flattened(extra),
+    }
+    for case in cases.values():
+        case()  # warm the scaled garment cache
+    return {name: timeit.timeit(case, number=repeat) / repeat * 1000 for name, case in cases.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Layered outfit benchmark')
+    parser.add_argument('--size', choices=sorted(FRAME_SIZES), action='append')
+    parser.add_argument('--repeat', type=int, default=100)
+    args = parser.parse_args()
+
+    for size in args.size or ['720p', '1080p']:
+        print(f"Frame {size}, {args.repeat} iterations per case")
+        for name, ms in run(size, args.repeat).items():
+            print(f"  {name:<36} {ms:8.3f} ms/frame")
+
+
+if __name__ == '__main__':
+    main()
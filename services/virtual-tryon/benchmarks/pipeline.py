@@ -0,0 +1,176 @@
+"""
+Stage-by-stage benchmark of the try-on path
+
+Runs headless on synthetic frames (see benchmarks.frames) at 480p, 720p
+and 1080p and times each stage on its own: garment load, mask, detect,
+resize, composite, blur and encode. A full frame (render_tryon with
+detection, then JPEG encoding) is timed as well; its mean gives the frames
+per second. The report is JSON, with the mean and p50/p95/p99 of every
+stage, so runs before and after a compositor change can be diffed; with
+--baseline the relative change of every p50 is added to the report.
+
+    python -m benchmarks.pipeline --frames 200 --output before.json
+    python -m benchmarks.pipeline --frames 200 --baseline before.json
+"""
+import argparse
+import json
+import os
+import platform
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from benchmarks.frames import FRAME_SIZES, bundled_garments, synthetic_frame, write_garments
+from tryon.compositor import (composite_premultiplied, load_garment, pant_region, premultiply, render_tryon,
+                              scale_garment, shirt_region)
+from tryon.detection import detect_faces
+from tryon.effects import blur_background
+from tryon.placement import build_masks, legacy_placement, read_flag
+
+STAGES = ('load', 'mask', 'detect', 'resize', 'composite', 'blur', 'encode')
+DEFAULT_FRAMES = 100
+DEFAULT_JPEG_QUALITY = 80
+
+
+def summarize(samples):
+    """
+    Mean and percentiles, in milliseconds, of a list of durations in seconds
+    """
+    ms = np.asarray(samples, dtype=np.float64) * 1000
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {'mean': round(float(ms.mean()), 3), 'p50': round(float(p50), 3),
+            'p95': round(float(p95), 3), 'p99': round(float(p99), 3)}
+
+
+def timed(samples, stage, fn, *args, **kwargs):
+    started = time.perf_counter()
+    result = fn(*args, **kwargs)
+    samples[stage].append(time.perf_counter() - started)
+    return result
+
+
+def run(size, garment_paths, frames=DEFAULT_FRAMES, jpeg_quality=DEFAULT_JPEG_QUALITY):
+    """
+    Time every stage at one frame size
+
+    Returns:
+        Report of the frame size: faces found, frames per second and the
+        timings of each stage and of the full frame
+    """
+    frame, face = synthetic_frame(size)
+    detected = detect_faces(frame)
+    if len(detected):
+        face = tuple(int(v) for v in detected[0])
+    encode_params = [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality]
+    samples = {stage: [] for stage in STAGES + ('frame',)}
+
+    for _ in range(frames):
+        garments = {}
+        for kind, path in garment_paths.items():
+            placement = legacy_placement(path, kind)
+            image = timed(samples, 'load', cv2.imread, path, read_flag(placement))
+            timed(samples, 'mask', build_masks, image, placement['mask'])
+            garments[kind] = load_garment(path, kind, placement=placement)
+
+        img = frame.copy()
+        timed(samples, 'detect', detect_faces, img)
+        timed(samples, 'blur', blur_background, img, [face])
+        for kind, region in (('pant', pant_region(face, garments['pant'])),
+                             ('shirt', shirt_region(face, garments['shirt']))):
+            x1, y1, x2, y2 = region
+            color, inv_alpha = timed(samples, 'resize', lambda: premultiply(
+                scale_garment(garments[kind], x2 - x1, y2 - y1)))
+            timed(samples, 'composite', composite_premultiplied, img, color, inv_alpha, x1, y1)
+        timed(samples, 'encode', cv2.imencode, '.jpg', img, encode_params)
+
+        img = frame.copy()
+        started = time.perf_counter()
+        render_tryon(img, garments['shirt'], garments['pant'], draw_face=False)
+        cv2.imencode('.jpg', img, encode_params)
+        samples['frame'].append(time.perf_counter() - started)
+
+    frame_ms = summarize(samples['frame'])
+    return {
+        'width': frame.shape[1],
+        'height': frame.shape[0],
+        'frames': frames,
+        'faces_detected': len(detected),
+        'fps': round(1000 / frame_ms['mean'], 2) if frame_ms['mean'] else None,
+        'frame_ms': frame_ms,
+        # Two garments per frame: load, mask, resize and composite have two samples each
+        'stages_ms': {stage: summarize(samples[stage]) for stage in STAGES},
+    }
+
+
+def compare(report, baseline):
+    """
+    Relative change of the frame rate and of each stage's p50 against an
+    earlier report, e.g. -0.25 for a stage that became 25% faster
+    """
+    changes = {}
+    for size, current in report['sizes'].items():
+        before = baseline.get('sizes', {}).get(size)
+        if before is None:
+            continue
+        stages = {stage: _change(before['stages_ms'][stage]['p50'], timing['p50'])
+                  for stage, timing in current['stages_ms'].items() if stage in before['stages_ms']}
+        changes[size] = {'fps': _change(before['fps'], current['fps']),
+                         'frame_p50': _change(before['frame_ms']['p50'], current['frame_ms']['p50']),
+                         'stages_p50': stages}
+    return changes
+
+
+def _change(before, after):
+    if not before or after is None:
+        return None
+    return round((after - before) / before, 3)
+
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'opencv': cv2.__version__,
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'opencv_threads': cv2.getNumThreads(),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Try-on pipeline benchmark')
+    parser.add_argument('--size', choices=sorted(FRAME_SIZES), action='append')
+    parser.add_argument('--frames', type=int, default=DEFAULT_FRAMES)
+    parser.add_argument('--garments', choices=('synthetic', 'bundled'), default='synthetic',
+                        help="Synthetic silhouettes or the default catalog shirt and pant")
+    parser.add_argument('--quality', type=int, default=DEFAULT_JPEG_QUALITY)
+    parser.add_argument('--output', help="Write the JSON report here instead of stdout")
+    parser.add_argument('--baseline', help="Earlier JSON report to compare against")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix='tryon-bench-') as tmp_dir:
+        garment_paths = write_garments(tmp_dir) if args.garments == 'synthetic' else bundled_garments()
+        report = {
+            'environment': environment(),
+            'garments': args.garments,
+            'jpeg_quality': args.quality,
+            'sizes': {size: run(size, garment_paths, args.frames, args.quality)
+                      for size in args.size or ['480p', '720p', '1080p']},
+        }
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            report['baseline'] = {'path': args.baseline, 'change': compare(report, json.load(f))}
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    return report
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""
+Benchmark of mesh-warped garment fitting
+
+Scales a shirt to the size it takes in the frame with a plain resize,
+with a mesh warp whose maps are already cached, and with the maps built
+from scratch. Only the first two happen on a live frame: the maps are
+built once per garment and size bucket.
+
+    python -m benchmarks.warp --repeat 200
+"""
+import argparse
+import os
+import timeit
+
+from tryon.compositor import load_garment, scale_garment
+from tryon.warp import DEFAULT_WARPS, WarpMapCache, warp_garment
+
+SERVICE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Shirt sizes for a face of 80, 120 and 180 pixels
+GARMENT_SIZES = {'small': (240, 320), 'medium': (360, 480), 'large': (540, 720)}
+
+
+def run(size, repeat=200):
+    width, height = GARMENT_SIZES[size]
+    shirt = load_garment(os.path.join(SERVICE_ROOT, 'static', 'assets', 'shirt1.png'), 'shirt')
+    fitted = load_garment(os.path.join(SERVICE_ROOT, 'static', 'assets', 'shirt1.png'), 'shirt',
+                          placement={'mask': {'source': 'gray', 'threshold': 0, 'invert': False},
+                                     'anchor': None, 'warp': DEFAULT_WARPS['shirt']})
+    cache = WarpMapCache()
+
+    def uncached():
+        cache.clear()
+        return warp_garment(fitted, width, height, cache)
+
+    cases = {
+        'resize': lambda: scale_garment(shirt, width, height),
+        'warp, cached maps': lambda: warp_garment(fitted, width, height, cache),
+        'warp, maps built': uncached,
+    }
+    for case in cases.values():
+        case()  # build the garment's halved copies
+    return {name: timeit.timeit(case, number=repeat) / repeat * 1000 for name, case in cases.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Garment warp benchmark')
+    parser.add_argument('--size', choices=sorted(GARMENT_SIZES), action='append')
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    for size in args.size or ['small', 'medium', 'large']:
+        width, height = GARMENT_SIZES[size]
+        print(f"Garment {width}x{height}, {args.repeat} iterations per case")
+        for name, ms in run(size, args.repeat).items():
+            print(f"  {name:<36} {ms:8.3f} ms/garment")
+
+
+if __name__ == '__main__':
+    main()
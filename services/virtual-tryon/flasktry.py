@@ -1,10 +1,16 @@
-from flask import Flask, render_template, request, send_from_directory, jsonify, redirect, url_for
+from flask import Flask, render_template, request, send_from_directory, jsonify, redirect, url_for, Response
+import contextlib
 import json
 from flask_cors import CORS
 import numpy as np
 import cv2                              # Biblioteca para processamento de imagens
 from math import floor
+from urllib.parse import quote
 import os
+import shutil
+import tempfile
+import threading
+import time
 import uuid
 from werkzeug.utils import secure_filename
 import base64
@@ -12,6 +18,24 @@ from datetime import datetime
 import random  # Para simular dados de blockchain e recompensas
 import requests  # Para baixar imagens fornecidas via URL
 
+from tryon import FaceTracker, ScaledGarmentCache, detect_faces, face_detectors, garment_cache, render_tryon
+from tryon.assets import DEFAULT_SIZE_BUCKET
+from tryon.batch import DEFAULT_THUMB_WIDTH, MAX_BATCH_PAIRS, contact_sheet, render_batch
+from tryon.derivatives import derivative_path, write_derivatives
+from tryon.dedup import UploadAssetRegistry, read_upload
+from tryon.detection import DEFAULT_DETECT_MAX_SIDE
+from tryon.governor import DEFAULT_TARGET_FPS, FrameGovernor
+from tryon.ingest import IngestionQueue, QueueFullError
+from tryon.kiosk import KioskPipeline
+from tryon.placement import (CATALOG_COLLECTIONS, LAYER_KINDS, build_masks, collection_kind, garment_placement,
+                             kind_collection)
+from tryon.recolor import normalize_hex_color
+from tryon.result_cache import TryOnResultCache, result_key
+from tryon.video import DEFAULT_VIDEO_WORKERS, catalog_garment, render_video
+from tryon.sessions import DEFAULT_JPEG_QUALITY, SessionLimitError, session_manager
+from tryon.tracking import DEFAULT_DETECT_INTERVAL
+from tryon.warp import resolve_warp, warp_map_cache
+
 # Importar SkinToneClassifier
 try:
     from skin_tone_classifier import SkinToneClassifier
@@ -32,13 +56,44 @@ REACT_APP_BUILD_DIR = os.path.join('static', 'react-app')
 # Caminho para uploads de usuários
 USER_UPLOADS_DIR = os.path.join('static', 'user-uploads')
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg'}
+# Guardar também o arquivo original enviado (original_*); desativado, só a imagem processada é gravada
+ARCHIVE_ORIGINAL_UPLOADS = False
+# Envios processados ao mesmo tempo e envios aceitos aguardando processamento
+UPLOAD_WORKERS = 2
+MAX_PENDING_UPLOADS = 32
+# Lado maior acima do qual a máscara de fundo é calculada em uma cópia reduzida (0 desativa)
+MASK_MAX_SIDE = 1024
+# Largura, em pixels da cópia reduzida, da faixa do contorno refinada em resolução completa
+MASK_BAND_PIXELS = 2
+# Margem em volta da peça para a folga (dilatação) e a limpeza final da máscara
+MASK_MARGIN_PIXELS = 16
+# Faixa de cores de fundo (assumindo fundo branco/claro) e núcleo das operações morfológicas
+LOWER_WHITE = np.array([0, 0, 180])
+UPPER_WHITE = np.array([180, 30, 255])
+MASK_KERNEL = np.ones((5, 5), np.uint8)
 
 # Caminho para dados do catálogo
 CATALOG_FILE = os.path.join('static', 'catalog.json')
 
+# Vídeos de prova renderizados a partir de gravações
+TRYON_VIDEOS_DIR = os.path.join('static', 'tryon-videos')
+VIDEO_EXTENSIONS = {'mp4', 'avi', 'mov', 'webm', 'mkv'}
+# Vídeos renderizados mantidos: os mais antigos que o prazo ou além do limite são apagados
+TRYON_VIDEO_TTL_SECONDS = 24 * 60 * 60
+MAX_TRYON_VIDEOS = 50
+# Vídeos renderizados ao mesmo tempo e vídeos aceitos aguardando; cada renderização usa
+# no máximo os núcleos da máquina, então o total de processos fica limitado a eles
+VIDEO_JOBS = 1
+MAX_PENDING_VIDEOS = 4
+
+# Resultados de prova já renderizados, endereçados pelo conteúdo da foto e das peças
+RESULT_CACHE_DIR = os.path.join('static', 'tryon-cache')
+
 # Criar diretório de uploads de usuários se não existir
 os.makedirs(os.path.join(app.root_path, USER_UPLOADS_DIR), exist_ok=True)
 
+result_cache = TryOnResultCache(os.path.join(app.root_path, RESULT_CACHE_DIR))
+
 # Dados simulados de blockchain e recompensas
 BLOCKCHAIN_DATA = {
     'transactions': 0,
@@ -94,7 +149,10 @@ default_catalog = {
             'image': '/static/assets/pant7.jpg', 'type': 'default'},
         {'id': '2', 'name': 'Calça Azul',
             'image': '/static/assets/pant21.png', 'type': 'default'}
-    ]
+    ],
+    'jackets': [],
+    'accessories': [],
+    'footwear': []
 }
 
 # Carregar catálogo do arquivo ou usar padrão
@@ -123,90 +181,203 @@ def save_catalog(catalog_data):
 
 # Inicializar catálogo
 catalog = load_catalog()
+# Serializa as leituras e gravações do catálogo feitas pela fila de envios e pelas rotas
+catalog_lock = threading.Lock()
+# Recursos processados dos envios por hash de conteúdo, com a contagem de itens que os usam
+upload_assets = UploadAssetRegistry()
+upload_assets.rebuild(catalog)
 
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
-def remove_background(input_path, output_path):
+def decode_upload(data):
+    """
+    Decodificar os bytes de uma imagem enviada, sem passar pelo disco (None se inválida)
+    """
+    if not data:
+        return None
+    return cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+
+
+def fill_largest_contour(mask):
+    """
+    Máscara só com o maior contorno externo, preenchido com seus buracos
+
+    Retorna None quando a máscara não tem contornos
+    """
+    # Encontrar o maior contorno (assumido como sendo o item de roupa)
+    contours, _ = cv2.findContours(
+        mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if not contours:
+        return None
+
+    # Criar uma nova máscara com apenas o maior contorno
+    refined_mask = np.zeros_like(mask)
+    largest_contour = max(contours, key=cv2.contourArea)
+    cv2.drawContours(refined_mask, [largest_contour], 0, 255, -1)
+
+    # Preencher buracos no contorno
+    # Primeiro inverter a máscara para tornar os buracos brancos
+    mask_inv = cv2.bitwise_not(refined_mask)
+    # Encontrar todos os contornos na máscara invertida
+    hole_contours, _ = cv2.findContours(
+        mask_inv, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    # Preencher todos exceto o maior contorno (que é o limite externo)
+    for contour in hole_contours:
+        if cv2.contourArea(contour) < cv2.contourArea(largest_contour):
+            cv2.drawContours(refined_mask, [contour], 0, 255, -1)
+    return refined_mask
+
+
+def color_foreground(img):
+    """
+    Pixels que não são fundo claro pelos limiares de cinza e de cor de garment_shape
+    """
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    _, thresh1 = cv2.threshold(gray, 240, 255, cv2.THRESH_BINARY_INV)
+    thresh2 = cv2.bitwise_not(cv2.inRange(cv2.cvtColor(img, cv2.COLOR_BGR2HSV), LOWER_WHITE, UPPER_WHITE))
+    return cv2.bitwise_or(thresh1, thresh2)
+
+
+def garment_shape(img):
+    """
+    Silhueta da peça sobre fundo claro, antes da folga e da limpeza final
+
+    Retorna (máscara, True se a silhueta veio de um contorno preenchido)
+    """
+    # Criar uma máscara com múltiplos métodos e combiná-los
+    # Método 1: Limiarização simples em tons de cinza
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    _, thresh1 = cv2.threshold(gray, 240, 255, cv2.THRESH_BINARY_INV)
+
+    # Método 2: Segmentação baseada em cor
+    # Converter para espaço de cor HSV
+    img_hsv = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
+
+    # Criar máscara para fundo branco/claro
+    thresh2 = cv2.inRange(img_hsv, LOWER_WHITE, UPPER_WHITE)
+    thresh2 = cv2.bitwise_not(thresh2)
+
+    # Método 3: Limiarização adaptativa para melhor manuseio de itens escuros
+    adaptive_thresh = cv2.adaptiveThreshold(
+        gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY_INV, 11, 2
+    )
+
+    # Combinar máscaras
+    combined_mask = cv2.bitwise_or(thresh1, thresh2)
+    combined_mask = cv2.bitwise_or(combined_mask, adaptive_thresh)
+
+    # Aplicar operações morfológicas para melhorar a máscara
+    combined_mask = cv2.morphologyEx(combined_mask, cv2.MORPH_OPEN, MASK_KERNEL)
+    combined_mask = cv2.morphologyEx(
+        combined_mask, cv2.MORPH_CLOSE, MASK_KERNEL)
+
+    # Se contornos foram encontrados, usar o maior
+    refined_mask = fill_largest_contour(combined_mask)
+    if refined_mask is None:
+        return combined_mask, False
+    return refined_mask, True
+
+
+def finish_garment_mask(mask, filled):
+    """
+    Folga e limpeza final aplicadas à silhueta da peça
+    """
+    if filled:
+        # Dilatar para garantir que não cortemos a roupa muito apertado
+        mask = cv2.dilate(mask, MASK_KERNEL, iterations=2)
+
+    # Limpeza final
+    mask = cv2.GaussianBlur(mask, (5, 5), 0)
+    _, mask = cv2.threshold(
+        mask, 127, 255, cv2.THRESH_BINARY)
+    return mask
+
+
+def garment_mask(img):
+    """
+    Máscara da peça (255) sobre fundo claro, calculada na resolução da imagem recebida
     """
-    Remove o fundo de uma imagem e salva com fundo transparente
+    return finish_garment_mask(*garment_shape(img))
+
+
+def multiresolution_mask(img, factor):
+    """
+    Máscara da peça calculada em uma cópia reduzida e refinada em resolução completa
+
+    Os limiares, a morfologia e os contornos rodam na cópia reduzida `factor` vezes. A
+    silhueta é ampliada e só uma faixa estreita em volta do contorno é reclassificada
+    pixel a pixel na imagem original, pelos limiares de cor (sem o limiar adaptativo);
+    o preenchimento, a folga e a limpeza final rodam em resolução completa, recortados
+    ao redor da peça. O resultado é próximo, mas não idêntico, ao de garment_mask.
+    """
+    height, width = img.shape[:2]
+    small = cv2.resize(img, None, fx=1 / factor, fy=1 / factor, interpolation=cv2.INTER_AREA)
+    shape, filled = garment_shape(small)
+    if not filled:
+        return garment_mask(img)
+
+    # Faixa de incerteza: MASK_BAND_PIXELS pixels da cópia reduzida para cada lado do contorno,
+    # mais o que a cor aponta como peça fora da silhueta (detalhes finos que a morfologia
+    # da cópia reduzida apagou, como alças)
+    step = cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3))
+    band = cv2.subtract(cv2.dilate(shape, step, iterations=MASK_BAND_PIXELS),
+                        cv2.erode(shape, step, iterations=MASK_BAND_PIXELS))
+    details = cv2.dilate(cv2.bitwise_and(color_foreground(small), cv2.bitwise_not(shape)), step)
+    band = cv2.bitwise_or(band, details)
+    x, y, w, h = (v * factor for v in cv2.boundingRect(cv2.bitwise_or(shape, band)))
+    candidate = cv2.resize(shape, (width, height), interpolation=cv2.INTER_LINEAR)
+    _, candidate = cv2.threshold(candidate, 127, 255, cv2.THRESH_BINARY)
+
+    # Reclassificar os blocos de pixels originais sob a faixa. Uma silhueta que ocupa o
+    # quadro inteiro não tem faixa: a silhueta ampliada fica como está
+    ys, xs = np.nonzero(band)
+    if len(ys):
+        offsets = np.arange(factor)
+        rows = np.minimum(ys[:, None] * factor + offsets, height - 1)[:, :, None]
+        cols = np.minimum(xs[:, None] * factor + offsets, width - 1)[:, None, :]
+        foreground = color_foreground(img[rows, cols].reshape(-1, 1, 3))
+        candidate[rows, cols] = foreground.reshape(len(ys), factor, factor)
+
+    # Preencher, dar folga e limpar só no retângulo da peça, com margem para a dilatação
+    margin = MASK_MARGIN_PIXELS
+    x1, y1 = max(0, x - margin), max(0, y - margin)
+    x2, y2 = min(width, x + w + margin), min(height, y + h + margin)
+    candidate = candidate[y1:y2, x1:x2]
+    candidate = cv2.morphologyEx(candidate, cv2.MORPH_OPEN, MASK_KERNEL)
+    candidate = cv2.morphologyEx(candidate, cv2.MORPH_CLOSE, MASK_KERNEL)
+    refined_roi = fill_largest_contour(candidate)
+    if refined_roi is None:
+        return garment_mask(img)
+
+    refined_mask = np.zeros((height, width), dtype=np.uint8)
+    refined_mask[y1:y2, x1:x2] = finish_garment_mask(refined_roi, True)
+    return refined_mask
+
+
+def remove_background(img, max_side=None):
+    """
+    Remove o fundo de uma imagem BGR em memória
     Usando técnicas melhoradas para melhores resultados com uploads personalizados
+
+    Imagens com o lado maior acima de max_side (MASK_MAX_SIDE por padrão; 0 desativa)
+    têm a máscara calculada em uma cópia reduzida e refinada só em volta do contorno.
+
+    Retorna a imagem BGRA com o fundo transparente, ou None em caso de falha
     """
     try:
-        # Ler a imagem
-        img = cv2.imread(input_path)
         if img is None:
-            print(f"Erro: Não foi possível ler a imagem em {input_path}")
-            return False
-
-        # Converter para RGB para processamento
-        img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-
-        # Criar uma máscara com múltiplos métodos e combiná-los
-        # Método 1: Limiarização simples em tons de cinza
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        _, thresh1 = cv2.threshold(gray, 240, 255, cv2.THRESH_BINARY_INV)
-
-        # Método 2: Segmentação baseada em cor
-        # Converter para espaço de cor HSV
-        img_hsv = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
-
-        # Definir faixa para cores de fundo (assumindo fundo branco/claro)
-        lower_white = np.array([0, 0, 180])
-        upper_white = np.array([180, 30, 255])
-
-        # Criar máscara para fundo branco/claro
-        thresh2 = cv2.inRange(img_hsv, lower_white, upper_white)
-        thresh2 = cv2.bitwise_not(thresh2)
-
-        # Método 3: Limiarização adaptativa para melhor manuseio de itens escuros
-        adaptive_thresh = cv2.adaptiveThreshold(
-            gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY_INV, 11, 2
-        )
-
-        # Combinar máscaras
-        combined_mask = cv2.bitwise_or(thresh1, thresh2)
-        combined_mask = cv2.bitwise_or(combined_mask, adaptive_thresh)
-
-        # Aplicar operações morfológicas para melhorar a máscara
-        kernel = np.ones((5, 5), np.uint8)
-        combined_mask = cv2.morphologyEx(combined_mask, cv2.MORPH_OPEN, kernel)
-        combined_mask = cv2.morphologyEx(
-            combined_mask, cv2.MORPH_CLOSE, kernel)
-
-        # Encontrar o maior contorno (assumido como sendo o item de roupa)
-        contours, _ = cv2.findContours(
-            combined_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-
-        # Se contornos foram encontrados, usar o maior
-        if contours:
-            # Criar uma nova máscara com apenas o maior contorno
-            refined_mask = np.zeros_like(combined_mask)
-            largest_contour = max(contours, key=cv2.contourArea)
-            cv2.drawContours(refined_mask, [largest_contour], 0, 255, -1)
-
-            # Preencher buracos no contorno
-            # Primeiro inverter a máscara para tornar os buracos brancos
-            mask_inv = cv2.bitwise_not(refined_mask)
-            # Encontrar todos os contornos na máscara invertida
-            hole_contours, _ = cv2.findContours(
-                mask_inv, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            # Preencher todos exceto o maior contorno (que é o limite externo)
-            for contour in hole_contours:
-                if cv2.contourArea(contour) < cv2.contourArea(largest_contour):
-                    cv2.drawContours(refined_mask, [contour], 0, 255, -1)
-
-            # Dilatar para garantir que não cortemos a roupa muito apertado
-            refined_mask = cv2.dilate(refined_mask, kernel, iterations=2)
-        else:
-            refined_mask = combined_mask
+            print("Erro: Nenhuma imagem para remover o fundo")
+            return None
 
-        # Limpeza final
-        refined_mask = cv2.GaussianBlur(refined_mask, (5, 5), 0)
-        _, refined_mask = cv2.threshold(
-            refined_mask, 127, 255, cv2.THRESH_BINARY)
+        max_side = MASK_MAX_SIDE if max_side is None else max_side
+        long_side = max(img.shape[:2])
+        if max_side and long_side > max_side:
+            refined_mask = multiresolution_mask(img, int(np.ceil(long_side / max_side)))
+        else:
+            refined_mask = garment_mask(img)
 
         # Criar canal alfa da máscara
         alpha = refined_mask
@@ -217,25 +388,20 @@ def remove_background(input_path, output_path):
         # Definir canal alfa na imagem BGRA
         bgra[:, :, 3] = alpha
 
-        # Salvar a imagem com transparência
-        cv2.imwrite(output_path, bgra)
-
-        # Verificação de confirmação
-        result = cv2.imread(output_path, cv2.IMREAD_UNCHANGED)
-        # Verificar se o canal alfa existe
-        if result is None or result.shape[2] < 4:
+        # Verificação em memória: uma máscara sem nenhum pixel da peça não serve
+        if cv2.countNonZero(alpha) == 0:
             print(
-                f"Aviso: Falha ao criar imagem transparente. Salvando com método de fallback.")
-            # Método de fallback: apenas salvar o original com remoção básica de fundo
+                f"Aviso: Falha ao criar imagem transparente. Usando método de fallback.")
+            # Método de fallback: remoção básica de fundo
+            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
             _, simple_mask = cv2.threshold(
                 gray, 250, 255, cv2.THRESH_BINARY_INV)
             bgra[:, :, 3] = simple_mask
-            cv2.imwrite(output_path, bgra)
 
-        return True
+        return bgra
     except Exception as e:
         print(f"Erro ao remover fundo: {str(e)}")
-        return False
+        return None
 
 # Servir App React
 
@@ -369,8 +535,14 @@ def get_catalog():
 
 @app.route('/api/catalog/upload', methods=['POST'])
 def upload_item():
-    global catalog
+    """
+    Receber uma peça enviada pelo usuário.
 
+    Os bytes do arquivo são lidos da requisição e o processamento (decodificação, remoção
+    de fundo, máscara e âncoras) vai para a fila de ingestão; a resposta traz o id do trabalho na hora (202) e o item
+    só entra no catálogo quando o processamento termina com sucesso.
+    Acompanhe em GET /api/catalog/upload/<job_id>.
+    """
     if 'file' not in request.files:
         return jsonify({'success': False, 'error': 'Nenhum arquivo enviado'})
 
@@ -381,6 +553,18 @@ def upload_item():
     if file.filename == '':
         return jsonify({'success': False, 'error': 'Nenhum arquivo selecionado'})
 
+    # O tipo vira coleção do catálogo e parte dos nomes de arquivo: só os tipos conhecidos
+    if item_type not in CATALOG_COLLECTIONS.values():
+        return jsonify({'success': False, 'error': 'Tipo de peça inválido'}), 400
+
+    # Ajuste opcional por malha: "default" usa os pontos de controle do tipo de peça, ou JSON com as linhas
+    warp = request.form.get('warp') or None
+    if warp is not None:
+        try:
+            resolve_warp(warp, item_type)
+        except ValueError:
+            return jsonify({'success': False, 'error': 'Pontos de controle do ajuste inválidos'})
+
     if file and allowed_file(file.filename):
         try:
             # Gerar nome de arquivo único
@@ -393,62 +577,385 @@ def upload_item():
             os.makedirs(os.path.join(app.root_path,
                         USER_UPLOADS_DIR), exist_ok=True)
 
-            # Salvar arquivo original
-            original_path = os.path.join(
-                app.root_path, USER_UPLOADS_DIR, f"original_{new_filename}")
-            file.save(original_path)
+            # Ler os bytes agora, calculando o hash do conteúdo durante a leitura:
+            # o fluxo da requisição não sobrevive a ela
+            data, content_hash = read_upload(file.stream)
+            original_path = None
+            if ARCHIVE_ORIGINAL_UPLOADS:
+                original_path = os.path.join(
+                    app.root_path, USER_UPLOADS_DIR, f"original_{new_filename}")
+                with open(original_path, 'wb') as f:
+                    f.write(data)
 
-            # Processar imagem para remover fundo
-            processed_filename = f"processed_{new_filename}"
-            processed_path = os.path.join(
-                app.root_path, USER_UPLOADS_DIR, processed_filename)
+            try:
+                job_id = upload_queue.submit({
+                    'data': data,
+                    # Sempre PNG, o formato que guarda o canal alfa
+                    'processed_filename': f"processed_{item_type}_{unique_id}.png",
+                    'item_type': item_type,
+                    'name': name,
+                    'unique_id': unique_id,
+                    'warp': warp,
+                    'content_hash': content_hash
+                })
+            except QueueFullError:
+                if original_path:
+                    os.remove(original_path)
+                return jsonify({'success': False, 'error': 'Muitos envios em processamento. Tente novamente em instantes'}), 503
+
+            return jsonify({
+                'success': True,
+                'job_id': job_id,
+                'status': 'queued',
+                'status_url': f'/api/catalog/upload/{job_id}',
+                'message': f'{item_type.capitalize()} recebida; o processamento está em andamento'
+            }), 202
+        except Exception as e:
+            print(f"Erro no processo de upload: {str(e)}")
+            return jsonify({
+                'success': False,
+                'error': f'Ocorreu um erro ao processar seu upload: {str(e)}'
+            })
+
+    return jsonify({'success': False, 'error': 'Tipo de arquivo não permitido. Por favor, envie uma imagem JPG, JPEG ou PNG.'})
 
-            print(f"Processando imagem: {original_path} -> {processed_path}")
-            success = remove_background(original_path, processed_path)
 
-            if not success:
-                return jsonify({
-                    'success': False,
-                    'error': 'Falha ao processar imagem. Por favor, certifique-se de que a imagem tenha bom contraste com o fundo.'
-                })
+def process_upload(job):
+    """
+    Remover o fundo de uma peça enviada e gravar a imagem processada e seus derivados
 
-            # Adicionar ao catálogo
-            current_catalog = load_catalog()
+    Retorna o recurso processado: URLs da imagem e dos derivados, tipo e posicionamento.
+    Lança ValueError se a imagem não puder ser processada.
+    """
+    item_type = job['item_type']
+    processed_filename = job['processed_filename']
+    uploads_dir = os.path.join(app.root_path, USER_UPLOADS_DIR)
+    processed_path = os.path.join(uploads_dir, processed_filename)
+
+    img = decode_upload(job['data'])
+    if img is None:
+        raise ValueError('Não foi possível decodificar a imagem enviada')
+
+    print(f"Processando imagem enviada -> {processed_path}")
+    processed_img = remove_background(img)
+    if processed_img is None:
+        raise ValueError('Falha ao processar imagem. Por favor, certifique-se de que a imagem tenha bom contraste com o fundo.')
+
+    # Codificada uma única vez e gravada sem releitura
+    ok, encoded = cv2.imencode('.png', processed_img)
+    if not ok:
+        raise ValueError('Falha ao codificar a imagem processada')
+    with open(processed_path, 'wb') as f:
+        f.write(encoded.tobytes())
+
+    # Máscara, caixa delimitadora e âncoras calculadas uma única vez, no upload, sobre a imagem em memória
+    placement = garment_placement(processed_img, item_type, warp=job['warp'])
+
+    # Derivados gerados na mesma passada, para cada leitor carregar só o que precisa:
+    # a grade do catálogo usa a miniatura e o compositor mapeia a máscara pronta
+    garment_mask_array, _ = build_masks(processed_img, placement['mask'])
+    derivatives = write_derivatives(processed_img, garment_mask_array, uploads_dir,
+                                    f"{item_type}_{job['unique_id']}")
+
+    return {
+        'image': f'/{USER_UPLOADS_DIR}/{processed_filename}',
+        'derivatives': {name: f'/{USER_UPLOADS_DIR}/{filename}' for name, filename in derivatives.items()},
+        'kind': item_type,
+        'placement': placement
+    }
+
+
+def reuse_upload(asset, job):
+    """
+    Posicionamento de um envio repetido a partir do recurso já processado
+
+    O posicionamento é reaproveitado quando o tipo e o ajuste pedidos são os mesmos;
+    senão é recalculado sobre a imagem processada gravada. Retorna None se ela sumiu.
+    """
+    item_type = job['item_type']
+    warp = resolve_warp(job['warp'], item_type) if job['warp'] else None
+    placement = asset.get('placement')
+    if placement and asset['kind'] == item_type and placement.get('warp') == warp:
+        return placement
+
+    processed_img = cv2.imread(catalog_image_path(asset), cv2.IMREAD_UNCHANGED)
+    if processed_img is None:
+        return None
+    return garment_placement(processed_img, item_type, warp=job['warp'])
+
+
+def ingest_upload(job):
+    """
+    Processar uma peça enviada, na fila de ingestão: remover o fundo, calcular a
+    máscara e as âncoras, gravar os derivados (miniatura, WebP e máscara .npy) e só
+    então adicionar o item ao catálogo.
+
+    Bytes já enviados antes (mesmo hash de conteúdo) reaproveitam a imagem processada,
+    os derivados e o posicionamento do recurso existente; só o item novo é criado.
 
-            if item_type == 'shirt':
-                collection = 'shirts'
-                new_id = str(len(current_catalog[collection]) + 1)
-            elif item_type == 'pant':
-                collection = 'pants'
-                new_id = str(len(current_catalog[collection]) + 1)
+    Lança ValueError se a imagem não puder ser processada; o trabalho fica como falho.
+    """
+    global catalog
+
+    item_type = job['item_type']
+    content_hash = job['content_hash']
+
+    # Envios com o mesmo conteúdo são processados um de cada vez: o repetido espera o primeiro
+    with upload_assets.lock(content_hash):
+        asset = upload_assets.get(content_hash)
+        placement = reuse_upload(asset, job) if asset is not None else None
+        deduplicated = placement is not None
+        if not deduplicated:
+            asset = process_upload(job)
+            placement = asset['placement']
+
+        # Cada tipo de peça tem sua coleção (jacket -> jackets, accessory -> accessories)
+        collection = kind_collection(item_type)
+        with catalog_lock:
+            current_catalog = load_catalog()
+            if item_type in ('shirt', 'pant'):
+                new_id = next_item_id(current_catalog.get(collection, []))
             else:
-                collection = f"{item_type}s"
-                new_id = unique_id
+                new_id = job['unique_id']
 
             item = {
                 'id': new_id,
-                'name': name,
-                'image': f'/{USER_UPLOADS_DIR}/{processed_filename}',
-                'type': 'user'
+                'name': job['name'],
+                'image': asset['image'],
+                'type': 'user',
+                'placement': placement,
+                'derivatives': asset['derivatives'],
+                'content_hash': content_hash
             }
 
-            current_catalog[collection].append(item)
+            current_catalog.setdefault(collection, []).append(item)
             save_catalog(current_catalog)
             catalog = current_catalog
+        upload_assets.add_reference(content_hash, asset)
 
-            return jsonify({
-                'success': True,
-                'message': f'{item_type.capitalize()} enviada e processada com sucesso',
-                'item': item
-            })
-        except Exception as e:
-            print(f"Erro no processo de upload: {str(e)}")
-            return jsonify({
-                'success': False,
-                'error': f'Ocorreu um erro ao processar seu upload: {str(e)}'
-            })
+    # Descartar qualquer versão decodificada anterior deste id e os resultados renderizados com ela
+    garment_cache.invalidate(collection, new_id)
+    result_cache.invalidate(collection, new_id)
+    return {'collection': collection, 'item': item, 'deduplicated': deduplicated}
 
-    return jsonify({'success': False, 'error': 'Tipo de arquivo não permitido. Por favor, envie uma imagem JPG, JPEG ou PNG.'})
+
+# Fila limitada de processamento dos envios
+upload_queue = IngestionQueue(ingest_upload, max_workers=UPLOAD_WORKERS, max_pending=MAX_PENDING_UPLOADS)
+
+
+@app.route('/api/catalog/upload/<job_id>', methods=['GET'])
+def upload_status(job_id):
+    """
+    Estado de um envio: queued, processing, done (com o item) ou failed (com o erro)
+    """
+    job = upload_queue.get(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Envio não encontrado'}), 404
+
+    body = {
+        'success': job['status'] != 'failed',
+        'job_id': job['id'],
+        'status': job['status'],
+        'queue_ms': round((job['started_at'] - job['submitted_at']) * 1000, 2) if job['started_at'] else None,
+        'processing_ms': job.get('processing_ms')
+    }
+    if job['status'] == 'done':
+        body['item'] = job['result']['item']
+        body['deduplicated'] = job['result']['deduplicated']
+        body['message'] = 'Peça processada e adicionada ao catálogo'
+    elif job['status'] == 'failed':
+        body['error'] = job['error']
+    return jsonify(body)
+
+
+@app.route('/api/catalog/<collection>/<item_id>/variant', methods=['GET'])
+def catalog_item_variant(collection, item_id):
+    """
+    Imagem PNG de um item do catálogo recolorido ("color", #RRGGBB), por exemplo
+    em uma das cores recomendadas por /api/skin-tone-analysis.
+    A variante fica em cache por (item, cor); nada é gravado no catálogo.
+    """
+    item = next((entry for entry in load_catalog().get(collection, []) if entry['id'] == item_id), None)
+    if item is None:
+        return jsonify({'success': False, 'error': 'Item não encontrado'}), 404
+
+    try:
+        garment = garment_cache.get(collection, item_id, catalog_image_path(item), collection_kind(collection),
+                                    app.root_path, item.get('placement'), color=request.args.get('color', ''),
+                                    mask_path=catalog_mask_path(item))
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Cor inválida. Use o formato #RRGGBB'}), 400
+    if garment is None:
+        return jsonify({'success': False, 'error': 'Não foi possível carregar a peça'}), 500
+
+    ok, encoded = cv2.imencode('.png', garment.bgra)
+    if not ok:
+        return jsonify({'success': False, 'error': 'Falha ao codificar a imagem'}), 500
+    return Response(encoded.tobytes(), mimetype='image/png')
+
+
+def palette_variants(colors, collection='shirts'):
+    """
+    URLs das variantes recoloridas de cada item de uma coleção nas cores da paleta.
+    As imagens só são geradas quando pedidas, e ficam em cache por (item, cor).
+    """
+    return [{
+        'id': item['id'],
+        'name': item['name'],
+        'variants': [{'color': color, 'url': f'/api/catalog/{collection}/{item["id"]}/variant?color={quote(color)}'}
+                     for color in colors]
+    } for item in load_catalog().get(collection, [])]
+
+
+@app.route('/api/catalog/<collection>/<item_id>', methods=['DELETE'])
+def delete_item(collection, item_id):
+    """
+    Remover um item do catálogo e descartar as versões em cache e os resultados renderizados com ele.
+    Os arquivos de itens enviados por usuários também são apagados, quando nenhum outro item
+    criado a partir do mesmo conteúdo ainda os usa.
+    """
+    global catalog
+
+    # Travar o hash do conteúdo antes do catálogo, na mesma ordem da fila de envios
+    peeked = next((entry for entry in load_catalog().get(collection) or [] if entry['id'] == item_id), None)
+    content_hash = (peeked or {}).get('content_hash')
+    with upload_assets.lock(content_hash) if content_hash else contextlib.nullcontext():
+        with catalog_lock:
+            current_catalog = load_catalog()
+            items = current_catalog.get(collection)
+            if items is None:
+                return jsonify({'success': False, 'error': 'Coleção não encontrada'}), 404
+
+            item = next((entry for entry in items if entry['id'] == item_id), None)
+            if item is None:
+                return jsonify({'success': False, 'error': 'Item não encontrado'}), 404
+
+            items.remove(item)
+            save_catalog(current_catalog)
+            catalog = current_catalog
+
+        # Arquivos compartilhados só saem com o último item que os usa
+        remove_files = item.get('type') == 'user'
+        if item.get('content_hash'):
+            remove_files = upload_assets.release(item['content_hash']) is not None
+
+    garment_cache.invalidate(collection, item_id)
+    evicted = result_cache.invalidate(collection, item_id)
+
+    if remove_files:
+        paths = [catalog_image_path(item)] + [derivative_path(item, name, app.root_path)
+                                              for name in item.get('derivatives', {})]
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError as e:
+                print(f"Erro ao remover arquivo do item: {str(e)}")
+
+    return jsonify({'success': True, 'item': item, 'evicted_results': evicted})
+
+
+def select_catalog_item(current_catalog, collection, item_id):
+    """
+    Encontrar um item do catálogo pelo id, usando o primeiro item como padrão
+    (None se a coleção não existe ou está vazia)
+    """
+    items = current_catalog.get(collection) or []
+    for item in items:
+        if item['id'] == item_id:
+            return item
+    return items[0] if items else None
+
+
+def next_item_id(items):
+    """
+    Próximo id numérico de uma coleção: um a mais que o maior id em uso, para que um
+    item removido nunca faça um envio novo repetir o id de outro item
+    """
+    numeric = [int(item['id']) for item in items if str(item['id']).isdigit()]
+    return str(max(numeric, default=0) + 1)
+
+
+def catalog_image_path(item):
+    """
+    Caminho absoluto da imagem de um item do catálogo
+    """
+    return os.path.join(app.root_path, item['image'].replace('\\', '/').lstrip('/'))
+
+
+def catalog_mask_path(item):
+    """
+    Caminho absoluto da máscara pré-calculada de um item do catálogo (None se não houver)
+    """
+    return derivative_path(item, 'mask', app.root_path)
+
+
+def select_garment_items(shirtno, pantno):
+    """
+    Itens do catálogo da camisa e da calça selecionadas
+    """
+    current_catalog = load_catalog()
+    return (select_catalog_item(current_catalog, 'shirts', shirtno),
+            select_catalog_item(current_catalog, 'pants', pantno))
+
+
+def catalog_image_mtime(item):
+    try:
+        return os.path.getmtime(catalog_image_path(item))
+    except OSError:
+        return None
+
+
+def select_layer_items(values):
+    """
+    Itens do catálogo das camadas extras pedidas (jaqueta, acessório, calçado).
+    Só entram as camadas com um id presente na requisição e existente no catálogo.
+    """
+    current_catalog = load_catalog()
+    selected = []
+    for kind in LAYER_KINDS:
+        item_id = values.get(kind)
+        if not item_id:
+            continue
+        collection = kind_collection(kind)
+        item = next((entry for entry in current_catalog.get(collection, []) if entry['id'] == item_id), None)
+        if item is not None:
+            selected.append((collection, kind, item))
+    return selected
+
+
+def load_layer_garments(values):
+    """
+    Carregar as camadas extras pedidas; as que não puderem ser lidas são ignoradas
+    """
+    layers = [garment_cache.get(collection, item['id'], catalog_image_path(item), kind,
+                                app.root_path, item.get('placement'), mask_path=catalog_mask_path(item))
+              for collection, kind, item in select_layer_items(values)]
+    return [garment for garment in layers if garment is not None]
+
+
+def requested_colors(values):
+    """
+    Cores pedidas para a camisa e a calça ("shirt_color" e "pant_color", #RRGGBB), ou None
+
+    Lança ValueError se alguma cor não estiver no formato hexadecimal
+    """
+    return tuple(normalize_hex_color(values[name]) if values.get(name) else None
+                 for name in ('shirt_color', 'pant_color'))
+
+
+def load_selected_garments(shirtno, pantno, shirt_color=None, pant_color=None):
+    """
+    Carregar a camisa e a calça selecionadas do catálogo, recoloridas se uma cor for pedida
+    """
+    selected_shirt, selected_pant = select_garment_items(shirtno, pantno)
+
+    shirt = garment_cache.get('shirts', selected_shirt['id'], catalog_image_path(selected_shirt),
+                              'shirt', app.root_path, selected_shirt.get('placement'), color=shirt_color,
+                              mask_path=catalog_mask_path(selected_shirt))
+    pant = garment_cache.get('pants', selected_pant['id'], catalog_image_path(selected_pant),
+                             'pant', app.root_path, selected_pant.get('placement'), color=pant_color,
+                             mask_path=catalog_mask_path(selected_pant))
+    return shirt, pant
 
 
 @app.route('/predict', methods=['GET', 'POST'])
@@ -461,302 +968,535 @@ def predict():
         shirtno = request.args.get("shirt", "1")
         pantno = request.args.get("pant", "1")
 
-    # Carregar o catálogo para acessar todas as imagens de camisas e calças
-    current_catalog = load_catalog()
+    # Intervalo de detecção completa; entre detecções o rosto é rastreado (1 desativa o rastreamento)
+    detect_interval = request.values.get("detect_interval", DEFAULT_DETECT_INTERVAL, type=int)
+    # Lado maior da cópia reduzida usada na detecção (0 usa a resolução completa)
+    detect_max_side = request.values.get("detect_max_side", DEFAULT_DETECT_MAX_SIDE, type=int)
+    tracker = FaceTracker(detect_interval=detect_interval, detect_max_side=detect_max_side)
+    # Peças já redimensionadas, reaproveitadas enquanto o tamanho do rosto não muda
+    scaled_cache = ScaledGarmentCache(bucket=request.values.get("size_bucket", DEFAULT_SIZE_BUCKET, type=int))
+    blur = request.values.get("blur", "1") != "0"
+    # Pessoas vestidas por quadro; com mais de uma, os rostos são detectados a cada quadro
+    max_faces = max(1, request.values.get("max_faces", 1, type=int))
+    # Taxa de quadros alvo; o governador ajusta o intervalo de detecção e a resolução para mantê-la
+    governor = FrameGovernor(target_fps=request.values.get("target_fps", DEFAULT_TARGET_FPS, type=float),
+                             detect_interval=detect_interval,
+                             adaptive=request.values.get("adaptive", "1") != "0")
+
+    # Modo quiosque: captura, composição e exibição em threads separadas
+    kiosk = request.values.get("kiosk", "0") != "0"
 
-    # Encontrar a camisa e calça selecionadas do catálogo
-    selected_shirt = None
-    for shirt in current_catalog['shirts']:
-        if shirt['id'] == shirtno:
-            selected_shirt = shirt
-            break
-
-    selected_pant = None
-    for pant in current_catalog['pants']:
-        if pant['id'] == pantno:
-            selected_pant = pant
-            break
-
-    # Se camisa ou calça não forem encontradas, usar padrões
-    if not selected_shirt:
-        selected_shirt = current_catalog['shirts'][0]
-    if not selected_pant:
-        selected_pant = current_catalog['pants'][0]
-
-    # Obter caminhos e preparar para processamento
-    shirt_path = os.path.join(
-        app.root_path, selected_shirt['image'].lstrip('/'))
-    pant_path = os.path.join(app.root_path, selected_pant['image'].lstrip('/'))
+    try:
+        colors = requested_colors(request.values)
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Cor inválida. Use o formato #RRGGBB'}), 400
+    shirt, pant = load_selected_garments(shirtno, pantno, *colors)
+    # Jaqueta, acessório e calçado opcionais, empilhados sobre a camisa e a calça pela ordem z
+    layers = load_layer_garments(request.values)
+
+    def compose(img):
+        tracker.detect_interval = governor.detect_interval
+        with governor.stage('detect'):
+            faces = tracker.update(img) if max_faces == 1 else detect_faces(img)
+        with governor.stage('composite'):
+            img = governor.resize(img)
+            render_tryon(img, shirt, pant, faces=governor.scale_boxes(faces), blur=blur,
+                         scaled_cache=scaled_cache, max_faces=max_faces, layers=layers)
+        return img
+
+    def show(img, original_size):
+        cv2.namedWindow("img", cv2.WINDOW_NORMAL)
+        cv2.resizeWindow("img", (int(original_size[1]*3/2), int(original_size[0]*3/2)))
+        cv2.imshow("img", img)
 
     cv2.waitKey(1)
     cap = cv2.VideoCapture(0)
 
-    while True:
-        # Ler a camisa selecionada
-        imgshirt = cv2.imread(shirt_path, 1)  # imagem original em bgr
-        if imgshirt is None:
-            print(
-                f"Erro: Não foi possível ler a imagem da camisa em {shirt_path}")
-            # Usar uma camisa padrão como fallback
-            imgshirt = cv2.imread(os.path.join(
-                app.root_path, 'static/assets/shirt1.png'), 1)
-
-        # Processar máscara da camisa
-        shirtgray = cv2.cvtColor(imgshirt, cv2.COLOR_BGR2GRAY)
-
-        # Verificar se é uma camisa personalizada enviada
-        if 'user-uploads' in shirt_path:
-            # Camisas personalizadas enviadas já devem ter transparência do nosso processamento
-            # Verificar se a imagem tem um canal alfa
-            if imgshirt.shape[2] == 4:  # formato BGRA
-                # Usar canal alfa diretamente
-                _, orig_masks = cv2.threshold(
-                    imgshirt[:, :, 3], 127, 255, cv2.THRESH_BINARY)
-                orig_masks_inv = cv2.bitwise_not(orig_masks)
-            else:
-                # Voltar ao processamento regular
-                ret, orig_masks = cv2.threshold(
-                    shirtgray, 240, 255, cv2.THRESH_BINARY_INV)
-                orig_masks_inv = cv2.bitwise_not(orig_masks)
-        elif 'shirt51.jpg' in shirt_path:  # Caso especial para shirt3
-            ret, orig_masks_inv = cv2.threshold(
-                shirtgray, 200, 255, cv2.THRESH_BINARY)
-            orig_masks = cv2.bitwise_not(orig_masks_inv)
+    if kiosk:
+        def process(img):
+            governor.begin_frame()
+            shown = (compose(img), img.shape[:2])
+            governor.end_frame()
+            return shown
+
+        def display(shown):
+            show(*shown)
+            return cv2.waitKey(1) != ord('q')
+
+        print(f"Estatísticas do quiosque: {KioskPipeline(cap, process, display).run()}")
+    else:
+        while True:
+            governor.begin_frame()
+            with governor.stage('capture'):
+                ret, img = cap.read()
+            if not ret:
+                break
+
+            original_size = img.shape[:2]
+            img = compose(img)
+
+            with governor.stage('display'):
+                show(img, original_size)
+            governor.end_frame()
+            # Esperar apenas o que resta do orçamento do quadro, em vez de 100 ms fixos
+            if cv2.waitKey(governor.wait_ms()) == ord('q'):
+                break
+
+    cap.release()
+    cv2.destroyAllWindows()
+    print(f"Estatísticas do rastreamento de rosto: {tracker.stats()}")
+    print(f"Estatísticas do cache de peças redimensionadas: {scaled_cache.stats()}")
+    print(f"Estatísticas do governador de quadros: {governor.stats()}")
+
+    # Redirecionar de volta para o app React
+    return redirect('/')
+
+
+@app.route('/api/tryon/render', methods=['POST'])
+def tryon_render():
+    """
+    Renderizar a prova em um único quadro enviado pelo cliente, sem câmera no servidor.
+
+    Entrada:
+    - multipart/form-data com o campo file "frame" (JPEG/PNG), ou os bytes da imagem no corpo
+    - "shirt" e "pant" como campos de formulário ou parâmetros de consulta
+    - "format" opcional: "jpg" (padrão) ou "png"
+    - "blur" opcional: "0" desativa o desfoque do fundo
+    - "faces" opcional: quantas pessoas vestir no quadro (padrão 1)
+    - "outfits" opcional: JSON com uma combinação por pessoa, da esquerda para a direita,
+      ex. [[1, 1], [3, 2]]; sem ele todas vestem "shirt" e "pant"
+    - "jacket", "accessory" e "footwear" opcionais: ids de camadas extras, vestidas por todas as pessoas
+    - "shirt_color" e "pant_color" opcionais: cor (#RRGGBB) em que a camisa e a calça são mostradas
+    """
+    shirtno = request.values.get('shirt', '1')
+    pantno = request.values.get('pant', '1')
+    output_format = request.values.get('format', 'jpg').lower()
+    blur = request.values.get('blur', '1') != '0'
+    max_faces = max(1, request.values.get('faces', 1, type=int))
+    if output_format not in ('jpg', 'jpeg', 'png'):
+        return jsonify({'success': False, 'error': 'Formato de saída não suportado. Use jpg ou png'}), 400
+
+    try:
+        outfit_numbers = parse_combinations(request.values.get('outfits', '[]'))
+    except (ValueError, KeyError, TypeError):
+        return jsonify({'success': False, 'error': 'Lista de combinações inválida'}), 400
+    try:
+        colors = requested_colors(request.values)
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Cor inválida. Use o formato #RRGGBB'}), 400
+
+    if 'frame' in request.files:
+        frame_bytes = request.files['frame'].read()
+    else:
+        frame_bytes = request.get_data()
+
+    if not frame_bytes:
+        return jsonify({'success': False, 'error': 'Nenhum quadro enviado'}), 400
+
+    extension = '.png' if output_format == 'png' else '.jpg'
+    mimetype = 'image/png' if extension == '.png' else 'image/jpeg'
+
+    # A mesma foto com as mesmas peças é servida do cache, sem decodificar nem renderizar
+    selected_shirt, selected_pant = select_garment_items(shirtno, pantno)
+    variant = f'blur={int(blur)}'
+    if any(colors):
+        variant += f'|colors={colors[0]},{colors[1]}'
+    layer_items = select_layer_items(request.values)
+    if layer_items:
+        variant += '|layers=' + repr([(collection, item['id'], catalog_image_mtime(item))
+                                      for collection, _, item in layer_items])
+    if max_faces > 1:
+        outfit_items = [select_garment_items(*numbers) for numbers in outfit_numbers]
+        variant += f'|faces={max_faces}|outfits=' + repr([
+            (shirt_item['id'], pant_item['id'], catalog_image_mtime(shirt_item), catalog_image_mtime(pant_item))
+            for shirt_item, pant_item in outfit_items])
+    key = result_key(frame_bytes, selected_shirt['id'], selected_pant['id'],
+                     (catalog_image_mtime(selected_shirt), catalog_image_mtime(selected_pant)),
+                     variant=variant, extension=extension)
+    cached = result_cache.get(key)
+    if cached is not None:
+        return Response(cached, mimetype=mimetype, headers={'X-Cache': 'HIT'})
+
+    img = cv2.imdecode(np.frombuffer(frame_bytes, np.uint8), cv2.IMREAD_COLOR)
+    if img is None:
+        return jsonify({'success': False, 'error': 'Não foi possível decodificar o quadro. Envie uma imagem JPG ou PNG'}), 400
+
+    shirt, pant = load_selected_garments(shirtno, pantno, *colors)
+    if shirt is None or pant is None:
+        return jsonify({'success': False, 'error': 'Não foi possível carregar as peças selecionadas'}), 500
+
+    outfits = [load_selected_garments(*numbers) for numbers in outfit_numbers] if max_faces > 1 else None
+    if outfits and any(None in outfit for outfit in outfits):
+        return jsonify({'success': False, 'error': 'Não foi possível carregar as peças selecionadas'}), 500
+
+    render_tryon(img, shirt, pant, blur=blur, max_faces=max_faces, outfits=outfits,
+                 layers=load_layer_garments(request.values))
+
+    ok, encoded = cv2.imencode(extension, img)
+    if not ok:
+        return jsonify({'success': False, 'error': 'Falha ao codificar o quadro'}), 500
+
+    result = encoded.tobytes()
+    result_cache.put(key, result)
+    return Response(result, mimetype=mimetype, headers={'X-Cache': 'MISS'})
+
+@app.route('/api/tryon/stats', methods=['GET'])
+def tryon_stats():
+    """
+    Métricas do pipeline de prova deste processo (cache de peças e detector de rostos)
+    """
+    return jsonify({
+        'success': True,
+        'data': {
+            'pid': os.getpid(),
+            'garment_cache': garment_cache.stats(),
+            'face_detector': face_detectors.stats(),
+            'result_cache': result_cache.stats(),
+            'warp_maps': warp_map_cache.stats(),
+            'sessions': session_manager.stats(),
+            'uploads': upload_queue.stats(),
+            'videos': video_queue.stats(),
+            'upload_assets': upload_assets.stats()
+        }
+    })
+
+
+@app.route('/api/tryon/video', methods=['POST'])
+def tryon_video():
+    """
+    Renderizar a prova sobre um vídeo gravado.
+
+    Entrada (multipart/form-data):
+    - "video": arquivo de vídeo (mp4, avi, mov, webm ou mkv)
+    - "shirt" e "pant": ids do catálogo
+    - "workers" opcional: processos usados na renderização (limitado aos núcleos da máquina)
+    - "blur" opcional: "0" desativa o desfoque do fundo
+
+    O vídeo é dividido em trechos renderizados em paralelo e reunidos na ordem original.
+    A renderização entra na fila de vídeos (VIDEO_JOBS por vez) e a resposta traz o
+    'job_id' e o 'status_url' para acompanhar o resultado.
+    """
+    video = request.files.get('video')
+    if video is None or video.filename == '':
+        return jsonify({'success': False, 'error': 'Nenhum vídeo enviado'}), 400
+    extension = video.filename.rsplit('.', 1)[-1].lower() if '.' in video.filename else ''
+    if extension not in VIDEO_EXTENSIONS:
+        return jsonify({'success': False, 'error': 'Formato de vídeo não suportado'}), 400
+
+    current_catalog = load_catalog()
+    shirt = catalog_garment(current_catalog, 'shirts', request.values.get('shirt', '1'), app.root_path)
+    pant = catalog_garment(current_catalog, 'pants', request.values.get('pant', '1'), app.root_path)
+
+    # Cada processo é um interpretador novo: nunca mais processos que núcleos
+    workers = request.values.get('workers', DEFAULT_VIDEO_WORKERS, type=int) or DEFAULT_VIDEO_WORKERS
+    workers = max(1, min(workers, os.cpu_count() or 1))
+
+    # O vídeo enviado fica fora da pasta pública até ser renderizado; o job apaga a pasta
+    tmpdir = tempfile.mkdtemp(prefix='tryon-upload-')
+    input_path = os.path.join(tmpdir, f'input.{extension}')
+    video.save(input_path)
+    try:
+        job_id = video_queue.submit({
+            'tmpdir': tmpdir,
+            'input_path': input_path,
+            'shirt': shirt,
+            'pant': pant,
+            'workers': workers,
+            'blur': request.values.get('blur', '1') != '0'
+        })
+    except QueueFullError:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+        return jsonify({'success': False, 'error': 'Muitos vídeos em renderização. Tente novamente mais tarde'}), 503
+
+    return jsonify({
+        'success': True,
+        'job_id': job_id,
+        'status': 'queued',
+        'status_url': f'/api/tryon/video/{job_id}'
+    }), 202
+
+
+def render_uploaded_video(job):
+    """
+    Renderizar um vídeo enviado a /api/tryon/video e apagar o arquivo enviado
+
+    Retorna a URL do vídeo renderizado e as métricas de render_video
+    """
+    try:
+        output_dir = os.path.join(app.root_path, TRYON_VIDEOS_DIR)
+        os.makedirs(output_dir, exist_ok=True)
+        prune_tryon_videos(output_dir)
+        output_filename = f'tryon_{uuid.uuid4()}.mp4'
+        try:
+            result = render_video(job['input_path'], os.path.join(output_dir, output_filename),
+                                  job['shirt'], job['pant'], workers=job['workers'], blur=job['blur'])
+        except IOError:
+            raise ValueError('Não foi possível ler o vídeo enviado')
+        return {'url': f'/{TRYON_VIDEOS_DIR}/{output_filename}'.replace('\\', '/'), 'data': result}
+    finally:
+        shutil.rmtree(job['tmpdir'], ignore_errors=True)
+
+
+# Fila limitada de renderização de vídeos
+video_queue = IngestionQueue(render_uploaded_video, max_workers=VIDEO_JOBS, max_pending=MAX_PENDING_VIDEOS)
+
+
+@app.route('/api/tryon/video/<job_id>', methods=['GET'])
+def tryon_video_status(job_id):
+    """
+    Estado de uma renderização: queued, processing, done (com a URL) ou failed (com o erro)
+    """
+    job = video_queue.get(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Renderização não encontrada'}), 404
+
+    body = {
+        'success': job['status'] != 'failed',
+        'job_id': job['id'],
+        'status': job['status'],
+        'queue_ms': round((job['started_at'] - job['submitted_at']) * 1000, 2) if job['started_at'] else None,
+        'processing_ms': job.get('processing_ms')
+    }
+    if job['status'] == 'done':
+        body.update(job['result'])
+    elif job['status'] == 'failed':
+        body['error'] = job['error']
+    return jsonify(body)
+
+
+def prune_tryon_videos(output_dir):
+    """
+    Apagar os vídeos renderizados mais antigos que TRYON_VIDEO_TTL_SECONDS e, dos
+    restantes, os mais antigos além de MAX_TRYON_VIDEOS (abrindo espaço para o próximo)
+    """
+    videos = []
+    for name in os.listdir(output_dir):
+        path = os.path.join(output_dir, name)
+        try:
+            videos.append((os.path.getmtime(path), path))
+        except OSError:
+            continue
+    videos.sort(reverse=True)
+
+    expired_before = time.time() - TRYON_VIDEO_TTL_SECONDS
+    for index, (mtime, path) in enumerate(videos):
+        if mtime < expired_before or index >= MAX_TRYON_VIDEOS - 1:
+            try:
+                os.remove(path)
+            except OSError as e:
+                print(f"Erro ao remover vídeo antigo: {str(e)}")
+
+
+def parse_combinations(raw):
+    """
+    Ler a lista de combinações de [[camisa, calça], ...] ou [{"shirt": .., "pant": ..}, ...]
+    """
+    combinations = []
+    for entry in json.loads(raw):
+        if isinstance(entry, dict):
+            combinations.append((str(entry['shirt']), str(entry['pant'])))
         else:
-            ret, orig_masks = cv2.threshold(
-                shirtgray, 0, 255, cv2.THRESH_BINARY)
-            orig_masks_inv = cv2.bitwise_not(orig_masks)
+            shirtno, pantno = entry
+            combinations.append((str(shirtno), str(pantno)))
+    return combinations
 
-        origshirtHeight, origshirtWidth = imgshirt.shape[:2]
 
-        # Ler a calça selecionada
-        imgpant = cv2.imread(pant_path, 1)
-        if imgpant is None:
-            print(
-                f"Erro: Não foi possível ler a imagem da calça em {pant_path}")
-            # Usar uma calça padrão como fallback
-            imgpant = cv2.imread(os.path.join(
-                app.root_path, 'static/assets/pant7.jpg'), 1)
+@app.route('/api/tryon/batch', methods=['POST'])
+def tryon_batch():
+    """
+    Renderizar uma foto com várias combinações de camisa e calça em uma única requisição.
 
-        imgpant = imgpant[:, :, 0:3]
-        pantgray = cv2.cvtColor(imgpant, cv2.COLOR_BGR2GRAY)
+    Entrada (multipart/form-data):
+    - "frame": foto do usuário (JPEG/PNG)
+    - "pairs": JSON com as combinações, ex. [[1, 1], [2, 1]] ou [{"shirt": 1, "pant": 2}]
+    - "output" opcional: "thumbnails" (padrão, JSON com imagens em base64) ou "sheet" (uma imagem JPEG)
+    - "width" opcional: largura de cada miniatura (0 mantém o tamanho original)
+    - "columns" opcional: colunas da folha de contato
+    - "blur" opcional: "0" desativa o desfoque do fundo
 
-        # Processar máscara da calça - ajustar limiar baseado no tipo de calça
-        if 'pant7.jpg' in pant_path:  # Calças brancas
-            ret, orig_mask = cv2.threshold(
-                pantgray, 100, 255, cv2.THRESH_BINARY)
-        else:  # Padrão para outras calças
-            ret, orig_mask = cv2.threshold(
-                pantgray, 50, 255, cv2.THRESH_BINARY)
+    O rosto é detectado uma vez e as combinações são renderizadas em paralelo.
+    """
+    output = request.values.get('output', 'thumbnails')
+    if output not in ('thumbnails', 'sheet'):
+        return jsonify({'success': False, 'error': 'Saída não suportada. Use thumbnails ou sheet'}), 400
 
-        # Criar máscara inversa
-        orig_mask_inv = cv2.bitwise_not(orig_mask)
-        origpantHeight, origpantWidth = imgpant.shape[:2]
+    try:
+        combinations = parse_combinations(request.values.get('pairs', '[]'))
+    except (ValueError, KeyError, TypeError):
+        return jsonify({'success': False, 'error': 'Lista de combinações inválida'}), 400
+    if not combinations:
+        return jsonify({'success': False, 'error': 'Nenhuma combinação enviada'}), 400
+    if len(combinations) > MAX_BATCH_PAIRS:
+        return jsonify({'success': False, 'error': f'Máximo de {MAX_BATCH_PAIRS} combinações por requisição'}), 400
+
+    frame_bytes = request.files['frame'].read() if 'frame' in request.files else b''
+    img = cv2.imdecode(np.frombuffer(frame_bytes, np.uint8), cv2.IMREAD_COLOR) if frame_bytes else None
+    if img is None:
+        return jsonify({'success': False, 'error': 'Não foi possível decodificar a foto. Envie uma imagem JPG ou PNG'}), 400
+
+    # Cada peça é carregada uma única vez, mesmo aparecendo em várias combinações
+    garments = {}
+    garment_pairs = []
+    for shirtno, pantno in combinations:
+        if (shirtno, pantno) not in garments:
+            garments[(shirtno, pantno)] = load_selected_garments(shirtno, pantno)
+        shirt, pant = garments[(shirtno, pantno)]
+        if shirt is None or pant is None:
+            return jsonify({'success': False, 'error': 'Não foi possível carregar as peças selecionadas'}), 500
+        garment_pairs.append((shirt, pant))
+
+    faces, images = render_batch(img, garment_pairs,
+                                 thumb_width=request.values.get('width', DEFAULT_THUMB_WIDTH, type=int),
+                                 blur=request.values.get('blur', '1') != '0')
+
+    if output == 'sheet':
+        sheet = contact_sheet(images, columns=request.values.get('columns', None, type=int))
+        ok, encoded = cv2.imencode('.jpg', sheet)
+        if not ok:
+            return jsonify({'success': False, 'error': 'Falha ao codificar a folha de contato'}), 500
+        return Response(encoded.tobytes(), mimetype='image/jpeg')
+
+    results = []
+    for (shirtno, pantno), image in zip(combinations, images):
+        ok, encoded = cv2.imencode('.jpg', image)
+        if not ok:
+            return jsonify({'success': False, 'error': 'Falha ao codificar as miniaturas'}), 500
+        results.append({
+            'shirt': shirtno,
+            'pant': pantno,
+            'image': 'data:image/jpeg;base64,' + base64.b64encode(encoded.tobytes()).decode('ascii')
+        })
 
-        face_cascade = cv2.CascadeClassifier(
-            'haarcascade_frontalface_default.xml')
+    return jsonify({'success': True, 'faces': len(faces), 'results': results})
 
-        ret, img = cap.read()
 
-        height = img.shape[0]
-        width = img.shape[1]
-        resizewidth = int(width*3/2)
-        resizeheight = int(height*3/2)
+def session_not_found():
+    return jsonify({'success': False, 'error': 'Sessão não encontrada ou expirada'}), 404
 
-        cv2.namedWindow("img", cv2.WINDOW_NORMAL)
-        cv2.resizeWindow("img", (int(width*3/2), int(height*3/2)))
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        faces = face_cascade.detectMultiScale(gray, 1.3, 5)
-
-        for (x, y, w, h) in faces:
-            cv2.rectangle(img, (x, y), (x+w, y+h), (255, 0, 0), 2)
-
-            # Processamento das calças
-            pantWidth = 3 * w
-            pantHeight = pantWidth * origpantHeight / origpantWidth
-
-            # Posicionamento padrão para calças
-            x1 = x - w
-            x2 = x1 + 3*w
-            y1 = y + 5*h
-            y2 = y + h*10
-
-            # Ajustar posição para calças específicas se necessário
-            if 'pant21.png' in pant_path:  # Calças azuis
-                x1 = x - w/2
-                x2 = x1 + 2*w
-                y1 = y + 4*h
-                y2 = y + h*9
-
-            # Verificações de limites
-            if x1 < 0:
-                x1 = 0
-            if x2 > img.shape[1]:
-                x2 = img.shape[1]
-            if y2 > img.shape[0]:
-                y2 = img.shape[0]
-            if y1 > img.shape[0]:
-                y1 = img.shape[0]
-            if y1 == y2:
-                y1 = 0
-
-            temp = 0
-            if y1 > y2:
-                temp = y1
-                y1 = y2
-                y2 = temp
-
-            pantWidth = int(abs(x2 - x1))
-            pantHeight = int(abs(y2 - y1))
-            x1 = int(x1)
-            x2 = int(x2)
-            y1 = int(y1)
-            y2 = int(y2)
-
-            pant = cv2.resize(imgpant, (pantWidth, pantHeight),
-                              interpolation=cv2.INTER_AREA)
-            mask = cv2.resize(orig_mask, (pantWidth, pantHeight),
-                              interpolation=cv2.INTER_AREA)
-            mask_inv = cv2.resize(
-                orig_mask_inv, (pantWidth, pantHeight), interpolation=cv2.INTER_AREA)
-
-            roi = img[y1:y2, x1:x2]
-
-            # Garantir que mask_inv tenha o tamanho e tipo corretos
-            if mask_inv.shape[:2] != roi.shape[:2]:
-                mask_inv = cv2.resize(
-                    mask_inv, (roi.shape[1], roi.shape[0]), interpolation=cv2.INTER_AREA)
-            if len(mask_inv.shape) > 2:
-                mask_inv = cv2.cvtColor(mask_inv, cv2.COLOR_BGR2GRAY)
-
-            roi_bg = cv2.bitwise_and(roi, roi, mask=mask_inv)
-
-            # Garantir que mask tenha o tamanho e tipo corretos
-            if mask.shape[:2] != pant.shape[:2]:
-                mask = cv2.resize(
-                    mask, (pant.shape[1], pant.shape[0]), interpolation=cv2.INTER_AREA)
-            if len(mask.shape) > 2:
-                mask = cv2.cvtColor(mask, cv2.COLOR_BGR2GRAY)
-
-            roi_fg = cv2.bitwise_and(pant, pant, mask=mask)
-
-            # Inicializar roi_fgs e roi_bgs
-            roi_fgs = roi_fg
-            roi_bgs = roi_bg
-
-            # Garantir que roi_fgs e roi_bgs tenham a mesma forma e canais
-            if roi_fgs.shape != roi_bgs.shape:
-                roi_fgs = cv2.resize(
-                    roi_fgs, (roi_bgs.shape[1], roi_bgs.shape[0]), interpolation=cv2.INTER_AREA)
-
-            # Certificar-se de que tenham o mesmo número de canais
-            if len(roi_fgs.shape) != len(roi_bgs.shape):
-                if len(roi_fgs.shape) > len(roi_bgs.shape):
-                    roi_bgs = cv2.cvtColor(roi_bgs, cv2.COLOR_GRAY2BGR)
-                else:
-                    roi_fgs = cv2.cvtColor(roi_fgs, cv2.COLOR_GRAY2BGR)
-
-            dsts = cv2.add(roi_bgs, roi_fgs)
-
-            # Aplicar efeito de desfoque ao resto da imagem
-            top = img[0:y, 0:resizewidth]
-            bottom = img[y+h:resizeheight, 0:resizewidth]
-            midleft = img[y:y+h, 0:x]
-            midright = img[y:y+h, x+w:resizewidth]
-            blurvalue = 5
-            top = cv2.GaussianBlur(top, (blurvalue, blurvalue), 0)
-            bottom = cv2.GaussianBlur(bottom, (blurvalue, blurvalue), 0)
-            midright = cv2.GaussianBlur(midright, (blurvalue, blurvalue), 0)
-            midleft = cv2.GaussianBlur(midleft, (blurvalue, blurvalue), 0)
-            img[0:y, 0:resizewidth] = top
-            img[y+h:resizeheight, 0:resizewidth] = bottom
-            img[y:y+h, 0:x] = midleft
-            img[y:y+h, x+w:resizewidth] = midright
-            img[y1:y2, x1:x2] = dsts
-
-            # Processamento da camisa
-            shirtWidth = 3 * w
-            shirtHeight = shirtWidth * origshirtHeight / origshirtWidth
-
-            x1s = x - w
-            x2s = x1s + 3*w
-            y1s = y + h
-            y2s = y1s + h*4
-
-            # Verificações de limites
-            if x1s < 0:
-                x1s = 0
-            if x2s > img.shape[1]:
-                x2s = img.shape[1]
-            if y2s > img.shape[0]:
-                y2s = img.shape[0]
-
-            temp = 0
-            if y1s > y2s:
-                temp = y1s
-                y1s = y2s
-                y2s = temp
-
-            shirtWidth = int(abs(x2s - x1s))
-            shirtHeight = int(abs(y2s - y1s))
-            y1s = int(y1s)
-            y2s = int(y2s)
-            x1s = int(x1s)
-            x2s = int(x2s)
-
-            shirt = cv2.resize(
-                imgshirt, (shirtWidth, shirtHeight), interpolation=cv2.INTER_AREA)
-            mask = cv2.resize(
-                orig_masks, (shirtWidth, shirtHeight), interpolation=cv2.INTER_AREA)
-            masks_inv = cv2.resize(
-                orig_masks_inv, (shirtWidth, shirtHeight), interpolation=cv2.INTER_AREA)
-
-            rois = img[y1s:y2s, x1s:x2s]
-
-            # Garantir que masks_inv tenha o tamanho e tipo corretos
-            if masks_inv.shape[:2] != rois.shape[:2]:
-                masks_inv = cv2.resize(
-                    masks_inv, (rois.shape[1], rois.shape[0]), interpolation=cv2.INTER_AREA)
-            if len(masks_inv.shape) > 2:
-                masks_inv = cv2.cvtColor(masks_inv, cv2.COLOR_BGR2GRAY)
-
-            roi_bgs = cv2.bitwise_and(rois, rois, mask=masks_inv)
-
-            # Garantir que mask tenha o tamanho e tipo corretos
-            if mask.shape[:2] != shirt.shape[:2]:
-                mask = cv2.resize(
-                    mask, (shirt.shape[1], shirt.shape[0]), interpolation=cv2.INTER_AREA)
-            if len(mask.shape) > 2:
-                mask = cv2.cvtColor(mask, cv2.COLOR_BGR2GRAY)
-
-            roi_fgs = cv2.bitwise_and(shirt, shirt, mask=mask)
-
-            # Garantir que roi_fgs e roi_bgs tenham a mesma forma e canais
-            if roi_fgs.shape != roi_bgs.shape:
-                roi_fgs = cv2.resize(
-                    roi_fgs, (roi_bgs.shape[1], roi_bgs.shape[0]), interpolation=cv2.INTER_AREA)
-
-            # Certificar-se de que tenham o mesmo número de canais
-            if len(roi_fgs.shape) != len(roi_bgs.shape):
-                if len(roi_fgs.shape) > len(roi_bgs.shape):
-                    roi_bgs = cv2.cvtColor(roi_bgs, cv2.COLOR_GRAY2BGR)
-                else:
-                    roi_fgs = cv2.cvtColor(roi_fgs, cv2.COLOR_GRAY2BGR)
 
-            dsts = cv2.add(roi_bgs, roi_fgs)
-            img[y1s:y2s, x1s:x2s] = dsts
+@app.route('/api/tryon/sessions', methods=['POST'])
+def create_tryon_session():
+    """
+    Abrir uma sessão de prova em tempo real.
 
-            break
+    O cliente envia quadros JPEG para /frames e recebe cada quadro composto na resposta,
+    ou acompanha /stream (MJPEG). O rastreador de rosto e o cache de peças redimensionadas
+    são mantidos entre os quadros da sessão.
+    """
+    try:
+        colors = requested_colors(request.values)
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Cor inválida. Use o formato #RRGGBB'}), 400
+    shirt, pant = load_selected_garments(request.values.get('shirt', '1'), request.values.get('pant', '1'), *colors)
+    if shirt is None or pant is None:
+        return jsonify({'success': False, 'error': 'Não foi possível carregar as peças selecionadas'}), 500
 
-        cv2.imshow("img", img)
-        if cv2.waitKey(100) == ord('q'):
-            break
+    try:
+        session = session_manager.create(
+            shirt, pant,
+            layers=load_layer_garments(request.values),
+            detect_interval=request.values.get('detect_interval', DEFAULT_DETECT_INTERVAL, type=int),
+            detect_max_side=request.values.get('detect_max_side', DEFAULT_DETECT_MAX_SIDE, type=int),
+            size_bucket=request.values.get('size_bucket', DEFAULT_SIZE_BUCKET, type=int),
+            blur=request.values.get('blur', '1') != '0',
+            jpeg_quality=request.values.get('quality', DEFAULT_JPEG_QUALITY, type=int),
+            target_fps=request.values.get('target_fps', DEFAULT_TARGET_FPS, type=float),
+            adaptive=request.values.get('adaptive', '1') != '0')
+    except SessionLimitError:
+        # Limite de sessões deste processo atingido; o cliente deve tentar novamente mais tarde
+        return jsonify({'success': False, 'error': 'Servidor ocupado. Tente novamente em instantes'}), 503
+
+    base_url = f'/api/tryon/sessions/{session.session_id}'
+    return jsonify({
+        'success': True,
+        'session_id': session.session_id,
+        'frames_url': f'{base_url}/frames',
+        'stream_url': f'{base_url}/stream'
+    }), 201
 
-    cap.release()
-    cv2.destroyAllWindows()
 
-    # Redirecionar de volta para o app React
-    return redirect('/')
+@app.route('/api/tryon/sessions/<session_id>/frames', methods=['POST'])
+def push_tryon_frame(session_id):
+    """
+    Compor um quadro da sessão. Se o quadro anterior ainda está sendo processado,
+    o novo é descartado (429) em vez de ficar na fila.
+    """
+    session = session_manager.get(session_id)
+    if session is None:
+        return session_not_found()
+
+    if 'frame' in request.files:
+        frame_bytes = request.files['frame'].read()
+    else:
+        frame_bytes = request.get_data()
+    if not frame_bytes:
+        return jsonify({'success': False, 'error': 'Nenhum quadro enviado'}), 400
+
+    try:
+        jpeg = session.process(frame_bytes)
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Não foi possível decodificar o quadro. Envie uma imagem JPG ou PNG'}), 400
+
+    if jpeg is None:
+        return jsonify({'success': False, 'dropped': True, 'error': 'Quadro descartado: o anterior ainda está em processamento'}), 429
+    return Response(jpeg, mimetype='image/jpeg')
+
+
+@app.route('/api/tryon/sessions/<session_id>/stream', methods=['GET'])
+def stream_tryon_session(session_id):
+    """
+    Transmitir os quadros compostos da sessão como MJPEG (multipart/x-mixed-replace)
+
+    A resposta ocupa uma thread enquanto o visualizador estiver conectado: o servidor
+    precisa de workers com threads (gunicorn --worker-class gthread, como em render.yaml
+    e no Procfile) para continuar recebendo os quadros em /frames e as demais requisições.
+    """
+    session = session_manager.get(session_id)
+    if session is None:
+        return session_not_found()
+
+    def frames():
+        seq = 0
+        while not session.closed:
+            seq, jpeg = session.wait_frame(seq, timeout=session_manager.idle_timeout)
+            if jpeg is None:
+                break
+            yield (b'--frame\r\nContent-Type: image/jpeg\r\n'
+                   b'Content-Length: ' + str(len(jpeg)).encode() + b'\r\n\r\n' + jpeg + b'\r\n')
+
+    return Response(frames(), mimetype='multipart/x-mixed-replace; boundary=frame')
+
+
+@app.route('/api/tryon/sessions/<session_id>', methods=['GET', 'PATCH', 'DELETE'])
+def tryon_session(session_id):
+    """
+    GET: estatísticas da sessão (FPS, quadros descartados, rastreamento)
+    PATCH: trocar a camisa, a calça, suas cores e/ou as camadas extras sem reabrir a sessão
+    DELETE: encerrar a sessão e liberar a vaga
+    """
+    if request.method == 'DELETE':
+        if session_manager.close(session_id) is None:
+            return session_not_found()
+        return jsonify({'success': True})
+
+    session = session_manager.get(session_id)
+    if session is None:
+        return session_not_found()
+
+    if request.method == 'PATCH':
+        try:
+            colors = requested_colors(request.values)
+        except ValueError:
+            return jsonify({'success': False, 'error': 'Cor inválida. Use o formato #RRGGBB'}), 400
+        shirt, pant = load_selected_garments(request.values.get('shirt', '1'), request.values.get('pant', '1'),
+                                             *colors)
+        layers_changed = any(kind in request.values for kind in LAYER_KINDS)
+        # As cores valem para as peças enviadas junto ("shirt_color" com "shirt")
+        session.set_garments(shirt=shirt if 'shirt' in request.values else None,
+                             pant=pant if 'pant' in request.values else None,
+                             layers=load_layer_garments(request.values) if layers_changed else None)
+
+    return jsonify({'success': True, 'data': session.stats()})
 
 # Adicionar endpoint da API para compatibilidade com frontend React
 
@@ -1245,6 +1985,7 @@ def skin_tone_analysis():
             'colors': dominant_colors[:3],  # Top 3 cores dominantes
             'description': season_data['description'],
             'recommendedColors': season_data['colors'],
+            'recommendedShirts': palette_variants(season_data['colors']),
             'reportImage': report_image_url,
             'fullReport': full_report_image_url  # Nova imagem de relatório completo
         })
@@ -1260,6 +2001,7 @@ def skin_tone_analysis():
             'colors': ['#E6B76D', '#D99559', '#C27A46'],
             'description': 'Análise baseada em dados de fallback. Sua pele parece ter tons quentes com profundidade média. Cores que complementam tons médios quentes incluem tons terrosos, verdes quentes e tons coral. Análise alimentada pela tecnologia de IA SkinToneClassifier.',
             'recommendedColors': ['#8B5A2B', '#F4A460', '#CD853F', '#006400', '#FF7F50'],
+            'recommendedShirts': palette_variants(['#8B5A2B', '#F4A460', '#CD853F', '#006400', '#FF7F50']),
             # Fornecer uma imagem de relatório de fallback
             'reportImage': '/static/assets/fallback_report.jpg',
             # Fallback para relatório completo
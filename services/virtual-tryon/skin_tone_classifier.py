@@ -1,6 +1,8 @@
 import cv2
 import numpy as np
 
+from tryon.detection import detect_faces_gray
+
 class SkinToneClassifier:
     @staticmethod
     def analyze(image_path, tone_palette="perla", n_dominant_colors=3, return_report_image=True):
@@ -16,12 +18,10 @@ class SkinToneClassifier:
             # Convert to RGB
             img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
 
-            # Load face cascade classifier
-            face_cascade = cv2.CascadeClassifier('haarcascade_frontalface_default.xml')
-            
             # Convert to grayscale for face detection
             gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-            faces = face_cascade.detectMultiScale(gray, 1.3, 5)
+            # Detect on a downscaled copy; boxes come back in full resolution
+            faces = detect_faces_gray(gray)
 
             if len(faces) == 0:
                 return {'faces': []}
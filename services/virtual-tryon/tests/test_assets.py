@@ -0,0 +1,78 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import cv2
+import numpy as np
+
+from tryon.assets import GarmentAssetCache, ScaledGarmentCache
+from tryon.compositor import Garment
+
+
+class TestGarmentAssetCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, "shirt.png")
+        cv2.imwrite(self.path, np.full((40, 30, 3), 200, dtype=np.uint8))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_hit_returns_same_garment(self):
+        cache = GarmentAssetCache()
+        first = cache.get("shirts", "1", self.path, "shirt")
+        second = cache.get("shirts", "1", self.path, "shirt")
+        self.assertIs(first, second)
+        self.assertEqual(cache.stats()["hits"], 1)
+        self.assertAlmostEqual(first.aspect_ratio, 30 / 40)
+
+    def test_changed_file_is_reloaded(self):
+        cache = GarmentAssetCache()
+        first = cache.get("shirts", "1", self.path, "shirt")
+        cv2.imwrite(self.path, np.full((20, 20, 3), 10, dtype=np.uint8))
+        os.utime(self.path, (0, os.path.getmtime(self.path) + 10))
+        second = cache.get("shirts", "1", self.path, "shirt")
+        self.assertIsNot(first, second)
+        self.assertEqual(second.width, 20)
+
+    def test_byte_budget_evicts_least_recently_used(self):
+        garment_bytes = 40 * 30 * 9
+        cache = GarmentAssetCache(max_bytes=2 * garment_bytes)
+        cache.get("shirts", "1", self.path, "shirt")
+        cache.get("shirts", "2", self.path, "shirt")
+        cache.get("shirts", "1", self.path, "shirt")
+        cache.get("shirts", "3", self.path, "shirt")
+        stats = cache.stats()
+        self.assertEqual(stats["entries"], 2)
+        self.assertEqual(stats["evictions"], 1)
+        cache.get("shirts", "1", self.path, "shirt")
+        self.assertEqual(cache.stats()["hits"], 2)
+
+    def test_invalidate(self):
+        cache = GarmentAssetCache()
+        cache.get("shirts", "1", self.path, "shirt")
+        cache.invalidate("shirts", "1")
+        self.assertEqual(cache.stats()["entries"], 0)
+
+
+class TestScaledGarmentCache(unittest.TestCase):
+    def setUp(self):
+        image = np.full((40, 30, 3), 200, dtype=np.uint8)
+        mask = np.full((40, 30), 255, dtype=np.uint8)
+        self.garment = Garment("shirt.png", image, mask, cv2.bitwise_not(mask))
+
+    def test_nearby_sizes_share_a_bucket(self):
+        cache = ScaledGarmentCache(bucket=8)
+        color, inv_alpha = cache.get(self.garment, 97, 130)
+        self.assertEqual(color.shape[:2], (128, 96))
+        self.assertIs(cache.get(self.garment, 99, 127)[0], color)
+        self.assertEqual(cache.stats()["hit_rate"], 0.5)
+
+    def test_lru_limit(self):
+        cache = ScaledGarmentCache(bucket=8, max_entries=2)
+        for width in (40, 80, 120):
+            cache.get(self.garment, width, width)
+        self.assertEqual(cache.stats()["entries"], 2)
+        cache.get(self.garment, 40, 40)
+        self.assertEqual(cache.stats()["misses"], 4)
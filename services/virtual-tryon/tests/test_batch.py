@@ -0,0 +1,77 @@
+import json
+import unittest
+from io import BytesIO
+from unittest import mock
+
+import cv2
+import numpy as np
+
+import flasktry
+from tests.test_compositor import solid_garment
+from tryon.batch import contact_sheet, render_batch
+
+
+class TestRenderBatch(unittest.TestCase):
+    def setUp(self):
+        self.img = np.full((480, 640, 3), 90, dtype=np.uint8)
+        self.face = (280, 60, 80, 80)
+        self.red = solid_garment("shirt1.png", (0, 0, 255))
+        self.green = solid_garment("shirt2.png", (0, 255, 0))
+        self.pant = solid_garment("pant7.jpg", (255, 0, 0))
+
+    def test_detects_once_and_keeps_order(self):
+        with mock.patch("tryon.batch.detect_faces", return_value=[self.face]) as detect:
+            faces, images = render_batch(self.img, [(self.red, self.pant), (self.green, self.pant)] * 3,
+                                         thumb_width=0, max_workers=4, blur=False)
+        detect.assert_called_once()
+        self.assertEqual(faces, [self.face])
+        self.assertEqual(len(images), 6)
+        # Shirt region starts one face height below the face
+        for index, image in enumerate(images):
+            expected = (0, 0, 255) if index % 2 == 0 else (0, 255, 0)
+            self.assertEqual(tuple(image[200, 320]), expected)
+        # The source photo is not modified
+        self.assertTrue((self.img == 90).all())
+
+    def test_thumbnails_keep_aspect_ratio(self):
+        _, images = render_batch(self.img, [(self.red, self.pant)], thumb_width=160, faces=[self.face])
+        self.assertEqual(images[0].shape, (120, 160, 3))
+
+    def test_contact_sheet_grid(self):
+        tiles = [np.zeros((30, 40, 3), dtype=np.uint8)] * 5
+        sheet = contact_sheet(tiles, columns=3, padding=2)
+        self.assertEqual(sheet.shape, (2 * 32 + 2, 3 * 42 + 2, 3))
+        self.assertEqual(tuple(sheet[0, 0]), (255, 255, 255))
+        self.assertEqual(tuple(sheet[2, 2]), (0, 0, 0))
+
+
+class TestBatchEndpoint(unittest.TestCase):
+    def setUp(self):
+        self.client = flasktry.app.test_client()
+        frame = np.full((240, 320, 3), 120, dtype=np.uint8)
+        self.frame_bytes = cv2.imencode(".jpg", frame)[1].tobytes()
+
+    def post(self, **fields):
+        data = {"frame": (BytesIO(self.frame_bytes), "photo.jpg")}
+        data.update(fields)
+        return self.client.post("/api/tryon/batch", data=data, content_type="multipart/form-data")
+
+    def test_thumbnails(self):
+        response = self.post(pairs=json.dumps([[1, 1], {"shirt": 2, "pant": 2}]), width="80")
+        self.assertEqual(response.status_code, 200)
+        results = response.get_json()["results"]
+        self.assertEqual([(r["shirt"], r["pant"]) for r in results], [("1", "1"), ("2", "2")])
+        self.assertTrue(results[0]["image"].startswith("data:image/jpeg;base64,"))
+
+    def test_contact_sheet(self):
+        response = self.post(pairs=json.dumps([[1, 1], [2, 1], [1, 2]]), output="sheet", width="80")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, "image/jpeg")
+
+    def test_rejects_bad_pairs(self):
+        self.assertEqual(self.post(pairs="not json").status_code, 400)
+        self.assertEqual(self.post(pairs="[]").status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
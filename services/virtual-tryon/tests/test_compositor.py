@@ -0,0 +1,93 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import cv2
+import numpy as np
+
+import flasktry
+from tryon.compositor import Garment, composite_garment, load_garment, shirt_region, render_tryon
+from tryon.placement import default_placement
+from tryon.recolor import recolor_garment
+from tryon.result_cache import TryOnResultCache
+
+
+def solid_garment(path, color, size=(40, 30)):
+    image = np.full((size[0], size[1], 3), color, dtype=np.uint8)
+    mask = np.full(size, 255, dtype=np.uint8)
+    return Garment(path, image, mask, cv2.bitwise_not(mask))
+
+
+class TestCompositor(unittest.TestCase):
+    def setUp(self):
+        self.frame = np.full((480, 640, 3), 90, dtype=np.uint8)
+        self.face = (280, 60, 80, 80)
+        self.shirt = solid_garment("shirt1.png", (0, 0, 255))
+        self.pant = solid_garment("pant7.jpg", (255, 0, 0))
+
+    def test_composite_clips_to_frame(self):
+        bgra = np.full((50, 60, 4), 255, dtype=np.uint8)
+        written = composite_garment(self.frame, bgra, -20, 450)
+        self.assertEqual(written, (0, 450, 40, 480))
+        self.assertTrue((self.frame[450:, :40] == 255).all())
+        self.assertTrue((self.frame[:450] == 90).all())
+        self.assertIsNone(composite_garment(self.frame, bgra, 700, 0))
+
+    def test_composite_blends_soft_alpha(self):
+        bgra = np.zeros((10, 10, 4), dtype=np.uint8)
+        bgra[:, :, 2] = 250
+        bgra[:, :5, 3] = 255
+        bgra[:, 5:, 3] = 128
+        composite_garment(self.frame, bgra, 0, 0)
+        np.testing.assert_array_equal(self.frame[0, 0], [0, 0, 250])
+        np.testing.assert_allclose(self.frame[0, 9], [45, 45, 170], atol=2)
+        np.testing.assert_array_equal(self.frame[0, 10], [90, 90, 90])
+
+    def test_placement_feather_softens_edges(self):
+        image = np.zeros((40, 30, 4), dtype=np.uint8)
+        image[10:30, 5:25] = (0, 0, 255, 255)
+        placement = default_placement("shirt")
+        placement["mask"] = {"source": "alpha", "threshold": 127, "invert": False}
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "shirt.png")
+            cv2.imwrite(path, image)
+            hard = load_garment(path, "shirt", placement=placement)
+            soft = load_garment(path, "shirt", placement=dict(placement, feather=3))
+
+        self.assertEqual(set(np.unique(hard.bgra[:, :, 3])), {0, 255})
+        self.assertTrue(0 < soft.bgra[10, 15, 3] < 255)
+        self.assertEqual(soft.bgra[20, 15, 3], 255)
+        # Recolored variants keep the soft edges
+        self.assertTrue(np.array_equal(recolor_garment(soft, "#00FF00").bgra[:, :, 3], soft.bgra[:, :, 3]))
+
+    def test_render_places_shirt_below_face(self):
+        img = render_tryon(self.frame.copy(), self.shirt, self.pant, faces=[self.face], draw_face=False)
+        x1, y1, x2, y2 = shirt_region(self.face)
+        np.testing.assert_array_equal(img[y1 + 5, x1 + 5], [0, 0, 255])
+
+    def test_render_without_faces_keeps_frame(self):
+        img = render_tryon(self.frame.copy(), self.shirt, self.pant, faces=[])
+        np.testing.assert_array_equal(img, self.frame)
+
+
+class TestRenderEndpoint(unittest.TestCase):
+    def setUp(self):
+        self.client = flasktry.app.test_client()
+        patcher = mock.patch.object(flasktry, "result_cache", TryOnResultCache())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        frame = np.full((240, 320, 3), 120, dtype=np.uint8)
+        self.frame_bytes = cv2.imencode(".jpg", frame)[1].tobytes()
+
+    def test_render_returns_jpeg(self):
+        response = self.client.post("/api/tryon/render?shirt=1&pant=1", data=self.frame_bytes)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, "image/jpeg")
+        img = cv2.imdecode(np.frombuffer(response.data, np.uint8), cv2.IMREAD_COLOR)
+        self.assertEqual(img.shape, (240, 320, 3))
+
+    def test_render_rejects_invalid_frame(self):
+        response = self.client.post("/api/tryon/render", data=b"not an image")
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(response.get_json()["success"])
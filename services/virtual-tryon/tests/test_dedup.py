@@ -0,0 +1,66 @@
+import hashlib
+import threading
+import unittest
+from io import BytesIO
+
+from tryon.dedup import UploadAssetRegistry, read_upload
+
+
+class TestReadUpload(unittest.TestCase):
+    def test_hashes_while_reading(self):
+        payload = bytes(range(256)) * 1000
+        data, digest = read_upload(BytesIO(payload), chunk_size=4096)
+        self.assertEqual(bytes(data), payload)
+        self.assertEqual(digest, hashlib.sha256(payload).hexdigest())
+        self.assertEqual(read_upload(BytesIO(b""))[1], hashlib.sha256(b"").hexdigest())
+
+
+class TestUploadAssetRegistry(unittest.TestCase):
+    def setUp(self):
+        self.asset = {"image": "/static/user-uploads/processed_shirt_a.png", "derivatives": {},
+                      "kind": "shirt", "placement": {"z": 20}}
+
+    def test_reference_counts(self):
+        registry = UploadAssetRegistry()
+        self.assertIsNone(registry.get("abc"))
+        registry.add_reference("abc", self.asset)
+        registry.add_reference("abc", self.asset)
+        self.assertEqual(registry.get("abc"), self.asset)
+        self.assertEqual(registry.references("abc"), 2)
+
+        self.assertIsNone(registry.release("abc"))
+        self.assertEqual(registry.release("abc"), self.asset)
+        self.assertIsNone(registry.get("abc"))
+        self.assertIsNone(registry.release("abc"))
+        self.assertEqual(registry.stats(), {"assets": 0, "references": 0, "hits": 1})
+
+    def test_lock_outlives_release_while_in_use(self):
+        registry = UploadAssetRegistry()
+        registry.add_reference("abc", self.asset)
+        acquired = threading.Event()
+
+        def ingest():
+            with registry.lock("abc"):
+                acquired.set()
+
+        with registry.lock("abc"):
+            # Deleting the last item releases the asset while its hash is still locked
+            self.assertEqual(registry.release("abc"), self.asset)
+            waiter = threading.Thread(target=ingest)
+            waiter.start()
+            self.assertFalse(acquired.wait(0.1))
+        waiter.join(5)
+        self.assertTrue(acquired.is_set())
+        self.assertEqual(registry._digest_locks, {})
+
+    def test_rebuilt_from_catalog(self):
+        item = {"id": "1", "image": self.asset["image"], "placement": {"z": 20}, "content_hash": "abc"}
+        catalog = {"shirts": [item, dict(item, id="2")], "pants": [{"id": "1", "image": "/static/assets/pant7.jpg"}]}
+        registry = UploadAssetRegistry()
+        registry.rebuild(catalog)
+        self.assertEqual(registry.references("abc"), 2)
+        self.assertEqual(registry.get("abc")["kind"], "shirt")
+
+
+if __name__ == "__main__":
+    unittest.main()
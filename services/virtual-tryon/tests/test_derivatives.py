@@ -0,0 +1,74 @@
+import os
+import tempfile
+import unittest
+
+import cv2
+import numpy as np
+
+from tryon.compositor import load_garment
+from tryon.derivatives import derivative_path, load_mask, thumbnail, write_derivatives
+from tryon.placement import build_masks, garment_placement
+
+
+class TestDerivatives(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        # A processed upload: a red garment on a transparent background
+        self.bgra = np.zeros((600, 400, 4), dtype=np.uint8)
+        self.bgra[100:500, 50:350] = (40, 40, 200, 255)
+        self.path = os.path.join(self.tmp.name, "processed_shirt_1.png")
+        cv2.imwrite(self.path, self.bgra)
+        self.placement = garment_placement(self.bgra, "shirt")
+        self.mask, _ = build_masks(self.bgra, self.placement["mask"])
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_written_once_per_upload(self):
+        filenames = write_derivatives(self.bgra, self.mask, self.tmp.name, "shirt_1")
+        self.assertEqual(filenames, {"thumbnail": "thumb_shirt_1.webp", "webp": "display_shirt_1.webp",
+                                     "mask": "mask_shirt_1.npy"})
+
+        thumb = cv2.imread(os.path.join(self.tmp.name, filenames["thumbnail"]), cv2.IMREAD_UNCHANGED)
+        self.assertEqual(thumb.shape, (256, 171, 4))
+        display = cv2.imread(os.path.join(self.tmp.name, filenames["webp"]), cv2.IMREAD_UNCHANGED)
+        self.assertEqual(display.shape, (600, 400, 4))
+        self.assertEqual(display[300, 200, 3], 255)
+        self.assertEqual(display[20, 20, 3], 0)
+
+        mask = load_mask(os.path.join(self.tmp.name, filenames["mask"]))
+        self.assertIsInstance(mask, np.memmap)
+        self.assertTrue(np.array_equal(mask, self.mask))
+
+    def test_small_images_not_enlarged(self):
+        image = np.zeros((100, 80, 4), dtype=np.uint8)
+        self.assertIs(thumbnail(image), image)
+
+    def test_load_garment_maps_the_mask(self):
+        filenames = write_derivatives(self.bgra, self.mask, self.tmp.name, "shirt_1")
+        mask_path = os.path.join(self.tmp.name, filenames["mask"])
+        garment = load_garment(self.path, "shirt", placement=self.placement, mask_path=mask_path)
+        self.assertIsInstance(garment.mask, np.memmap)
+        self.assertTrue(np.array_equal(garment.mask, self.mask))
+        self.assertEqual(garment.bgra[300, 200, 3], 255)
+        self.assertEqual(garment.bgra[20, 20, 3], 0)
+
+    def test_missing_or_stale_mask_falls_back_to_the_image(self):
+        missing = load_garment(self.path, "shirt", placement=self.placement,
+                               mask_path=os.path.join(self.tmp.name, "mask_missing.npy"))
+        self.assertTrue(np.array_equal(missing.mask, self.mask))
+
+        stale_path = os.path.join(self.tmp.name, "mask_stale.npy")
+        np.save(stale_path, np.zeros((10, 10), dtype=np.uint8))
+        stale = load_garment(self.path, "shirt", placement=self.placement, mask_path=stale_path)
+        self.assertTrue(np.array_equal(stale.mask, self.mask))
+
+    def test_derivative_path(self):
+        item = {"derivatives": {"mask": "/static/user-uploads/mask_shirt_1.npy"}}
+        self.assertEqual(derivative_path(item, "mask", "/app"), "/app/static/user-uploads/mask_shirt_1.npy")
+        self.assertIsNone(derivative_path(item, "thumbnail", "/app"))
+        self.assertIsNone(derivative_path({}, "mask", "/app"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,46 @@
+import threading
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from tryon.detection import FaceDetectorRegistry, detection_scale, detect_faces_gray
+
+
+class TestFaceDetectorRegistry(unittest.TestCase):
+    def test_loads_once_per_thread(self):
+        registry = FaceDetectorRegistry()
+        self.assertIs(registry.get(), registry.get())
+        self.assertEqual(registry.stats()["loads"], 1)
+
+        thread = threading.Thread(target=registry.get)
+        thread.start()
+        thread.join()
+        self.assertEqual(registry.stats()["loads"], 2)
+
+    def test_missing_cascade_raises(self):
+        with self.assertRaises(IOError):
+            FaceDetectorRegistry().get("/nonexistent/cascade.xml")
+
+
+class TestDownscaledDetection(unittest.TestCase):
+    def test_small_images_are_not_scaled(self):
+        self.assertEqual(detection_scale((240, 320), (24, 24)), 1.0)
+
+    def test_scale_fits_max_side(self):
+        self.assertAlmostEqual(detection_scale((3000, 4000), (24, 24), min_face_size=400), 320 / 4000)
+
+    def test_min_face_size_limits_scale(self):
+        self.assertAlmostEqual(detection_scale((3000, 4000), (24, 24), min_face_size=120), 24 / 120)
+
+    def test_boxes_are_mapped_to_full_resolution(self):
+        cascade = mock.Mock()
+        cascade.getOriginalWindowSize.return_value = (24, 24)
+        cascade.detectMultiScale.return_value = np.array([[40, 20, 50, 50]])
+        gray = np.zeros((1200, 1600), dtype=np.uint8)
+        with mock.patch("tryon.detection.get_face_cascade", return_value=cascade):
+            faces = detect_faces_gray(gray, max_side=320, min_face_size=200)
+
+        small = cascade.detectMultiScale.call_args[0][0]
+        self.assertEqual(small.shape, (240, 320))
+        np.testing.assert_array_equal(faces, [[200, 100, 250, 250]])
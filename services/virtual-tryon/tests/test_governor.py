@@ -0,0 +1,66 @@
+import unittest
+
+import numpy as np
+
+from tryon.governor import MIN_JPEG_QUALITY, MIN_OUTPUT_SCALE, FrameGovernor
+
+
+def run_frames(governor, count, stage_ms, frame_ms):
+    """
+    Feed synthetic timings without sleeping
+    """
+    for _ in range(count):
+        governor.begin_frame()
+        for name, ms in stage_ms.items():
+            governor._record(name, ms)
+        governor._frame_start -= frame_ms / 1000
+        governor.end_frame()
+
+
+class TestFrameGovernor(unittest.TestCase):
+    def test_degrades_knob_of_most_expensive_stage(self):
+        governor = FrameGovernor(target_fps=20, detect_interval=5, cooldown=5)
+        run_frames(governor, 5, {'detect': 10, 'composite': 60, 'encode': 5}, frame_ms=80)
+        self.assertEqual(governor.scale, 0.875)
+        self.assertEqual(governor.detect_interval, 5)
+        decision = governor.stats()['decisions'][-1]
+        self.assertEqual((decision['action'], decision['setting']), ('degrade', 'scale'))
+
+    def test_falls_back_when_knob_is_at_its_limit(self):
+        governor = FrameGovernor(target_fps=20, cooldown=1)
+        run_frames(governor, 50, {'encode': 60, 'composite': 1}, frame_ms=80)
+        self.assertEqual(governor.jpeg_quality, MIN_JPEG_QUALITY)
+        self.assertEqual(governor.scale, MIN_OUTPUT_SCALE)
+
+    def test_relaxes_in_reverse_order_and_stops_at_baseline(self):
+        governor = FrameGovernor(target_fps=20, detect_interval=4, jpeg_quality=80, cooldown=1, smoothing=1.0)
+        run_frames(governor, 1, {'detect': 60}, frame_ms=80)
+        run_frames(governor, 1, {'detect': 1, 'encode': 60}, frame_ms=80)
+        self.assertEqual((governor.detect_interval, governor.jpeg_quality), (8, 70))
+
+        run_frames(governor, 1, {}, frame_ms=10)
+        self.assertEqual((governor.detect_interval, governor.jpeg_quality), (8, 80))
+        run_frames(governor, 5, {}, frame_ms=10)
+        self.assertEqual((governor.detect_interval, governor.jpeg_quality), (4, 80))
+
+    def test_fixed_governor_only_measures(self):
+        governor = FrameGovernor(target_fps=20, cooldown=1, adaptive=False)
+        run_frames(governor, 10, {'composite': 100}, frame_ms=120)
+        self.assertEqual(governor.scale, 1.0)
+        self.assertEqual(governor.stats()['over_budget'], 10)
+        self.assertEqual(governor.wait_ms(), 1)
+
+    def test_wait_fills_remaining_budget(self):
+        governor = FrameGovernor(target_fps=10)
+        run_frames(governor, 1, {}, frame_ms=30)
+        self.assertAlmostEqual(governor.wait_ms(), 70, delta=2)
+
+    def test_resize_scales_frame_and_boxes(self):
+        governor = FrameGovernor()
+        governor.scale = 0.5
+        self.assertEqual(governor.resize(np.zeros((100, 200, 3), np.uint8)).shape, (50, 100, 3))
+        self.assertEqual(governor.scale_boxes([(10, 20, 30, 40)]), [(5, 10, 15, 20)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from tests.test_compositor import solid_garment
+from tryon.compositor import composite_waves, render_tryon, shirt_region
+
+
+class TestGroupTryOn(unittest.TestCase):
+    def setUp(self):
+        self.frame = np.full((480, 960, 3), 90, dtype=np.uint8)
+        self.red = solid_garment("shirt1.png", (0, 0, 255))
+        self.green = solid_garment("shirt2.png", (0, 255, 0))
+        self.pant = solid_garment("pant7.jpg", (255, 0, 0))
+
+    def test_waves_respect_overlaps(self):
+        footprints = [(0, 0, 10, 10), (20, 0, 30, 10), (5, 5, 25, 15), (40, 0, 50, 10)]
+        self.assertEqual(composite_waves(footprints), [[0, 1, 3], [2]])
+        self.assertEqual(composite_waves([]), [])
+
+    def test_first_face_only_by_default(self):
+        faces = [(100, 20, 40, 40), (700, 20, 40, 40)]
+        img = render_tryon(self.frame.copy(), self.red, self.pant, faces=faces, draw_face=False, blur=False)
+        x1, y1, _, _ = shirt_region(faces[1])
+        np.testing.assert_array_equal(img[y1 + 5, x1 + 5], [90, 90, 90])
+
+    def test_outfits_assigned_left_to_right(self):
+        faces = [(700, 20, 40, 40), (100, 20, 40, 40)]
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            img = render_tryon(self.frame.copy(), self.red, self.pant, faces=faces, draw_face=False, blur=False,
+                               max_faces=2, outfits=[(self.red, self.pant), (self.green, self.pant)],
+                               executor=executor)
+        left = shirt_region(faces[1])
+        right = shirt_region(faces[0])
+        np.testing.assert_array_equal(img[left[1] + 5, left[0] + 5], [0, 0, 255])
+        np.testing.assert_array_equal(img[right[1] + 5, right[0] + 5], [0, 255, 0])
+
+    def test_larger_face_is_drawn_on_top(self):
+        near = (200, 20, 80, 80)
+        far = (260, 60, 40, 40)
+        img = render_tryon(self.frame.copy(), self.red, self.pant, faces=[near, far], draw_face=False, blur=False,
+                           max_faces=2, outfits=[(self.red, self.pant), (self.green, self.pant)])
+        # The far face's shirt overlaps the near face's shirt, which stays in front
+        x1, y1, _, _ = shirt_region(far)
+        np.testing.assert_array_equal(img[y1 + 5, x1 + 5], [0, 0, 255])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,228 @@
+import os
+import tempfile
+import threading
+import unittest
+from io import BytesIO
+from unittest import mock
+
+import cv2
+import numpy as np
+
+import flasktry
+from tryon.dedup import UploadAssetRegistry
+from tryon.detection import SERVICE_ROOT
+from tryon.ingest import DONE, FAILED, IngestionQueue, QueueFullError
+from tryon.result_cache import TryOnResultCache
+
+
+class TestIngestionQueue(unittest.TestCase):
+    def test_result_and_failure(self):
+        def process(value):
+            if value < 0:
+                raise ValueError("negative")
+            return value * 2
+
+        queue = IngestionQueue(process, max_workers=1)
+        done, failed = queue.submit(3), queue.submit(-1)
+        self.assertEqual(queue.wait(done, timeout=5)["result"], 6)
+        job = queue.wait(failed, timeout=5)
+        self.assertEqual((job["status"], job["error"]), (FAILED, "negative"))
+        stats = queue.stats()
+        self.assertEqual((stats["completed"], stats["failed"], stats["depth"]), (1, 1, 0))
+        self.assertIsNotNone(stats["processing_ms"]["p95"])
+        queue.shutdown()
+
+    def test_bounded_pending_jobs(self):
+        release = threading.Event()
+        queue = IngestionQueue(lambda _: release.wait(5), max_workers=1, max_pending=2)
+        first, second = queue.submit(None), queue.submit(None)
+        with self.assertRaises(QueueFullError):
+            queue.submit(None)
+        self.assertEqual(queue.stats()["rejected"], 1)
+        self.assertEqual(queue.stats()["depth"] + queue.stats()["processing"], 2)
+
+        release.set()
+        self.assertEqual(queue.wait(second, timeout=5)["status"], DONE)
+        self.assertEqual(queue.get(first)["status"], DONE)
+        self.assertIsNone(queue.get("unknown"))
+        queue.shutdown()
+
+
+class TestRemoveBackground(unittest.TestCase):
+    def test_in_memory_alpha(self):
+        image = np.full((120, 90, 3), 255, dtype=np.uint8)
+        image[20:100, 20:70] = (40, 40, 160)
+        bgra = flasktry.remove_background(flasktry.decode_upload(cv2.imencode(".jpg", image)[1].tobytes()))
+        self.assertEqual(bgra.shape, (120, 90, 4))
+        self.assertEqual(bgra[60, 45, 3], 255)
+        self.assertEqual(bgra[5, 5, 3], 0)
+        self.assertIsNone(flasktry.decode_upload(b"not an image"))
+        self.assertIsNone(flasktry.remove_background(None))
+
+    def test_downscaled_mask_matches_full_resolution(self):
+        # A textured garment with a light print and a thin strap on a noisy white background
+        rng = np.random.default_rng(0)
+        image = np.clip(248 + rng.integers(-8, 9, (1200, 1600, 3)), 0, 255).astype(np.uint8)
+        outline = np.array([(480, 120), (1120, 120), (1470, 360), (1280, 560), (1200, 1110), (400, 1110),
+                            (320, 560), (130, 360)], dtype=np.int32)
+        cv2.fillPoly(image, [outline], (150, 90, 40))
+        stripes = (np.arange(1600) % 14).astype(np.uint8)[:, None]
+        image = np.where(image < 200, image + stripes, image)
+        cv2.circle(image, (700, 300), 60, (250, 250, 250), -1)
+        cv2.line(image, (1470, 360), (1560, 60), (150, 90, 40), 6)
+
+        full = flasktry.remove_background(image, max_side=0)[:, :, 3] > 0
+        downscaled = flasktry.remove_background(image, max_side=400)[:, :, 3] > 0
+        iou = np.logical_and(full, downscaled).sum() / np.logical_or(full, downscaled).sum()
+        self.assertGreater(iou, 0.99)
+        # The strap is thinner than the morphology kernel at the reduced size but survives at full size
+        self.assertTrue(full[200, 1518] and downscaled[200, 1518])
+
+    def test_garment_filling_the_frame(self):
+        # Downscaled, the silhouette covers every pixel and leaves no band around its contour
+        image = np.full((1500, 1200, 3), (40, 40, 160), dtype=np.uint8)
+        bgra = flasktry.remove_background(image, max_side=400)
+        self.assertIsNotNone(bgra)
+        self.assertTrue((bgra[:, :, 3] == 255).all())
+
+    def test_upscaled_catalog_asset_through_both_paths(self):
+        image = cv2.imread(os.path.join(SERVICE_ROOT, "static", "assets", "shirt51.jpg"))
+        image = cv2.resize(image, None, fx=3, fy=3, interpolation=cv2.INTER_CUBIC)
+        full = flasktry.remove_background(image, max_side=0)
+        downscaled = flasktry.remove_background(image)
+        self.assertIsNotNone(full)
+        self.assertIsNotNone(downscaled)
+        full, downscaled = full[:, :, 3] > 0, downscaled[:, :, 3] > 0
+        iou = np.logical_and(full, downscaled).sum() / np.logical_or(full, downscaled).sum()
+        self.assertGreater(iou, 0.99)
+
+
+class TestUploadEndpoint(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        catalog_path = os.path.join(self.tmp.name, "catalog.json")
+        uploads = os.path.join(self.tmp.name, "uploads")
+        os.makedirs(uploads)
+        self.uploads = uploads
+        for name, value in (("CATALOG_FILE", catalog_path), ("USER_UPLOADS_DIR", "uploads"),
+                            ("result_cache", TryOnResultCache()), ("upload_assets", UploadAssetRegistry())):
+            patcher = mock.patch.object(flasktry, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        # Uploads are written under the application root, as their catalog URLs are
+        patcher = mock.patch.object(flasktry.app, "root_path", self.tmp.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        flasktry.save_catalog({"shirts": [], "pants": []})
+        self.client = flasktry.app.test_client()
+
+        image = np.full((120, 90, 3), 255, dtype=np.uint8)
+        image[20:100, 20:70] = (40, 40, 160)
+        self.image_bytes = cv2.imencode(".png", image)[1].tobytes()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_upload_returns_job_and_adds_item_when_done(self):
+        response = self.client.post("/api/catalog/upload", content_type="multipart/form-data", data={
+            "file": (BytesIO(self.image_bytes), "shirt.png"), "type": "jacket", "name": "Jaqueta"})
+        self.assertEqual(response.status_code, 202)
+        job_id = response.get_json()["job_id"]
+
+        flasktry.upload_queue.wait(job_id, timeout=10)
+        status = self.client.get(f"/api/catalog/upload/{job_id}").get_json()
+        self.assertEqual(status["status"], "done")
+        self.assertEqual(status["item"]["name"], "Jaqueta")
+        self.assertEqual([item["name"] for item in flasktry.load_catalog()["jackets"]], ["Jaqueta"])
+        self.assertEqual(self.client.get("/api/catalog/upload/unknown").status_code, 404)
+
+        # Only the processed PNG and its derivatives reach the disk; the PNG keeps its alpha channel
+        files = sorted(os.listdir(self.uploads))
+        self.assertEqual([name.split("_")[0] for name in files], ["display", "mask", "processed", "thumb"])
+        self.assertTrue(files[2].startswith("processed_jacket_") and files[2].endswith(".png"))
+        processed = cv2.imread(os.path.join(self.uploads, files[2]), cv2.IMREAD_UNCHANGED)
+        self.assertEqual(processed.shape[2], 4)
+        self.assertEqual(status["item"]["placement"]["mask"]["source"], "alpha")
+
+        derivatives = status["item"]["derivatives"]
+        self.assertEqual(sorted(os.path.basename(url) for url in derivatives.values()),
+                         [files[0], files[1], files[3]])
+        mask = np.load(os.path.join(self.uploads, os.path.basename(derivatives["mask"])))
+        self.assertTrue(np.array_equal(mask > 0, processed[:, :, 3] > 127))
+
+    def upload(self, item_type, name):
+        response = self.client.post("/api/catalog/upload", content_type="multipart/form-data", data={
+            "file": (BytesIO(self.image_bytes), f"{name}.png"), "type": item_type, "name": name})
+        flasktry.upload_queue.wait(response.get_json()["job_id"], timeout=10)
+        return self.client.get(response.get_json()["status_url"]).get_json()
+
+    def test_duplicate_uploads_share_the_processed_asset(self):
+        first, second = self.upload("jacket", "Primeira"), self.upload("jacket", "Segunda")
+        self.assertEqual((first["deduplicated"], second["deduplicated"]), (False, True))
+        self.assertEqual(first["item"]["image"], second["item"]["image"])
+        self.assertEqual(first["item"]["derivatives"], second["item"]["derivatives"])
+        self.assertEqual(first["item"]["content_hash"], second["item"]["content_hash"])
+        self.assertNotEqual(first["item"]["id"], second["item"]["id"])
+        self.assertEqual(len(os.listdir(self.uploads)), 4)
+
+        # Another kind reuses the files but gets its own placement
+        accessory = self.upload("accessory", "Acessório")
+        self.assertTrue(accessory["deduplicated"])
+        self.assertEqual(accessory["item"]["image"], first["item"]["image"])
+        self.assertEqual(accessory["item"]["placement"]["z"], 40)
+        self.assertEqual(flasktry.upload_assets.references(first["item"]["content_hash"]), 3)
+
+        # The files stay until the last item using them is deleted
+        self.client.delete(f"/api/catalog/jackets/{first['item']['id']}")
+        self.client.delete(f"/api/catalog/accessories/{accessory['item']['id']}")
+        self.assertEqual(len(os.listdir(self.uploads)), 4)
+        self.client.delete(f"/api/catalog/jackets/{second['item']['id']}")
+        self.assertEqual(os.listdir(self.uploads), [])
+        self.assertEqual(flasktry.upload_assets.stats()["assets"], 0)
+
+    def test_ids_not_reused_after_delete(self):
+        flasktry.save_catalog({"shirts": [{"id": str(n), "name": f"Camisa {n}", "image": f"/static/assets/shirt{n}.png"}
+                                          for n in range(1, 6)], "pants": []})
+        self.image_bytes = cv2.imencode(".png", np.full((60, 40, 3), (40, 40, 160), dtype=np.uint8))[1].tobytes()
+        self.assertEqual(self.upload("shirt", "Seis")["item"]["id"], "6")
+        self.image_bytes = cv2.imencode(".png", np.full((60, 40, 3), (40, 160, 40), dtype=np.uint8))[1].tobytes()
+        self.assertEqual(self.upload("shirt", "Sete")["item"]["id"], "7")
+
+        self.assertEqual(self.client.delete("/api/catalog/shirts/3").status_code, 200)
+        self.image_bytes = cv2.imencode(".png", np.full((60, 40, 3), (160, 40, 40), dtype=np.uint8))[1].tobytes()
+        self.assertEqual(self.upload("shirt", "Oito")["item"]["id"], "8")
+        ids = [item["id"] for item in flasktry.load_catalog()["shirts"]]
+        self.assertEqual(len(ids), len(set(ids)))
+
+    def test_unknown_type_rejected_before_queueing(self):
+        submitted = flasktry.upload_queue.stats()["submitted"]
+        for item_type in ("foo", "../shirt", "shirts"):
+            response = self.client.post("/api/catalog/upload", content_type="multipart/form-data", data={
+                "file": (BytesIO(self.image_bytes), "shirt.png"), "type": item_type})
+            self.assertEqual(response.status_code, 400)
+        self.assertEqual(flasktry.upload_queue.stats()["submitted"], submitted)
+        self.assertEqual(sorted(flasktry.load_catalog()), ["pants", "shirts"])
+
+    def test_originals_archived_when_enabled(self):
+        with mock.patch.object(flasktry, "ARCHIVE_ORIGINAL_UPLOADS", True):
+            response = self.client.post("/api/catalog/upload", content_type="multipart/form-data", data={
+                "file": (BytesIO(self.image_bytes), "shirt.png"), "type": "shirt"})
+        flasktry.upload_queue.wait(response.get_json()["job_id"], timeout=10)
+        originals = [name for name in os.listdir(self.uploads) if name.startswith("original_")]
+        self.assertEqual(len(originals), 1)
+        with open(os.path.join(self.uploads, originals[0]), "rb") as f:
+            self.assertEqual(f.read(), self.image_bytes)
+
+    def test_failed_job_leaves_catalog_untouched(self):
+        with mock.patch.object(flasktry, "remove_background", return_value=None):
+            response = self.client.post("/api/catalog/upload", content_type="multipart/form-data", data={
+                "file": (BytesIO(self.image_bytes), "shirt.png"), "type": "shirt"})
+            job_id = response.get_json()["job_id"]
+            flasktry.upload_queue.wait(job_id, timeout=10)
+        status = self.client.get(f"/api/catalog/upload/{job_id}").get_json()
+        self.assertEqual((status["status"], status["success"]), ("failed", False))
+        self.assertEqual(flasktry.load_catalog()["shirts"], [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import threading
+import time
+import unittest
+
+import numpy as np
+
+from tryon.kiosk import KioskPipeline, LatestFrameSlot
+
+
+class SyntheticSource:
+    """
+    Stands in for cv2.VideoCapture: numbered frames at a fixed rate
+    """
+
+    def __init__(self, frames, interval=0.0):
+        self.frames = frames
+        self.interval = interval
+        self.read_count = 0
+
+    def read(self):
+        if self.read_count >= self.frames:
+            return False, None
+        if self.interval:
+            time.sleep(self.interval)
+        frame = np.full((4, 4, 3), self.read_count % 256, dtype=np.uint8)
+        self.read_count += 1
+        return True, frame
+
+
+class TestLatestFrameSlot(unittest.TestCase):
+    def test_keeps_newest_and_counts_drops(self):
+        slot = LatestFrameSlot()
+        slot.put(1)
+        slot.put(2)
+        self.assertEqual(slot.get(timeout=0), 2)
+        self.assertEqual(slot.dropped, 1)
+        self.assertIsNone(slot.get(timeout=0))
+
+    def test_close_wakes_waiting_consumer(self):
+        slot = LatestFrameSlot()
+        results = []
+        consumer = threading.Thread(target=lambda: results.append(slot.get()))
+        consumer.start()
+        slot.close()
+        consumer.join(timeout=1)
+        self.assertEqual(results, [None])
+
+
+class TestKioskPipeline(unittest.TestCase):
+    def test_fast_pipeline_shows_every_frame(self):
+        shown = []
+        stats = KioskPipeline(SyntheticSource(20, interval=0.005), lambda frame: frame,
+                              lambda frame: shown.append(int(frame[0, 0, 0]))).run(timeout=5)
+        self.assertEqual(stats["captured"], 20)
+        self.assertEqual(shown, sorted(shown))
+        self.assertEqual(stats["displayed"] + stats["dropped_before_processing"]
+                         + stats["dropped_before_display"], 20)
+        self.assertIsNotNone(stats["latency_ms"]["p95"])
+
+    def test_slow_processing_drops_instead_of_queueing(self):
+        def slow(frame):
+            time.sleep(0.02)
+            return frame
+
+        shown = []
+        stats = KioskPipeline(SyntheticSource(60, interval=0.002), slow,
+                              lambda frame: shown.append(int(frame[0, 0, 0]))).run(timeout=5)
+        self.assertGreater(stats["dropped_before_processing"], 0)
+        self.assertLess(stats["processed"], 60)
+        # Only the newest frames are shown, so latency stays near one processing time
+        self.assertLess(stats["latency_ms"]["max"], 200)
+        self.assertEqual(shown, sorted(shown))
+
+    def test_display_can_stop_pipeline(self):
+        stats = KioskPipeline(SyntheticSource(1000, interval=0.001), lambda frame: frame,
+                              lambda frame: False).run(timeout=5)
+        self.assertEqual(stats["displayed"], 0)
+        self.assertLess(stats["captured"], 1000)
+
+    def test_processing_errors_are_counted(self):
+        def failing(frame):
+            raise ValueError("boom")
+
+        stats = KioskPipeline(SyntheticSource(3), failing, lambda frame: True).run(timeout=5)
+        self.assertEqual(stats["errors"] + stats["dropped_before_processing"], 3)
+        self.assertEqual(stats["displayed"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+import unittest
+
+import cv2
+import numpy as np
+
+from tests.test_compositor import solid_garment
+from tryon.assets import ScaledGarmentCache
+from tryon.compositor import (Garment, composite_layers, layer_region, premultiply, render_tryon, shirt_region,
+                              stack_layers, stack_premultiplied)
+from tryon.placement import collection_kind, kind_collection
+
+
+def half_alpha_layer(color, x, y, size=(20, 30)):
+    bgra = np.zeros((size[0], size[1], 4), dtype=np.uint8)
+    bgra[:, :, 0:3] = color
+    bgra[:, :, 3] = 128
+    return premultiply(bgra) + (x, y)
+
+
+class TestLayers(unittest.TestCase):
+    def setUp(self):
+        self.frame = np.full((480, 640, 3), 90, dtype=np.uint8)
+        self.face = (280, 60, 80, 80)
+        self.shirt = solid_garment("shirt1.png", (0, 0, 255))
+        self.pant = solid_garment("pant7.jpg", (255, 0, 0))
+        image = np.full((40, 30, 3), (0, 255, 0), dtype=np.uint8)
+        mask = np.full((40, 30), 255, dtype=np.uint8)
+        self.jacket = Garment("jacket.png", image, mask, cv2.bitwise_not(mask), kind='jacket', z=30)
+
+    def test_collections_map_to_kinds(self):
+        self.assertEqual(collection_kind('accessories'), 'accessory')
+        self.assertEqual(collection_kind('footwear'), 'footwear')
+        self.assertEqual(kind_collection('jacket'), 'jackets')
+        self.assertEqual(kind_collection('hat'), 'hats')
+
+    def test_layers_sorted_by_z(self):
+        self.shirt.z = 50
+        stacked = stack_layers([(self.jacket, 'jacket'), (self.shirt, 'shirt'), (self.pant, 'pant')])
+        self.assertEqual([kind for _, kind in stacked], ['pant', 'jacket', 'shirt'])
+
+    def test_flattened_stack_matches_sequential_blending(self):
+        layers = [half_alpha_layer((0, 0, 255), 10, 10), half_alpha_layer((0, 255, 0), 25, 15),
+                  half_alpha_layer((255, 0, 0), 600, 470)]
+        sequential = self.frame.copy()
+        written = composite_layers(sequential, layers)
+        self.assertEqual(written, (10, 10, 630, 480))
+
+        flattened = self.frame.copy()
+        color, inv_alpha, x, y = stack_premultiplied(layers)
+        composite_layers(flattened, [(color, inv_alpha, x, y)])
+        np.testing.assert_allclose(flattened, sequential, atol=2)
+
+    def test_jacket_drawn_over_shirt(self):
+        for scaled_cache in (None, ScaledGarmentCache()):
+            img = render_tryon(self.frame.copy(), self.shirt, self.pant, faces=[self.face], draw_face=False,
+                               blur=False, scaled_cache=scaled_cache, layers=[self.jacket])
+            x1, y1, _, _ = shirt_region(self.face)
+            np.testing.assert_array_equal(img[y1 + 20, x1 + 20], [0, 255, 0])
+            jx1, jy1, _, _ = layer_region(self.face, self.jacket, 'jacket')
+            # The jacket anchor starts above and left of the shirt
+            self.assertLess(jx1, x1)
+            self.assertLess(jy1, y1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,23 @@
+import unittest
+from collections import deque
+
+import numpy as np
+
+from tryon.metrics import latency_stats
+
+
+class TestLatencyStats(unittest.TestCase):
+    def test_matches_numpy_percentiles(self):
+        samples = deque([float(value) for value in range(1, 21)], maxlen=50)
+        stats = latency_stats(samples)
+        self.assertEqual(stats, {"avg": 10.5, "p50": 10.5, "p95": round(float(np.percentile(samples, 95)), 2),
+                                 "max": 20.0})
+        self.assertEqual(stats["p95"], 19.05)
+
+    def test_empty(self):
+        self.assertEqual(latency_stats([]), {"avg": None, "p50": None, "p95": None, "max": None})
+        self.assertEqual(latency_stats([4.0])["p95"], 4.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
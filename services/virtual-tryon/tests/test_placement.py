@@ -0,0 +1,58 @@
+import unittest
+
+import numpy as np
+
+from tryon.compositor import Garment, pant_region, shirt_region
+from tryon.placement import (backfill_catalog, build_masks, garment_placement, garment_region,
+                             legacy_placement)
+
+
+class TestPlacement(unittest.TestCase):
+    def test_legacy_rules_follow_file_names(self):
+        self.assertEqual(legacy_placement("/static/assets/shirt51.jpg", "shirt")["mask"],
+                         {"source": "gray", "threshold": 200, "invert": True})
+        self.assertEqual(legacy_placement("/static/assets/pant7.jpg", "pant")["mask"]["threshold"], 100)
+        self.assertEqual(legacy_placement("/static/assets/pant21.png", "pant")["anchor"]["width"], 2.0)
+        self.assertEqual(legacy_placement("/static\\user-uploads/processed_a.png", "shirt")["mask"]["source"], "alpha")
+        self.assertEqual(legacy_placement("/static/assets/shirt1.png", "shirt")["mask"]["threshold"], 0)
+
+    def test_alpha_mask_and_fallback_without_alpha(self):
+        bgra = np.zeros((10, 10, 4), dtype=np.uint8)
+        bgra[2:5, 3:8, 3] = 255
+        mask, mask_inv = build_masks(bgra, {"source": "alpha", "threshold": 127, "invert": False})
+        self.assertEqual(int(mask.sum() // 255), 15)
+        self.assertTrue((mask_inv == 255 - mask).all())
+
+        # Without alpha, near-white is treated as background
+        bgr = np.full((10, 10, 3), 255, dtype=np.uint8)
+        bgr[0, 0] = 10
+        mask, _ = build_masks(bgr, {"source": "alpha", "threshold": 127, "invert": False})
+        self.assertEqual(int(mask.sum() // 255), 1)
+
+    def test_garment_placement_records_bbox(self):
+        bgra = np.zeros((40, 30, 4), dtype=np.uint8)
+        bgra[5:25, 10:20, 3] = 255
+        placement = garment_placement(bgra, "pant")
+        self.assertEqual(placement["mask"]["source"], "alpha")
+        self.assertEqual(placement["bbox"], [10, 5, 10, 20])
+        self.assertEqual(placement["anchor"]["y"], 5.0)
+
+    def test_regions_use_garment_anchor(self):
+        face = (100, 50, 40, 40)
+        self.assertEqual(shirt_region(face), (60, 90, 180, 250))
+        self.assertEqual(pant_region(face), (60, 250, 180, 450))
+
+        image = np.zeros((4, 4, 3), dtype=np.uint8)
+        mask = np.full((4, 4), 255, dtype=np.uint8)
+        anchor = {"x": -0.5, "y": 4.0, "width": 2.0, "height": 5.0}
+        pant = Garment("pant.png", image, mask, 255 - mask, anchor=anchor)
+        self.assertEqual(pant_region(face, pant), garment_region(face, anchor))
+        self.assertEqual(pant_region(face, pant), (80, 210, 160, 410))
+
+    def test_backfill_skips_items_with_placement(self):
+        catalog = {"shirts": [{"id": "1", "image": "/missing.png", "placement": {"anchor": {}}}]}
+        self.assertEqual(backfill_catalog(catalog, "/nonexistent"), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
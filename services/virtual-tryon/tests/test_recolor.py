@@ -0,0 +1,93 @@
+import os
+import tempfile
+import unittest
+
+import cv2
+import numpy as np
+
+import flasktry
+from tests.test_compositor import solid_garment
+from tryon.assets import GarmentAssetCache
+from tryon.recolor import normalize_hex_color, parse_hex_color, recolor_garment, recolor_image
+
+
+def hue_of(bgr):
+    return int(cv2.cvtColor(np.uint8([[bgr]]), cv2.COLOR_BGR2HSV)[0, 0, 0])
+
+
+class TestRecolor(unittest.TestCase):
+    def setUp(self):
+        # A red garment with a darker fold, on a black background
+        self.image = np.zeros((40, 30, 3), dtype=np.uint8)
+        self.image[5:35, 5:25] = (30, 30, 200)
+        self.image[20:25, 5:25] = (15, 15, 100)
+        self.mask = np.zeros((40, 30), dtype=np.uint8)
+        self.mask[5:35, 5:25] = 255
+
+    def test_hex_colors(self):
+        self.assertEqual(parse_hex_color("#FF8000"), (0, 128, 255))
+        self.assertEqual(normalize_hex_color("00bfff"), "#00bfff")
+        for color in ("#FFF", "#GGGGGG", ""):
+            with self.assertRaises(ValueError):
+                parse_hex_color(color)
+
+    def test_moves_hue_and_keeps_shading(self):
+        recolored = recolor_image(self.image, self.mask, "#00BFFF")
+        self.assertLessEqual(abs(hue_of(recolored[10, 10]) - hue_of((255, 191, 0))), 2)
+        self.assertLess(int(recolored[22, 10].sum()), int(recolored[10, 10].sum()))
+        np.testing.assert_array_equal(recolored[0:5], self.image[0:5])
+
+    def test_gray_garment_takes_target_hue(self):
+        gray = np.where(self.mask[:, :, None] > 0, np.uint8(200), np.uint8(0)).astype(np.uint8)
+        recolored = recolor_image(np.ascontiguousarray(np.broadcast_to(gray, (40, 30, 3))), self.mask, "#006400")
+        b, g, r = (int(v) for v in recolored[10, 10])
+        self.assertGreater(g, r)
+        self.assertGreater(g, b)
+
+    def test_variant_keeps_masks_and_placement(self):
+        garment = solid_garment("shirt1.png", (0, 0, 255))
+        garment.z = 25
+        variant = recolor_garment(garment, "#0000FF")
+        self.assertIs(variant.mask, garment.mask)
+        self.assertEqual(variant.z, 25)
+
+
+class TestRecolorCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "shirt.png")
+        image = np.zeros((40, 30, 3), dtype=np.uint8)
+        image[5:35, 5:25] = (30, 30, 200)
+        cv2.imwrite(self.path, image)
+        self.cache = GarmentAssetCache()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_variants_cached_per_color(self):
+        first = self.cache.get("shirts", "1", self.path, "shirt", color="#00BFFF")
+        self.assertIs(self.cache.get("shirts", "1", self.path, "shirt", color="#00bfff"), first)
+        self.assertIsNot(self.cache.get("shirts", "1", self.path, "shirt", color="#FF0000"), first)
+        # Original plus two colors, each decoded or recolored once
+        self.assertEqual(self.cache.stats()["entries"], 3)
+
+        self.cache.invalidate("shirts", "1")
+        self.assertEqual(self.cache.stats()["entries"], 0)
+        with self.assertRaises(ValueError):
+            self.cache.get("shirts", "1", self.path, "shirt", color="blue")
+
+
+class TestVariantEndpoint(unittest.TestCase):
+    def setUp(self):
+        self.client = flasktry.app.test_client()
+
+    def test_variant_png(self):
+        response = self.client.get("/api/catalog/shirts/1/variant?color=%2300BFFF")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, "image/png")
+        self.assertEqual(self.client.get("/api/catalog/shirts/1/variant?color=nope").status_code, 400)
+        self.assertEqual(self.client.get("/api/catalog/shirts/missing/variant?color=%23000000").status_code, 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
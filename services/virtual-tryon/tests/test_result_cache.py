@@ -0,0 +1,92 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import cv2
+import numpy as np
+
+import flasktry
+from tryon.result_cache import TryOnResultCache, parse_filename, result_key
+
+
+class TestTryOnResultCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.cache = TryOnResultCache(self.tmp.name)
+
+    def test_key_depends_on_content_and_mtimes(self):
+        key = result_key(b"photo", "1", "2", (10.0, 20.0))
+        self.assertEqual(key, result_key(b"photo", "1", "2", (10.0, 20.0)))
+        self.assertNotEqual(key, result_key(b"other", "1", "2", (10.0, 20.0)))
+        self.assertNotEqual(key, result_key(b"photo", "1", "2", (11.0, 20.0)))
+        self.assertNotEqual(key, result_key(b"photo", "1", "2", (10.0, 20.0), variant="blur=0"))
+
+    def test_memory_then_disk_tier(self):
+        key = result_key(b"photo", "1", "2")
+        self.assertIsNone(self.cache.get(key))
+        self.cache.put(key, b"jpeg")
+        self.assertEqual(self.cache.get(key), b"jpeg")
+
+        # A fresh cache, e.g. another worker, finds the result on disk
+        other = TryOnResultCache(self.tmp.name)
+        self.assertEqual(other.get(key), b"jpeg")
+        self.assertEqual(other.get(key), b"jpeg")
+        stats = other.stats()
+        self.assertEqual((stats["disk_hits"], stats["memory_hits"]), (1, 1))
+
+    def test_invalidate_evicts_only_that_item(self):
+        kept = result_key(b"photo", "1", "2")
+        evicted = result_key(b"photo", "3", "2")
+        self.cache.put(kept, b"a")
+        self.cache.put(evicted, b"b")
+
+        self.assertEqual(self.cache.invalidate("shirts", "3"), 2)
+        self.assertIsNone(self.cache.get(evicted))
+        self.assertEqual(self.cache.get(kept), b"a")
+
+        self.cache.invalidate("pants", "2")
+        self.assertEqual(os.listdir(self.tmp.name), [])
+
+    def test_memory_and_disk_budgets(self):
+        cache = TryOnResultCache(self.tmp.name, max_memory_bytes=10, max_disk_bytes=10)
+        for index in range(4):
+            cache.put(result_key(bytes([index]), "1", "1"), b"12345")
+        stats = cache.stats()
+        self.assertLessEqual(stats["bytes"], 10)
+        self.assertLessEqual(stats["disk_bytes"], 10)
+        self.assertEqual(len(os.listdir(self.tmp.name)), 2)
+
+    def test_foreign_files_are_ignored(self):
+        self.assertIsNone(parse_filename("notes.txt"))
+        self.assertIsNone(parse_filename("s1_p1_abc.jpg"))
+
+
+class TestRenderEndpointCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        patcher = mock.patch.object(flasktry, "result_cache", TryOnResultCache(self.tmp.name))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = flasktry.app.test_client()
+        frame = np.full((240, 320, 3), 120, dtype=np.uint8)
+        self.frame_bytes = cv2.imencode(".jpg", frame)[1].tobytes()
+
+    def test_repeat_render_is_served_from_cache(self):
+        first = self.client.post("/api/tryon/render?shirt=1&pant=1", data=self.frame_bytes)
+        self.assertEqual(first.headers["X-Cache"], "MISS")
+
+        with mock.patch("flasktry.render_tryon") as render:
+            second = self.client.post("/api/tryon/render?shirt=1&pant=1", data=self.frame_bytes)
+        render.assert_not_called()
+        self.assertEqual(second.headers["X-Cache"], "HIT")
+        self.assertEqual(second.data, first.data)
+
+        other = self.client.post("/api/tryon/render?shirt=1&pant=1&blur=0", data=self.frame_bytes)
+        self.assertEqual(other.headers["X-Cache"], "MISS")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+import threading
+import unittest
+
+import cv2
+import numpy as np
+
+import flasktry
+from tests.test_compositor import solid_garment
+from tryon.sessions import SessionLimitError, SessionManager, TryOnSession
+
+
+def encode_frame(value=120, size=(240, 320)):
+    return cv2.imencode(".jpg", np.full((size[0], size[1], 3), value, dtype=np.uint8))[1].tobytes()
+
+
+class TestTryOnSession(unittest.TestCase):
+    def setUp(self):
+        self.session = TryOnSession("s1", solid_garment("shirt1.png", (0, 0, 255)),
+                                    solid_garment("pant7.jpg", (255, 0, 0)))
+
+    def test_process_returns_jpeg_and_counts(self):
+        jpeg = self.session.process(encode_frame())
+        img = cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR)
+        self.assertEqual(img.shape, (240, 320, 3))
+        stats = self.session.stats()
+        self.assertEqual(stats["frames_received"], 1)
+        self.assertEqual(stats["frames_rendered"], 1)
+        self.assertEqual(stats["frames_dropped"], 0)
+        self.assertGreater(stats["fps"], 0)
+
+    def test_busy_session_drops_frame(self):
+        self.session._busy.acquire()
+        try:
+            self.assertIsNone(self.session.process(encode_frame()))
+        finally:
+            self.session._busy.release()
+        self.assertEqual(self.session.stats()["frames_dropped"], 1)
+
+    def test_invalid_frame_raises_and_releases(self):
+        with self.assertRaises(ValueError):
+            self.session.process(b"not an image")
+        self.assertIsNotNone(self.session.process(encode_frame()))
+
+    def test_wait_frame_wakes_on_new_frame(self):
+        results = []
+        waiter = threading.Thread(target=lambda: results.append(self.session.wait_frame(0, timeout=5)))
+        waiter.start()
+        self.session.process(encode_frame())
+        waiter.join()
+        self.assertEqual(results[0][0], 1)
+        self.assertIsNotNone(results[0][1])
+
+    def test_wait_frame_returns_none_when_closed(self):
+        self.session.close()
+        self.assertEqual(self.session.wait_frame(0, timeout=5), (0, None))
+
+
+class TestSessionManager(unittest.TestCase):
+    def setUp(self):
+        self.shirt = solid_garment("shirt1.png", (0, 0, 255))
+        self.pant = solid_garment("pant7.jpg", (255, 0, 0))
+
+    def test_admission_limit(self):
+        manager = SessionManager(max_sessions=2)
+        first = manager.create(self.shirt, self.pant)
+        manager.create(self.shirt, self.pant)
+        with self.assertRaises(SessionLimitError):
+            manager.create(self.shirt, self.pant)
+        self.assertEqual(manager.stats()["rejected"], 1)
+
+        manager.close(first.session_id)
+        self.assertTrue(first.closed)
+        manager.create(self.shirt, self.pant)
+
+    def test_idle_sessions_expire(self):
+        manager = SessionManager(max_sessions=1, idle_timeout=10)
+        session = manager.create(self.shirt, self.pant)
+        session.last_activity -= 11
+        manager.create(self.shirt, self.pant)
+        self.assertIsNone(manager.get(session.session_id))
+        self.assertTrue(session.closed)
+
+    def test_idle_sessions_expire_on_lookup_and_stats(self):
+        manager = SessionManager(max_sessions=2, idle_timeout=10)
+        idle, active = manager.create(self.shirt, self.pant), manager.create(self.shirt, self.pant)
+        idle.last_activity -= 11
+        self.assertEqual(manager.stats()["active"], 1)
+        self.assertTrue(idle.closed)
+
+        active.last_activity -= 11
+        self.assertIsNone(manager.get(active.session_id))
+        self.assertTrue(active.closed)
+
+
+class TestSessionEndpoints(unittest.TestCase):
+    def setUp(self):
+        self.client = flasktry.app.test_client()
+
+    def test_session_lifecycle(self):
+        response = self.client.post("/api/tryon/sessions?shirt=1&pant=1")
+        self.assertEqual(response.status_code, 201)
+        data = response.get_json()
+
+        response = self.client.post(data["frames_url"], data=encode_frame())
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, "image/jpeg")
+
+        stats = self.client.get(f"/api/tryon/sessions/{data['session_id']}").get_json()["data"]
+        self.assertEqual(stats["frames_rendered"], 1)
+
+        self.assertEqual(self.client.delete(f"/api/tryon/sessions/{data['session_id']}").status_code, 200)
+        self.assertEqual(self.client.post(data["frames_url"], data=encode_frame()).status_code, 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
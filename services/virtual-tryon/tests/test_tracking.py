@@ -0,0 +1,57 @@
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from tryon.tracking import BoxSmoother, FaceTracker
+
+
+def textured_frame(x, y, size=60):
+    rng = np.random.default_rng(7)
+    frame = np.full((240, 320, 3), 40, dtype=np.uint8)
+    frame[y:y + size, x:x + size] = rng.integers(0, 255, (size, size, 3), dtype=np.uint8)
+    return frame
+
+
+class TestFaceTracker(unittest.TestCase):
+    def test_detects_every_interval_and_follows_face(self):
+        positions = [(100 + 2 * i, 80 + i) for i in range(10)]
+        current = []
+
+        def detect_current(gray, **kwargs):
+            x, y = current[-1]
+            return np.array([[x, y, 60, 60]])
+
+        results = []
+        with mock.patch("tryon.tracking.detect_faces_gray", side_effect=detect_current) as detect:
+            tracker = FaceTracker(detect_interval=5, smooth=False)
+            for x, y in positions:
+                current.append((x, y))
+                results.append(tracker.update(textured_frame(x, y)))
+
+        self.assertEqual(detect.call_count, 2)
+        for (x, y), faces in zip(positions, results):
+            self.assertEqual(faces, [(x, y, 60, 60)])
+        stats = tracker.stats()
+        self.assertEqual(stats["tracked"], 8)
+        self.assertAlmostEqual(stats["detect_ratio"], 0.2)
+
+    def test_lost_track_triggers_detection(self):
+        with mock.patch("tryon.tracking.detect_faces_gray", return_value=np.array([[100, 80, 60, 60]])) as detect:
+            tracker = FaceTracker(detect_interval=10, smooth=False)
+            tracker.update(textured_frame(100, 80))
+            tracker.update(np.full((240, 320, 3), 40, dtype=np.uint8))
+        self.assertEqual(detect.call_count, 2)
+
+    def test_interval_one_disables_tracking(self):
+        with mock.patch("tryon.tracking.detect_faces_gray", return_value=np.array([[100, 80, 60, 60]])) as detect:
+            tracker = FaceTracker(detect_interval=1)
+            for _ in range(3):
+                tracker.update(textured_frame(100, 80))
+        self.assertEqual(detect.call_count, 3)
+
+    def test_smoother_damps_jitter(self):
+        smoother = BoxSmoother()
+        smoother.update((100, 100, 60, 60))
+        jittered = [smoother.update((100 + (6 if i % 2 else -6), 100, 60, 60))[0] for i in range(20)]
+        self.assertLess(max(jittered[5:]) - min(jittered[5:]), 12)
@@ -0,0 +1,171 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+from io import BytesIO
+from unittest import mock
+
+import cv2
+import numpy as np
+
+import flasktry
+from tryon.detection import SERVICE_ROOT
+from tryon.ingest import IngestionQueue
+from tryon.video import catalog_garment, chunk_ranges, render_video, video_info
+
+
+def write_video(path, frames=12, size=(160, 120)):
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 10, size)
+    for index in range(frames):
+        writer.write(np.full((size[1], size[0], 3), index * 20, dtype=np.uint8))
+    writer.release()
+
+
+class TestVideoRenderer(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.input = os.path.join(self.tmp.name, "input.avi")
+        write_video(self.input)
+        with open(os.path.join(SERVICE_ROOT, "static", "catalog.json")) as f:
+            self.catalog = json.load(f)
+
+    def test_chunk_ranges_cover_all_frames(self):
+        self.assertEqual(chunk_ranges(10, 3), [(0, 3), (3, 6), (6, None)])
+        self.assertEqual(chunk_ranges(2, 8), [(0, 1), (1, None)])
+        self.assertEqual(chunk_ranges(0, 4), [(0, None)])
+
+    def test_catalog_garment_falls_back_to_first_item(self):
+        spec = catalog_garment(self.catalog, "pants", "missing")
+        self.assertEqual((spec["id"], spec["kind"]), ("1", "pant"))
+        self.assertTrue(os.path.exists(spec["path"]))
+
+    def test_chunks_are_joined_in_order(self):
+        output = os.path.join(self.tmp.name, "output.avi")
+        result = render_video(self.input, output, catalog_garment(self.catalog, "shirts", "1"),
+                              catalog_garment(self.catalog, "pants", "1"), workers=1, chunks=4,
+                              fourcc="MJPG")
+        self.assertEqual((result["frames"], result["chunks"]), (12, 4))
+        self.assertEqual(video_info(output)["frames"], 12)
+
+        cap = cv2.VideoCapture(output)
+        levels = []
+        while True:
+            ok, img = cap.read()
+            if not ok:
+                break
+            levels.append(int(img[60, 80, 0]))
+        cap.release()
+        self.assertEqual(levels, sorted(levels))
+        self.assertLess(levels[0], levels[-1])
+
+    def test_frames_past_the_reported_count_are_kept(self):
+        output = os.path.join(self.tmp.name, "output.avi")
+        with mock.patch("tryon.video.video_info", return_value={"frames": 7, "fps": 10.0, "width": 160,
+                                                                 "height": 120}):
+            result = render_video(self.input, output, catalog_garment(self.catalog, "shirts", "1"),
+                                  catalog_garment(self.catalog, "pants", "1"), workers=1, chunks=3,
+                                  fourcc="MJPG")
+        self.assertEqual(result["frames"], 12)
+        self.assertEqual(video_info(output)["frames"], 12)
+
+
+class TestVideoEndpoint(unittest.TestCase):
+    def test_rejects_missing_and_unsupported_video(self):
+        client = flasktry.app.test_client()
+        self.assertEqual(client.post("/api/tryon/video").status_code, 400)
+        response = client.post("/api/tryon/video", data={"video": (BytesIO(b"x"), "clip.txt")},
+                               content_type="multipart/form-data")
+        self.assertEqual(response.status_code, 400)
+
+    def test_renders_uploaded_video(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            source = os.path.join(tmp, "clip.avi")
+            write_video(source, frames=4)
+            with open(source, "rb") as f:
+                data = {"video": (BytesIO(f.read()), "clip.avi"), "workers": "1"}
+            client = flasktry.app.test_client()
+            with mock.patch.object(flasktry, "TRYON_VIDEOS_DIR", tmp):
+                response = client.post("/api/tryon/video", data=data, content_type="multipart/form-data")
+                self.assertEqual(response.status_code, 202)
+                job_id = response.get_json()["job_id"]
+                flasktry.video_queue.wait(job_id, timeout=60)
+            body = client.get(response.get_json()["status_url"]).get_json()
+            self.assertEqual(body["status"], "done")
+            self.assertEqual(body["data"]["frames"], 4)
+            self.assertTrue(os.path.exists(body["url"]))
+            # Only the source clip and the rendered output; the upload never lands in the public folder
+            self.assertEqual(sorted(os.listdir(tmp)), sorted(["clip.avi", os.path.basename(body["url"])]))
+            self.assertEqual(client.get("/api/tryon/video/unknown").status_code, 404)
+
+    def test_unreadable_video_fails_the_job(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            data = {"video": (BytesIO(b"not a video"), "clip.mp4"), "workers": "1"}
+            client = flasktry.app.test_client()
+            with mock.patch.object(flasktry, "TRYON_VIDEOS_DIR", tmp):
+                response = client.post("/api/tryon/video", data=data, content_type="multipart/form-data")
+                flasktry.video_queue.wait(response.get_json()["job_id"], timeout=60)
+            body = client.get(response.get_json()["status_url"]).get_json()
+            self.assertEqual((body["status"], body["success"]), ("failed", False))
+            self.assertEqual(body["error"], "Não foi possível ler o vídeo enviado")
+
+    def test_renders_queued_one_at_a_time(self):
+        started, release = threading.Event(), threading.Event()
+        running = []
+
+        def render(*args, **kwargs):
+            running.append(threading.current_thread())
+            started.set()
+            release.wait(5)
+            return {}
+
+        client = flasktry.app.test_client()
+        with tempfile.TemporaryDirectory() as tmp, \
+                mock.patch.object(flasktry, "TRYON_VIDEOS_DIR", tmp), \
+                mock.patch.object(flasktry, "render_video", side_effect=render), \
+                mock.patch.object(flasktry, "video_queue",
+                                  IngestionQueue(flasktry.render_uploaded_video, max_workers=1, max_pending=2)):
+            statuses = [client.post("/api/tryon/video", data={"video": (BytesIO(b"x"), "clip.mp4")},
+                                    content_type="multipart/form-data").status_code for _ in range(3)]
+            self.assertEqual(statuses, [202, 202, 503])
+            started.wait(5)
+            self.assertEqual(flasktry.video_queue.stats()["processing"], 1)
+            release.set()
+            flasktry.video_queue.shutdown()
+        self.assertEqual(len(running), 2)
+
+    def test_workers_clamped_to_cpu_count(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            data = {"video": (BytesIO(b"x"), "clip.mp4"), "workers": "5000"}
+            with mock.patch.object(flasktry, "TRYON_VIDEOS_DIR", tmp), \
+                    mock.patch.object(flasktry, "render_video", return_value={}) as render:
+                response = flasktry.app.test_client().post("/api/tryon/video", data=data,
+                                                           content_type="multipart/form-data")
+                flasktry.video_queue.wait(response.get_json()["job_id"], timeout=10)
+            self.assertEqual(render.call_args.kwargs["workers"], os.cpu_count() or 1)
+
+    def test_old_outputs_pruned(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            for index in range(5):
+                path = os.path.join(tmp, f"tryon_{index}.mp4")
+                open(path, "wb").close()
+                os.utime(path, (1000 + index, 1000 + index))
+            fresh = os.path.join(tmp, "tryon_fresh.mp4")
+            open(fresh, "wb").close()
+            with mock.patch.object(flasktry, "MAX_TRYON_VIDEOS", 3):
+                flasktry.prune_tryon_videos(tmp)
+            # Expired files go, and room is left for the next render
+            self.assertEqual(os.listdir(tmp), ["tryon_fresh.mp4"])
+
+            for index in range(4):
+                open(os.path.join(tmp, f"tryon_new{index}.mp4"), "wb").close()
+                os.utime(os.path.join(tmp, f"tryon_new{index}.mp4"), None)
+            with mock.patch.object(flasktry, "MAX_TRYON_VIDEOS", 3), \
+                    mock.patch.object(flasktry, "TRYON_VIDEO_TTL_SECONDS", 10 ** 9):
+                flasktry.prune_tryon_videos(tmp)
+            self.assertEqual(len(os.listdir(tmp)), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
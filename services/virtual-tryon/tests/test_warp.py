@@ -0,0 +1,67 @@
+import unittest
+
+import cv2
+import numpy as np
+
+from tryon.compositor import Garment, scale_garment
+from tryon.placement import garment_placement
+from tryon.warp import DEFAULT_WARPS, WarpMapCache, resolve_warp, source_level, validate_warp, warp_garment
+
+IDENTITY = [{"y": 0.0, "left": 0.0, "right": 1.0}, {"y": 1.0, "left": 0.0, "right": 1.0}]
+
+
+def gradient_garment(size=(80, 60), warp=None):
+    image = np.zeros((size[0], size[1], 3), dtype=np.uint8)
+    image[:, :, 1] = np.linspace(0, 255, size[1], dtype=np.uint8)[None, :]
+    image[:, :, 2] = np.linspace(0, 255, size[0], dtype=np.uint8)[:, None]
+    mask = np.full(size, 255, dtype=np.uint8)
+    return Garment("shirt.png", image, mask, cv2.bitwise_not(mask), warp=warp)
+
+
+class TestWarp(unittest.TestCase):
+    def test_identity_warp_matches_resize(self):
+        plain = scale_garment(gradient_garment(), 120, 160)
+        fitted = scale_garment(gradient_garment(warp=validate_warp(IDENTITY)), 120, 160)
+        self.assertEqual(fitted.shape, plain.shape)
+        self.assertLessEqual(np.abs(fitted.astype(int) - plain.astype(int))[1:-1, 1:-1].max(), 4)
+
+    def test_tapered_rows_leave_corners_transparent(self):
+        rows = [{"y": 0.0, "left": 0.25, "right": 0.75}, {"y": 1.0, "left": 0.0, "right": 1.0}]
+        fitted = warp_garment(gradient_garment(warp=validate_warp(rows)), 100, 100, WarpMapCache())
+        self.assertEqual(fitted[0, 5, 3], 0)
+        self.assertEqual(fitted[0, 50, 3], 255)
+        self.assertEqual(fitted[99, 5, 3], 255)
+
+    def test_invalid_rows_rejected(self):
+        for rows in ([], [IDENTITY[0]], [IDENTITY[1], IDENTITY[0]],
+                     [{"y": 0.0, "left": 0.6, "right": 0.4}, IDENTITY[1]], [{"left": 0}, IDENTITY[1]]):
+            with self.assertRaises(ValueError):
+                validate_warp(rows)
+        with self.assertRaises(ValueError):
+            resolve_warp("not json", "shirt")
+        self.assertEqual(resolve_warp("default", "shirt"), DEFAULT_WARPS["shirt"])
+        self.assertIsNone(resolve_warp("default", "accessory"))
+
+    def test_maps_cached_per_size(self):
+        cache = WarpMapCache()
+        garment = gradient_garment(warp=validate_warp(IDENTITY))
+        warp_garment(garment, 40, 50, cache)
+        warp_garment(garment, 40, 50, cache)
+        warp_garment(garment, 48, 56, cache)
+        stats = cache.stats()
+        self.assertEqual((stats["entries"], stats["hits"], stats["misses"]), (2, 1, 2))
+
+    def test_large_sources_are_halved_first(self):
+        garment = gradient_garment(size=(400, 300))
+        self.assertEqual(source_level(garment, 300, 400).shape[:2], (400, 300))
+        self.assertEqual(source_level(garment, 60, 80).shape[:2], (100, 75))
+
+    def test_placement_stores_warp(self):
+        bgra = np.zeros((40, 30, 4), dtype=np.uint8)
+        bgra[5:25, 10:20, 3] = 255
+        self.assertNotIn("warp", garment_placement(bgra, "shirt"))
+        self.assertEqual(garment_placement(bgra, "pant", warp="default")["warp"], DEFAULT_WARPS["pant"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,10 @@
+from tryon.assets import GarmentAssetCache, ScaledGarmentCache, garment_cache
+from tryon.compositor import Garment, load_garment, render_tryon
+from tryon.tracking import BoxSmoother, FaceTracker
+from tryon.detection import FaceDetectorRegistry, face_detectors, get_face_cascade, detect_faces
+from tryon.sessions import SessionLimitError, SessionManager, TryOnSession, session_manager
+
+__all__ = ["GarmentAssetCache", "ScaledGarmentCache", "garment_cache", "Garment", "load_garment", "render_tryon",
+           "BoxSmoother", "FaceTracker",
+           "FaceDetectorRegistry", "face_detectors", "get_face_cascade", "detect_faces",
+           "SessionLimitError", "SessionManager", "TryOnSession", "session_manager"]
@@ -0,0 +1,217 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from tryon.compositor import layer_region, load_garment, premultiply, prepare_garment, scale_garment, stack_premultiplied
+from tryon.recolor import normalize_hex_color, recolor_garment
+
+# Default memory budget for decoded garments (images plus masks)
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+# Scaled garment sizes are rounded to multiples of this many pixels
+DEFAULT_SIZE_BUCKET = 8
+# Scaled garments kept per session
+DEFAULT_SCALED_ENTRIES = 16
+
+
+class GarmentAssetCache:
+    """
+    Process-wide LRU cache of decoded garments
+
+    Entries are keyed by (collection, item id) and remember the mtime of the
+    file they were decoded from and its placement record, so a re-uploaded
+    image or edited metadata is picked up on the next lookup. Recolored
+    variants are cached next to the original under (collection, item id,
+    color) and built from it with a lookup table. The least recently used
+    garments are evicted once the decoded arrays exceed the byte budget.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, collection, item_id, path, kind, root_path='', placement=None, color=None, mask_path=None):
+        """
+        Return the decoded Garment for a catalog item, loading it on a miss
+
+        Args:
+            collection: Catalog collection, e.g. 'shirts' or 'pants'
+            item_id: Catalog item id
+            path: Absolute path of the garment image
+            kind: 'shirt' or 'pant'
+            root_path: Application root, used to resolve the fallback garment
+            placement: Placement record stored with the catalog item, if any
+            color: '#RRGGBB' to get the garment recolored, None for the original
+            mask_path: Precomputed mask array of the image, if the item has one
+
+        Returns:
+            Garment, or None if the image cannot be read
+
+        Raises:
+            ValueError: If color is not a hex color
+        """
+        key = (collection, str(item_id))
+        if color is not None:
+            key += (normalize_hex_color(color),)
+        source = (path, _mtime(path), json.dumps(placement, sort_keys=True), mask_path)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == source:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        if color is None:
+            garment = load_garment(path, kind, root_path, placement, mask_path)
+        else:
+            original = self.get(collection, item_id, path, kind, root_path, placement, mask_path=mask_path)
+            garment = recolor_garment(original, color) if original is not None else None
+        if garment is None:
+            return None
+
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = (source, garment)
+            self._bytes += garment.nbytes
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                oldest = next(iter(self._entries))
+                self._discard(oldest)
+                self.evictions += 1
+        return garment
+
+    def invalidate(self, collection, item_id=None):
+        """
+        Drop one item with its recolored variants, or a whole collection when item_id is None
+        """
+        with self._lock:
+            keys = [key for key in self._entries
+                    if key[0] == collection and (item_id is None or key[1] == str(item_id))]
+            for key in keys:
+                self._discard(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[1].nbytes
+
+
+class ScaledGarmentCache:
+    """
+    Per-session LRU of garments already scaled to a frame size
+
+    Target sizes are rounded to `bucket` pixels, so while the face size stays
+    roughly stable consecutive frames reuse the same premultiplied garment
+    instead of resizing it again.
+    """
+
+    def __init__(self, bucket=DEFAULT_SIZE_BUCKET, max_entries=DEFAULT_SCALED_ENTRIES):
+        self.bucket = max(1, int(bucket))
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def quantize(self, size):
+        return max(self.bucket, int(round(size / self.bucket)) * self.bucket)
+
+    def get(self, garment, width, height):
+        """
+        Return (color, inv_alpha) for the garment at the bucketed size
+        """
+        key = (garment, self.quantize(width), self.quantize(height))
+        scaled = self._entries.get(key)
+        if scaled is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return scaled
+
+        self.misses += 1
+        scaled = premultiply(scale_garment(garment, key[1], key[2]))
+        self._entries[key] = scaled
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return scaled
+
+    def get_stack(self, layers, face_width, face_height):
+        """
+        Return an outfit flattened into a single premultiplied layer
+
+        Face sizes are rounded to a quarter of the bucket, since garments span
+        several face widths. The layers are scaled through get() and then
+        flattened with stack_premultiplied.
+
+        Args:
+            layers: (garment, kind) pairs, bottom first
+            face_width: Width of the face box
+            face_height: Height of the face box
+
+        Returns:
+            (color, inv_alpha, dx, dy) with the offset relative to the face's
+            top-left corner, or None if no layer has an area
+        """
+        face_bucket = max(1, self.bucket // 4)
+        fw = max(face_bucket, int(round(face_width / face_bucket)) * face_bucket)
+        fh = max(face_bucket, int(round(face_height / face_bucket)) * face_bucket)
+        key = ('stack', tuple(layers), fw, fh)
+        stacked = self._entries.get(key)
+        if stacked is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return stacked
+
+        prepared = [prepare_garment(garment, layer_region((0, 0, fw, fh), garment, kind), self)
+                    for garment, kind in layers]
+        self.misses += 1
+        stacked = stack_premultiplied([layer for layer in prepared if layer is not None])
+        if stacked is not None:
+            self._entries[key] = stacked
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return stacked
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'bucket': self.bucket,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+def _mtime(path):
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+
+# Shared by every request handled by this process
+garment_cache = GarmentAssetCache()
@@ -0,0 +1,90 @@
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from tryon.compositor import render_tryon
+from tryon.detection import detect_faces
+
+# Largest number of combinations rendered in one request
+MAX_BATCH_PAIRS = 48
+DEFAULT_THUMB_WIDTH = 240
+DEFAULT_BATCH_WORKERS = min(8, os.cpu_count() or 1)
+
+
+def thumbnail(img, width):
+    """
+    Downscale a frame to the given width, keeping its aspect ratio
+    """
+    if width <= 0 or width >= img.shape[1]:
+        return img
+    height = max(1, round(img.shape[0] * width / img.shape[1]))
+    return cv2.resize(img, (width, height), interpolation=cv2.INTER_AREA)
+
+
+def render_batch(img, combinations, thumb_width=DEFAULT_THUMB_WIDTH, max_workers=DEFAULT_BATCH_WORKERS,
+                 blur=True, faces=None):
+    """
+    Render one photo against several (shirt, pant) combinations
+
+    The face is detected once and shared by every render. Each combination
+    is composited on its own copy of the photo in a thread pool; the OpenCV
+    calls release the GIL, so the renders run in parallel.
+
+    Args:
+        img: BGR photo, left untouched
+        combinations: Sequence of (shirt, pant) Garment pairs
+        thumb_width: Width of the returned images (0 keeps the full size)
+        max_workers: Threads used for rendering
+        blur: Whether to blur the background outside the face
+        faces: Face boxes; detected when None
+
+    Returns:
+        (faces, images), with images in the order of combinations
+    """
+    if faces is None:
+        faces = detect_faces(img)
+    faces = [tuple(int(v) for v in face) for face in faces]
+
+    def render(pair):
+        shirt, pant = pair
+        return thumbnail(render_tryon(img.copy(), shirt, pant, faces=faces, blur=blur), thumb_width)
+
+    if max_workers <= 1 or len(combinations) <= 1:
+        return faces, [render(pair) for pair in combinations]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(combinations))) as executor:
+        return faces, list(executor.map(render, combinations))
+
+
+def contact_sheet(images, columns=None, padding=4, background=255):
+    """
+    Tile same-sized images into a single grid image
+
+    Args:
+        images: BGR images, laid out row by row
+        columns: Images per row; defaults to a roughly square grid
+        padding: Pixels between and around the tiles
+        background: Gray level of the padding
+
+    Returns:
+        The contact sheet as a BGR image
+    """
+    if not images:
+        raise ValueError("No images for the contact sheet")
+    if columns is None:
+        columns = math.ceil(math.sqrt(len(images)))
+    columns = max(1, min(columns, len(images)))
+    rows = math.ceil(len(images) / columns)
+    tile_h = max(image.shape[0] for image in images)
+    tile_w = max(image.shape[1] for image in images)
+
+    sheet = np.full((rows * (tile_h + padding) + padding, columns * (tile_w + padding) + padding, 3),
+                    background, dtype=np.uint8)
+    for index, image in enumerate(images):
+        row, column = divmod(index, columns)
+        y = padding + row * (tile_h + padding)
+        x = padding + column * (tile_w + padding)
+        sheet[y:y + image.shape[0], x:x + image.shape[1]] = image
+    return sheet
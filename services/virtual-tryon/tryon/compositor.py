@@ -0,0 +1,422 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from tryon.derivatives import load_mask
+from tryon.detection import detect_faces
+from tryon.effects import blur_background
+from tryon.placement import DEFAULT_ANCHORS, DEFAULT_Z, build_masks, garment_region, legacy_placement, read_flag
+from tryon.warp import warp_garment
+
+# Default garments used when a catalog image cannot be read
+FALLBACK_GARMENTS = {
+    'shirt': os.path.join('static', 'assets', 'shirt1.png'),
+    'pant': os.path.join('static', 'assets', 'pant7.jpg'),
+}
+
+# Threads compositing the faces of one frame concurrently
+DEFAULT_FACE_WORKERS = min(4, os.cpu_count() or 1)
+_face_pool = None
+_face_pool_lock = threading.Lock()
+
+
+class Garment:
+    """
+    A decoded garment image together with its foreground/background masks
+
+    `bgra` packs the image and the mask as alpha; it is what gets scaled and
+    composited. A positive `feather`, read from the placement record's
+    'feather', blurs the alpha once at load time so the garment gets soft
+    edges. `anchor` places the garment relative to the face
+    and `z` stacks it among the other layers (see tryon.placement); None uses
+    the defaults of the garment kind. `warp` holds the control rows of a
+    mesh warp (see tryon.warp); without one the garment is simply resized.
+    """
+
+    def __init__(self, path, image, mask, mask_inv, feather=0, anchor=None, kind=None, z=None, warp=None):
+        self.path = path
+        self.anchor = anchor
+        self.kind = kind
+        self.z = z
+        self.warp = warp
+        self.feather = feather
+        self.image = image
+        self.mask = mask
+        self.mask_inv = mask_inv
+        self.height, self.width = image.shape[:2]
+        self.aspect_ratio = self.width / self.height
+        self.bgra = to_bgra(image, mask, feather)
+
+    @property
+    def nbytes(self):
+        return self.image.nbytes + self.mask.nbytes + self.mask_inv.nbytes + self.bgra.nbytes
+
+
+def to_bgra(image, mask, feather=0):
+    """
+    Stack a BGR image and its mask into a BGRA array
+    """
+    alpha = mask
+    if feather > 0:
+        ksize = 2 * int(feather) + 1
+        alpha = cv2.GaussianBlur(mask, (ksize, ksize), 0)
+    bgra = cv2.cvtColor(image[:, :, 0:3], cv2.COLOR_BGR2BGRA)
+    bgra[:, :, 3] = alpha
+    return bgra
+
+
+def load_garment(path, kind, root_path='', placement=None, mask_path=None):
+    """
+    Read a garment image from disk and prepare its masks
+
+    Args:
+        path: Absolute path of the garment image
+        kind: Garment kind, e.g. 'shirt', 'pant' or 'jacket'
+        root_path: Application root, used to resolve the fallback shirt or pant
+        placement: Placement record stored in the catalog; derived from the
+            file name when None. An optional 'feather' (pixels) softens the
+            garment's alpha edges
+        mask_path: Precomputed mask array of the image (see tryon.derivatives);
+            when it loads, only the color channels are decoded and the mask
+            is memory-mapped instead of being thresholded
+
+    Returns:
+        Garment, or None if neither the image nor the fallback can be read
+    """
+    if placement is None:
+        placement = legacy_placement(path, kind)
+    mask = load_mask(mask_path) if mask_path else None
+    image = cv2.imread(path, cv2.IMREAD_COLOR if mask is not None else read_flag(placement))
+    if image is None:
+        print(f"Erro: Não foi possível ler a imagem da {kind} em {path}")
+        if kind not in FALLBACK_GARMENTS:
+            return None
+        path = os.path.join(root_path, FALLBACK_GARMENTS[kind])
+        placement = legacy_placement(path, kind)
+        mask = None
+        image = cv2.imread(path, read_flag(placement))
+        if image is None:
+            return None
+
+    if mask is not None and mask.shape != image.shape[:2]:
+        # The image was replaced after its mask was written: build the mask from the image itself
+        print(f"Aviso: A máscara em {mask_path} não corresponde à imagem em {path}")
+        mask = None
+        image = cv2.imread(path, read_flag(placement))
+
+    if image.ndim == 2:
+        image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+    if mask is not None:
+        mask_inv = cv2.bitwise_not(mask)
+    else:
+        mask, mask_inv = build_masks(image, placement['mask'])
+    return Garment(path, image[:, :, 0:3], mask, mask_inv, feather=placement.get('feather', 0),
+                   anchor=placement['anchor'], kind=kind, z=placement.get('z', DEFAULT_Z.get(kind)),
+                   warp=placement.get('warp'))
+
+
+def layer_region(face, garment, kind):
+    """
+    Rectangle (x1, y1, x2, y2) covered by a garment for a face box
+
+    Uses the garment's own anchor, or the default anchor of `kind`. The
+    rectangle may extend past the frame; compositing clips it.
+    """
+    anchor = garment.anchor if garment is not None and garment.anchor else DEFAULT_ANCHORS[kind]
+    return garment_region(face, anchor)
+
+
+def pant_region(face, pant=None):
+    """
+    Rectangle (x1, y1, x2, y2) covered by the pant for a face box
+    """
+    return layer_region(face, pant, 'pant')
+
+
+def shirt_region(face, shirt=None):
+    """
+    Rectangle (x1, y1, x2, y2) covered by the shirt for a face box
+    """
+    return layer_region(face, shirt, 'shirt')
+
+
+def stack_layers(garments):
+    """
+    Order (garment, kind) pairs bottom to top by z
+
+    A garment without its own kind or z takes the kind it is worn as. Layers
+    with the same z keep their given order.
+    """
+    layers = [(garment, garment.kind or kind) for garment, kind in garments if garment is not None]
+    return sorted(layers, key=lambda layer: layer[0].z if layer[0].z is not None else DEFAULT_Z.get(layer[1], 0))
+
+
+def scale_garment(garment, width, height):
+    """
+    Resize the garment's BGRA image to the size it takes in the frame, along
+    its mesh warp if it has one
+    """
+    if garment.warp:
+        return warp_garment(garment, width, height)
+    return cv2.resize(garment.bgra, (width, height), interpolation=cv2.INTER_AREA)
+
+
+def premultiply(bgra):
+    """
+    Split a BGRA garment into alpha-premultiplied color and inverse alpha
+
+    Both are 3-channel uint8 arrays, ready for composite_premultiplied.
+    """
+    alpha = cv2.cvtColor(cv2.extractChannel(bgra, 3), cv2.COLOR_GRAY2BGR)
+    color = cv2.multiply(cv2.cvtColor(bgra, cv2.COLOR_BGRA2BGR), alpha, scale=1/255)
+    return color, cv2.bitwise_not(alpha)
+
+
+def composite_premultiplied(frame, color, inv_alpha, x, y):
+    """
+    Blend a premultiplied garment into the frame with its top-left corner at
+    (x, y), in place. Parts of the garment outside the frame are clipped.
+
+    Returns:
+        The frame rectangle (x1, y1, x2, y2) that was written, or None
+    """
+    gh, gw = color.shape[:2]
+    x1, y1 = max(x, 0), max(y, 0)
+    x2, y2 = min(x + gw, frame.shape[1]), min(y + gh, frame.shape[0])
+    if x1 >= x2 or y1 >= y2:
+        return None
+
+    src = (slice(y1 - y, y2 - y), slice(x1 - x, x2 - x))
+    roi = frame[y1:y2, x1:x2]
+    # frame * (1 - alpha) + color * alpha, computed in a single scratch buffer
+    blended = cv2.multiply(roi, inv_alpha[src], scale=1/255)
+    cv2.add(blended, color[src], dst=blended)
+    roi[...] = blended
+    return x1, y1, x2, y2
+
+
+def composite_garment(frame, bgra, x, y):
+    """
+    Alpha-blend a pre-scaled BGRA garment into the frame at (x, y), in place
+    """
+    color, inv_alpha = premultiply(bgra)
+    return composite_premultiplied(frame, color, inv_alpha, x, y)
+
+
+def composite_layers(frame, layers):
+    """
+    Blend premultiplied layers into the frame bottom first, in place
+
+    Args:
+        frame: BGR frame
+        layers: (color, inv_alpha, x, y) tuples, bottom first
+
+    Returns:
+        The frame rectangle (x1, y1, x2, y2) covering what was written, or None
+    """
+    written = [rect for rect in (composite_premultiplied(frame, *layer) for layer in layers) if rect is not None]
+    if not written:
+        return None
+    return (min(rect[0] for rect in written), min(rect[1] for rect in written),
+            max(rect[2] for rect in written), max(rect[3] for rect in written))
+
+
+def stack_premultiplied(layers):
+    """
+    Flatten premultiplied layers into one layer covering their union
+
+    Blending the result once gives the same frame as blending each layer in
+    turn: inv_alpha multiplies through the stack and every layer's color is
+    attenuated by the layers above it. A flattened stack is worth caching,
+    since each frame then reads and writes the union rectangle only once.
+
+    Args:
+        layers: (color, inv_alpha, x, y) tuples, bottom first
+
+    Returns:
+        (color, inv_alpha, x, y) of the flattened stack, or None without layers
+    """
+    if not layers:
+        return None
+    ux1 = min(x for _, _, x, _ in layers)
+    uy1 = min(y for _, _, _, y in layers)
+    ux2 = max(x + color.shape[1] for color, _, x, _ in layers)
+    uy2 = max(y + color.shape[0] for color, _, _, y in layers)
+
+    color_acc = np.zeros((uy2 - uy1, ux2 - ux1, 3), dtype=np.uint8)
+    inv_acc = np.full((uy2 - uy1, ux2 - ux1, 3), 255, dtype=np.uint8)
+    for color, inv_alpha, x, y in layers:
+        gh, gw = color.shape[:2]
+        area = (slice(y - uy1, y - uy1 + gh), slice(x - ux1, x - ux1 + gw))
+        below = cv2.multiply(color_acc[area], inv_alpha, scale=1/255)
+        color_acc[area] = cv2.add(below, color)
+        inv_acc[area] = cv2.multiply(inv_acc[area], inv_alpha, scale=1/255)
+    return color_acc, inv_acc, ux1, uy1
+
+
+def prepare_garment(garment, region, scaled_cache=None):
+    """
+    Scale a garment to a frame rectangle without compositing it
+
+    With a ScaledGarmentCache the garment is scaled to the bucketed size and
+    centered horizontally on the rectangle, reusing earlier scalings.
+
+    Returns:
+        (color, inv_alpha, x, y) for composite_premultiplied, or None for an
+        empty rectangle
+    """
+    x1, y1, x2, y2 = region
+    if x2 <= x1 or y2 <= y1:
+        return None
+    if scaled_cache is None:
+        color, inv_alpha = premultiply(scale_garment(garment, x2 - x1, y2 - y1))
+        return color, inv_alpha, x1, y1
+
+    color, inv_alpha = scaled_cache.get(garment, x2 - x1, y2 - y1)
+    return color, inv_alpha, x1 + (x2 - x1 - color.shape[1]) // 2, y1
+
+
+def place_garment(frame, garment, region, scaled_cache=None):
+    """
+    Scale a garment to a frame rectangle and composite it there
+    """
+    prepared = prepare_garment(garment, region, scaled_cache)
+    if prepared is None:
+        return None
+    return composite_premultiplied(frame, *prepared)
+
+
+def face_pool():
+    """
+    Thread pool shared by the multi-face renders of this process
+    """
+    global _face_pool
+    if _face_pool is None:
+        with _face_pool_lock:
+            if _face_pool is None:
+                _face_pool = ThreadPoolExecutor(max_workers=DEFAULT_FACE_WORKERS,
+                                                thread_name_prefix='tryon-face')
+    return _face_pool
+
+
+def overlaps(a, b):
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+
+def composite_waves(footprints):
+    """
+    Group faces into waves that can be composited concurrently
+
+    Faces are visited back to front. A face goes one wave after the latest
+    earlier face whose footprint it overlaps, so overlapping faces keep their
+    depth order while disjoint ones share a wave.
+
+    Args:
+        footprints: Frame rectangles (x1, y1, x2, y2) each face writes to, back to front
+
+    Returns:
+        List of waves, each a list of indices into footprints
+    """
+    levels = []
+    for index, footprint in enumerate(footprints):
+        level = 0
+        for other in range(index):
+            if overlaps(footprint, footprints[other]):
+                level = max(level, levels[other] + 1)
+        levels.append(level)
+
+    waves = [[] for _ in range(max(levels, default=-1) + 1)]
+    for index, level in enumerate(levels):
+        waves[level].append(index)
+    return waves
+
+
+def render_tryon(img, shirt, pant, faces=None, draw_face=True, blur=True, scaled_cache=None,
+                 max_faces=1, outfits=None, executor=None, layers=()):
+    """
+    Dress the faces of a BGR frame with a shirt and a pant
+
+    With max_faces above one every person in the frame is dressed. Larger
+    faces are taken to be closer to the camera and are composited last, on
+    top of the smaller ones they overlap; faces whose garments do not overlap
+    are composited concurrently on a thread pool.
+
+    Args:
+        img: BGR frame, modified in place
+        shirt: Garment for the shirt
+        pant: Garment for the pant
+        layers: Further garments every face wears (jackets, accessories,
+            footwear), stacked with the shirt and pant by z
+        faces: Face boxes (x, y, w, h); detected when None
+        draw_face: Whether to draw the face rectangle
+        blur: Whether to blur the frame outside the faces
+        scaled_cache: Optional ScaledGarmentCache kept across the frames of a session
+        max_faces: How many of the detected faces to dress
+        outfits: Optional (shirt, pant) pairs assigned to the faces from left
+            to right, cycling; every face wears shirt and pant when None
+        executor: Pool for the concurrent composites; the shared pool when None
+
+    Returns:
+        The composited frame
+    """
+    if faces is None:
+        faces = detect_faces(img)
+    faces = [(int(x), int(y), int(w), int(h)) for (x, y, w, h) in faces[:max(1, max_faces)]]
+    if not faces:
+        return img
+
+    if blur:
+        blur_background(img, faces)
+
+    if outfits:
+        left_to_right = sorted(range(len(faces)), key=lambda index: faces[index][0])
+        assigned = {index: outfits[rank % len(outfits)] for rank, index in enumerate(left_to_right)}
+    else:
+        assigned = {index: (shirt, pant) for index in range(len(faces))}
+
+    # Back to front: smaller faces are further away
+    order = sorted(range(len(faces)), key=lambda index: faces[index][2] * faces[index][3])
+    height, width = img.shape[:2]
+    jobs, footprints = [], []
+    for index in order:
+        face = faces[index]
+        face_shirt, face_pant = assigned[index]
+        worn = stack_layers([(face_pant, 'pant'), (face_shirt, 'shirt')]
+                            + [(garment, garment.kind) for garment in layers])
+        # Garments are scaled here, serially: ScaledGarmentCache is not thread-safe
+        if scaled_cache is not None and len(worn) > 1:
+            # The whole outfit, flattened once per face size, is blended in a single pass
+            stacked = scaled_cache.get_stack(worn, face[2], face[3])
+            prepared = [] if stacked is None else [(stacked[0], stacked[1], face[0] + stacked[2], face[1] + stacked[3])]
+        else:
+            prepared = [prepare_garment(garment, layer_region(face, garment, kind), scaled_cache)
+                        for garment, kind in worn]
+            prepared = [layer for layer in prepared if layer is not None]
+
+        x, y, w, h = face
+        footprint = [x - 2, y - 2, x + w + 3, y + h + 3]
+        for color, _, lx, ly in prepared:
+            footprint = [min(footprint[0], lx), min(footprint[1], ly),
+                         max(footprint[2], lx + color.shape[1]), max(footprint[3], ly + color.shape[0])]
+        jobs.append((face, prepared))
+        footprints.append((max(footprint[0], 0), max(footprint[1], 0),
+                           min(footprint[2], width), min(footprint[3], height)))
+
+    def dress(job):
+        face, prepared = job
+        if draw_face:
+            cv2.rectangle(img, (face[0], face[1]),
+                          (face[0]+face[2], face[1]+face[3]), (255, 0, 0), 2)
+        composite_layers(img, prepared)
+
+    for wave in composite_waves(footprints):
+        if len(wave) == 1 or DEFAULT_FACE_WORKERS <= 1 and executor is None:
+            for index in wave:
+                dress(jobs[index])
+        else:
+            list((executor or face_pool()).map(dress, [jobs[index] for index in wave]))
+
+    return img
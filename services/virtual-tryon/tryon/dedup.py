@@ -0,0 +1,141 @@
+"""
+Content-hash deduplication of uploaded garments
+
+Uploads are hashed while they are read from the request. The processed
+asset of each hash (the background-free PNG, its derivatives and the
+placement computed for it) is shared by every catalog item created from
+the same bytes, so re-uploading a product photo only adds a catalog entry.
+
+Reference counts are not stored separately: catalog items carry the
+'content_hash' of their upload, and the registry is rebuilt from them at
+startup and then kept up to date as items are added and deleted. The files
+of an asset are removed only when its last item goes.
+"""
+import copy
+import hashlib
+import threading
+from contextlib import contextmanager
+
+from tryon.placement import collection_kind
+
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+
+def read_upload(stream, chunk_size=UPLOAD_CHUNK_SIZE):
+    """
+    Read an upload stream to the end, hashing it chunk by chunk
+
+    Returns:
+        (bytearray with the contents, SHA-256 hex digest)
+    """
+    digest = hashlib.sha256()
+    data = bytearray()
+    for chunk in iter(lambda: stream.read(chunk_size), b''):
+        digest.update(chunk)
+        data += chunk
+    return data, digest.hexdigest()
+
+
+class UploadAssetRegistry:
+    """
+    Processed upload assets by content hash, with the number of catalog items using each
+
+    An asset is a dict with the 'image' URL, the 'derivatives' URLs, the
+    garment 'kind' and the 'placement' computed for it. Jobs handling the
+    same hash run one at a time under lock(digest), so a duplicate waits
+    for the first upload and then reuses its asset.
+    """
+
+    def __init__(self):
+        self._assets = {}
+        self._refs = {}
+        self._lock = threading.Lock()
+        # digest -> [lock, holders and waiters]; an entry lives only while someone uses it
+        self._digest_locks = {}
+        self.hits = 0
+
+    def rebuild(self, catalog_data):
+        """
+        Recount the references from the items of a catalog
+        """
+        with self._lock:
+            self._assets.clear()
+            self._refs.clear()
+            for collection, items in catalog_data.items():
+                for item in items:
+                    digest = item.get('content_hash')
+                    if not digest:
+                        continue
+                    if digest not in self._assets:
+                        self._assets[digest] = {'image': item['image'], 'derivatives': item.get('derivatives', {}),
+                                                'kind': collection_kind(collection),
+                                                'placement': item.get('placement')}
+                    self._refs[digest] = self._refs.get(digest, 0) + 1
+
+    @contextmanager
+    def lock(self, digest):
+        """
+        Serialize the work on one content hash
+
+        The lock is shared by everyone holding or waiting for it, and dropped
+        only when the last of them leaves, so a job can never get a fresh lock
+        while another still works on the same hash.
+        """
+        with self._lock:
+            entry = self._digest_locks.setdefault(digest, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._digest_locks[digest]
+
+    def get(self, digest):
+        """
+        Copy of the asset of a hash, or None if no catalog item uses it
+        """
+        with self._lock:
+            asset = self._assets.get(digest)
+            if asset is not None:
+                self.hits += 1
+            return copy.deepcopy(asset)
+
+    def add_reference(self, digest, asset):
+        """
+        Count one more catalog item using an asset, registering it on first use
+        """
+        with self._lock:
+            self._assets.setdefault(digest, copy.deepcopy(asset))
+            self._refs[digest] = self._refs.get(digest, 0) + 1
+
+    def release(self, digest):
+        """
+        Count one catalog item less using an asset
+
+        Returns:
+            The asset once its last reference is gone (its files can then be
+            removed), else None
+        """
+        with self._lock:
+            if digest not in self._refs:
+                return None
+            self._refs[digest] -= 1
+            if self._refs[digest] > 0:
+                return None
+            del self._refs[digest]
+            return self._assets.pop(digest)
+
+    def references(self, digest):
+        with self._lock:
+            return self._refs.get(digest, 0)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'assets': len(self._assets),
+                'references': sum(self._refs.values()),
+                'hits': self.hits,
+            }
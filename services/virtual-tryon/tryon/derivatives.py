@@ -0,0 +1,101 @@
+"""
+Files derived from a processed garment once, when it is uploaded
+
+Every reader of a catalog item used to decode the full processed PNG: the
+catalog grid only needs a thumbnail, a display needs a lighter image, and
+the compositor needs the foreground mask, which it rebuilt by thresholding
+the alpha channel. Ingestion now writes all three next to the PNG in one
+pass and records them in the catalog item under 'derivatives':
+
+- 'thumbnail': WebP with alpha, at most THUMBNAIL_SIDE pixels on its long
+  side, shown by the catalog grid
+- 'webp': WebP display image at full size, with alpha, shown when a catalog
+  item is opened
+- 'mask': the garment mask as a uint8 .npy array, memory-mapped on load
+"""
+import os
+
+import cv2
+import numpy as np
+
+# Long side of the catalog grid thumbnails
+THUMBNAIL_SIDE = 256
+WEBP_QUALITY = 85
+
+DERIVATIVE_PREFIXES = {'thumbnail': 'thumb', 'webp': 'display', 'mask': 'mask'}
+DERIVATIVE_EXTENSIONS = {'thumbnail': '.webp', 'webp': '.webp', 'mask': '.npy'}
+
+
+def derivative_filenames(stem):
+    """
+    File names of the derivatives of an upload, e.g. 'shirt_<uuid>' -> 'thumb_shirt_<uuid>.webp'
+    """
+    return {name: f'{prefix}_{stem}{DERIVATIVE_EXTENSIONS[name]}' for name, prefix in DERIVATIVE_PREFIXES.items()}
+
+
+def thumbnail(image, side=THUMBNAIL_SIDE):
+    """
+    Copy of the image shrunk to at most `side` pixels on its long side; never enlarged
+    """
+    height, width = image.shape[:2]
+    scale = side / max(height, width)
+    if scale >= 1.0:
+        return image
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    return cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+
+
+def write_derivatives(bgra, mask, directory, stem):
+    """
+    Write the thumbnail, WebP display image and mask array of a processed garment
+
+    Args:
+        bgra: Processed garment, BGRA with the background transparent
+        mask: Foreground mask the compositor would build for it, uint8 255 on the garment
+        directory: Directory the files are written to
+        stem: Common part of the file names, e.g. 'shirt_<uuid>'
+
+    Returns:
+        {'thumbnail': file name, 'webp': file name, 'mask': file name}
+
+    Raises:
+        ValueError: If an image cannot be encoded
+    """
+    filenames = derivative_filenames(stem)
+    params = [cv2.IMWRITE_WEBP_QUALITY, WEBP_QUALITY]
+    for name, image in (('thumbnail', thumbnail(bgra)), ('webp', bgra)):
+        ok, encoded = cv2.imencode('.webp', image, params)
+        if not ok:
+            raise ValueError(f"Could not encode the {name} of {stem}")
+        with open(os.path.join(directory, filenames[name]), 'wb') as f:
+            f.write(encoded.tobytes())
+    np.save(os.path.join(directory, filenames['mask']), np.ascontiguousarray(mask, dtype=np.uint8))
+    return filenames
+
+
+def load_mask(path):
+    """
+    Memory-mapped, read-only garment mask written by write_derivatives
+
+    Returns:
+        2-D uint8 array, or None if the file is missing or not a mask
+    """
+    try:
+        mask = np.load(path, mmap_mode='r')
+    except (OSError, ValueError) as e:
+        print(f"Erro: Não foi possível ler a máscara em {path}: {str(e)}")
+        return None
+    if mask.ndim != 2 or mask.dtype != np.uint8:
+        print(f"Erro: Máscara inválida em {path}")
+        return None
+    return mask
+
+
+def derivative_path(item, name, root_path):
+    """
+    Absolute path of a derivative recorded in a catalog item, or None if it has none
+    """
+    url = (item.get('derivatives') or {}).get(name)
+    if not url:
+        return None
+    return os.path.join(root_path, url.replace('\\', '/').lstrip('/'))
@@ -0,0 +1,131 @@
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+
+# The cascade ships next to flasktry.py; resolve it independently of the CWD
+SERVICE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CASCADE_PATH = os.path.join(SERVICE_ROOT, 'haarcascade_frontalface_default.xml')
+
+# Detection runs on a copy whose long side is at most this many pixels
+DEFAULT_DETECT_MAX_SIDE = 320
+# Smallest face that must still be found, as a fraction of the long side
+DEFAULT_MIN_FACE_RATIO = 0.05
+
+
+class FaceDetectorRegistry:
+    """
+    Lazily loaded Haar cascades, one instance per thread and cascade file
+
+    CascadeClassifier objects are not safe to share between threads, so each
+    worker thread parses the XML the first time it needs it and keeps the
+    instance for the rest of its life. The load counter and the accumulated
+    load time show how often that actually happens.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.load_count = 0
+        self.load_seconds = 0.0
+
+    def get(self, path=CASCADE_PATH):
+        """
+        Return the calling thread's CascadeClassifier for the given file
+        """
+        cascades = getattr(self._local, 'cascades', None)
+        if cascades is None:
+            cascades = self._local.cascades = {}
+
+        cascade = cascades.get(path)
+        if cascade is None:
+            started = time.perf_counter()
+            cascade = cv2.CascadeClassifier(path)
+            if cascade.empty():
+                raise IOError(f"Could not load face cascade from {path}")
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.load_count += 1
+                self.load_seconds += elapsed
+            cascades[path] = cascade
+        return cascade
+
+    def stats(self):
+        with self._lock:
+            return {
+                'loads': self.load_count,
+                'load_seconds': round(self.load_seconds, 4),
+            }
+
+
+# Shared by the try-on pipeline and the skin tone classifier
+face_detectors = FaceDetectorRegistry()
+
+
+def get_face_cascade(path=CASCADE_PATH):
+    return face_detectors.get(path)
+
+
+def detection_scale(shape, window_size, max_side=DEFAULT_DETECT_MAX_SIDE,
+                    min_face_size=None, min_face_ratio=DEFAULT_MIN_FACE_RATIO):
+    """
+    Scale factor (<= 1) applied to an image before running the cascade
+
+    The image is shrunk until its long side fits max_side, but never so far
+    that a face of min_face_size pixels (by default min_face_ratio of the long
+    side) becomes smaller than the cascade window and stops being detected.
+    """
+    long_side = max(shape[:2])
+    if not max_side or long_side <= max_side:
+        return 1.0
+
+    scale = max_side / long_side
+    if min_face_size is None:
+        min_face_size = long_side * min_face_ratio
+    if min_face_size > 0:
+        scale = max(scale, max(window_size) / min_face_size)
+    return min(scale, 1.0)
+
+
+def detect_faces_gray(gray, max_side=DEFAULT_DETECT_MAX_SIDE, min_face_size=None,
+                      min_face_ratio=DEFAULT_MIN_FACE_RATIO, scale_factor=1.3, min_neighbors=5):
+    """
+    Run the Haar cascade on a downscaled copy of a grayscale frame
+
+    Args:
+        gray: Grayscale image at full resolution
+        max_side: Long side of the copy the cascade runs on; 0 or None disables downscaling
+        min_face_size: Smallest face, in full-resolution pixels, that must still be found
+        min_face_ratio: Used for min_face_size when it is None
+        scale_factor: detectMultiScale scale factor
+        min_neighbors: detectMultiScale min neighbors
+
+    Returns:
+        Face boxes (x, y, w, h) in full-resolution coordinates
+    """
+    cascade = get_face_cascade()
+    scale = detection_scale(gray.shape, cascade.getOriginalWindowSize(),
+                            max_side, min_face_size, min_face_ratio)
+    if scale >= 1.0:
+        return cascade.detectMultiScale(gray, scale_factor, min_neighbors)
+
+    height, width = gray.shape[:2]
+    small = cv2.resize(gray, (max(1, round(width * scale)), max(1, round(height * scale))),
+                       interpolation=cv2.INTER_AREA)
+    faces = cascade.detectMultiScale(small, scale_factor, min_neighbors)
+    if len(faces) == 0:
+        return faces
+
+    faces = np.round(np.asarray(faces, dtype=np.float64) / scale).astype(np.int32)
+    faces[:, 2] = np.minimum(faces[:, 2], width - faces[:, 0])
+    faces[:, 3] = np.minimum(faces[:, 3], height - faces[:, 1])
+    return faces
+
+
+def detect_faces(img, **kwargs):
+    """
+    Run the Haar cascade on a BGR frame and return the face boxes
+    """
+    return detect_faces_gray(cv2.cvtColor(img, cv2.COLOR_BGR2GRAY), **kwargs)
@@ -0,0 +1,68 @@
+import cv2
+
+# Blur kernel size, in full-resolution pixels
+DEFAULT_BLUR_KSIZE = 5
+# Kernels up to this size are cheaper to run directly than to downscale for
+MAX_FULL_RESOLUTION_KSIZE = 7
+# Kernel size used on the downscaled copy
+SMALL_KSIZE = 5
+
+
+def blur_scale(ksize):
+    """
+    Resolution at which a blur of `ksize` full-resolution pixels is computed
+
+    Small kernels run directly on the frame: one GaussianBlur pass costs less
+    than the resize there and back. Larger ones run a fixed 5x5 kernel on a
+    copy shrunk by the same ratio, which keeps the cost flat as the blur
+    grows.
+    """
+    if ksize <= MAX_FULL_RESOLUTION_KSIZE:
+        return 1.0
+    return SMALL_KSIZE / ksize
+
+
+def blur_background(img, keep_boxes=(), ksize=DEFAULT_BLUR_KSIZE, scale=None):
+    """
+    Blur the whole frame in one pass, keeping some rectangles sharp, in place
+
+    The rectangles in keep_boxes (x, y, w, h), usually the faces, are saved
+    before the blur and restored afterwards. Garments are composited on top
+    later, so they stay sharp as well.
+
+    Args:
+        img: BGR frame
+        keep_boxes: Rectangles left untouched
+        ksize: Blur kernel size in full-resolution pixels
+        scale: Resolution of the blur pass; chosen from ksize when None
+    """
+    height, width = img.shape[:2]
+    kept = []
+    for (x, y, w, h) in keep_boxes:
+        x1, y1 = max(int(x), 0), max(int(y), 0)
+        x2, y2 = min(int(x + w), width), min(int(y + h), height)
+        if x1 < x2 and y1 < y2:
+            kept.append((x1, y1, x2, y2, img[y1:y2, x1:x2].copy()))
+
+    if scale is None:
+        scale = blur_scale(ksize)
+    contiguous = img.flags['C_CONTIGUOUS']
+
+    if scale >= 1.0:
+        ksize = ksize | 1
+        if contiguous:
+            cv2.GaussianBlur(img, (ksize, ksize), 0, dst=img)
+        else:
+            img[...] = cv2.GaussianBlur(img, (ksize, ksize), 0)
+    else:
+        small_size = (max(1, int(width * scale)), max(1, int(height * scale)))
+        small = cv2.resize(img, small_size, interpolation=cv2.INTER_AREA)
+        cv2.GaussianBlur(small, (SMALL_KSIZE, SMALL_KSIZE), 0, dst=small)
+        if contiguous:
+            cv2.resize(small, (width, height), dst=img, interpolation=cv2.INTER_LINEAR)
+        else:
+            img[...] = cv2.resize(small, (width, height), interpolation=cv2.INTER_LINEAR)
+
+    for x1, y1, x2, y2, patch in kept:
+        img[y1:y2, x1:x2] = patch
+    return img
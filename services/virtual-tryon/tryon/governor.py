@@ -0,0 +1,195 @@
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import cv2
+
+DEFAULT_TARGET_FPS = 15
+# Weight of the newest sample in the moving averages
+DEFAULT_SMOOTHING = 0.2
+# Frames between two adjustments, so each one can show its effect first
+DEFAULT_COOLDOWN = 10
+# Decisions kept for stats()
+DECISION_HISTORY = 20
+# Relax a setting once frames take less than this share of the budget
+RELAX_RATIO = 0.7
+
+MIN_OUTPUT_SCALE = 0.5
+OUTPUT_SCALE_STEP = 0.125
+MIN_JPEG_QUALITY = 50
+MAX_JPEG_QUALITY = 90
+JPEG_QUALITY_STEP = 10
+MAX_DETECT_INTERVAL = 30
+
+# The setting that cuts the cost of each stage
+STAGE_KNOBS = {'detect': 'detect_interval', 'composite': 'scale', 'encode': 'jpeg_quality'}
+
+
+class FrameGovernor:
+    """
+    Holds a live try-on loop at a target frame rate
+
+    The loop reports how long each stage takes (capture, detect, composite,
+    encode) through stage(); the governor keeps an exponential moving average
+    per stage and of the whole frame. While frames run over budget it
+    degrades the setting behind the most expensive stage: a longer detection
+    interval, a smaller output resolution or a lower JPEG quality. When
+    frames come in well under budget the most recent degradation is undone
+    first. Each change is logged in stats().
+    """
+
+    def __init__(self, target_fps=DEFAULT_TARGET_FPS, detect_interval=5, jpeg_quality=MAX_JPEG_QUALITY,
+                 smoothing=DEFAULT_SMOOTHING, cooldown=DEFAULT_COOLDOWN, adaptive=True):
+        self.target_fps = max(1.0, float(target_fps))
+        self.budget_ms = 1000.0 / self.target_fps
+        self.smoothing = smoothing
+        self.cooldown = cooldown
+        self.adaptive = adaptive
+        self.detect_interval = max(1, int(detect_interval))
+        self.scale = 1.0
+        self.jpeg_quality = int(jpeg_quality)
+        self._baseline = {'detect_interval': self.detect_interval, 'scale': self.scale,
+                          'jpeg_quality': self.jpeg_quality}
+        self.stage_ms = {}
+        self.frame_ms = None
+        self.last_frame_ms = None
+        self.frames = 0
+        self.over_budget = 0
+        self.decisions = deque(maxlen=DECISION_HISTORY)
+        self._degraded = []
+        self._frame_start = None
+        self._since_change = 0
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Time one stage of the current frame
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._record(name, (time.perf_counter() - started) * 1000)
+
+    def begin_frame(self):
+        self._frame_start = time.perf_counter()
+
+    def end_frame(self):
+        """
+        Close the current frame and adapt the settings
+
+        Returns:
+            The name of the setting that changed, or None
+        """
+        if self._frame_start is None:
+            return None
+        elapsed = (time.perf_counter() - self._frame_start) * 1000
+        self._frame_start = None
+        self.last_frame_ms = elapsed
+        self.frame_ms = _ewma(self.frame_ms, elapsed, self.smoothing)
+        self.frames += 1
+        if elapsed > self.budget_ms:
+            self.over_budget += 1
+
+        self._since_change += 1
+        if not self.adaptive or self._since_change < self.cooldown:
+            return None
+        if self.frame_ms > self.budget_ms:
+            return self._degrade()
+        if self.frame_ms < self.budget_ms * RELAX_RATIO:
+            return self._relax()
+        return None
+
+    def wait_ms(self):
+        """
+        Time left in the budget of the last frame, for cv2.waitKey
+
+        Call it after end_frame(), so the wait itself is not counted as work.
+        Never less than 1 ms, so the window keeps processing events.
+        """
+        if self.last_frame_ms is None:
+            return 1
+        return max(1, int(self.budget_ms - self.last_frame_ms))
+
+    def resize(self, img):
+        """
+        Apply the current output scale to a frame
+        """
+        if self.scale >= 1.0:
+            return img
+        return cv2.resize(img, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+
+    def scale_boxes(self, boxes):
+        if self.scale >= 1.0:
+            return boxes
+        return [tuple(int(v * self.scale) for v in box) for box in boxes]
+
+    def stats(self):
+        return {
+            'target_fps': self.target_fps,
+            'budget_ms': round(self.budget_ms, 2),
+            'frame_ms': round(self.frame_ms, 2) if self.frame_ms is not None else None,
+            'effective_fps': round(1000 / self.frame_ms, 2) if self.frame_ms else None,
+            'stage_ms': {name: round(ms, 2) for name, ms in self.stage_ms.items()},
+            'frames': self.frames,
+            'over_budget': self.over_budget,
+            'detect_interval': self.detect_interval,
+            'scale': self.scale,
+            'jpeg_quality': self.jpeg_quality,
+            'decisions': list(self.decisions),
+        }
+
+    def _record(self, name, ms):
+        self.stage_ms[name] = _ewma(self.stage_ms.get(name), ms, self.smoothing)
+
+    def _degrade(self):
+        # Most expensive adjustable stage first, falling back to the cheaper ones
+        stages = sorted((name for name in STAGE_KNOBS if name in self.stage_ms),
+                        key=lambda name: self.stage_ms[name], reverse=True)
+        for name in stages:
+            knob = STAGE_KNOBS[name]
+            if self._step(knob, degrade=True):
+                self._degraded.append(knob)
+                return self._decided(knob, 'degrade')
+        return None
+
+    def _relax(self):
+        while self._degraded:
+            knob = self._degraded.pop()
+            if self._step(knob, degrade=False):
+                return self._decided(knob, 'relax')
+        return None
+
+    def _step(self, knob, degrade):
+        if knob == 'detect_interval':
+            if degrade:
+                value = min(MAX_DETECT_INTERVAL, self.detect_interval * 2)
+            else:
+                value = max(self._baseline[knob], self.detect_interval // 2)
+            changed, self.detect_interval = value != self.detect_interval, value
+        elif knob == 'scale':
+            step = -OUTPUT_SCALE_STEP if degrade else OUTPUT_SCALE_STEP
+            value = min(self._baseline[knob], max(MIN_OUTPUT_SCALE, self.scale + step))
+            changed, self.scale = value != self.scale, value
+        else:
+            step = -JPEG_QUALITY_STEP if degrade else JPEG_QUALITY_STEP
+            value = min(self._baseline[knob], max(MIN_JPEG_QUALITY, self.jpeg_quality + step))
+            changed, self.jpeg_quality = value != self.jpeg_quality, value
+        return changed
+
+    def _decided(self, knob, action):
+        self._since_change = 0
+        self.decisions.append({
+            'frame': self.frames,
+            'action': action,
+            'setting': knob,
+            'value': getattr(self, knob),
+            'frame_ms': round(self.frame_ms, 2),
+        })
+        return knob
+
+
+def _ewma(previous, sample, smoothing):
+    if previous is None:
+        return sample
+    return previous + smoothing * (sample - previous)
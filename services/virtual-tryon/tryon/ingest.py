@@ -0,0 +1,157 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+from tryon.metrics import latency_stats
+
+DEFAULT_INGEST_WORKERS = 2
+# Jobs waiting or running at once; further uploads are refused until some finish
+DEFAULT_MAX_PENDING = 32
+# Finished jobs whose status can still be looked up
+DEFAULT_JOB_HISTORY = 200
+# Latencies kept for the percentiles in stats()
+LATENCY_SAMPLES = 200
+
+QUEUED = 'queued'
+PROCESSING = 'processing'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class QueueFullError(Exception):
+    """
+    Raised when the ingestion queue already holds its maximum of pending jobs
+    """
+
+
+class IngestionQueue:
+    """
+    Bounded background processing of uploaded garments
+
+    submit() returns a job id at once and the job runs on a small thread
+    pool; get() reports its state (queued, processing, done or failed) with
+    the result or the error. At most `max_pending` jobs wait or run at once,
+    so a burst of uploads cannot pile up unbounded work. stats() exposes the
+    queue depth and the queue and processing latencies of recent jobs.
+    """
+
+    def __init__(self, process, max_workers=DEFAULT_INGEST_WORKERS, max_pending=DEFAULT_MAX_PENDING,
+                 history=DEFAULT_JOB_HISTORY):
+        """
+        Args:
+            process: Callable run for each job's payload; its return value is
+                the job result, and an exception fails the job
+            max_workers: Jobs processed concurrently
+            max_pending: Jobs queued or running before submit() refuses more
+            history: Finished jobs kept for get()
+        """
+        self.process = process
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.history = history
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self._jobs = OrderedDict()
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._finished = threading.Condition(self._lock)
+        self._queue_ms = deque(maxlen=LATENCY_SAMPLES)
+        self._processing_ms = deque(maxlen=LATENCY_SAMPLES)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ingest')
+
+    def submit(self, payload):
+        """
+        Queue a payload for processing
+
+        Returns:
+            The job id
+
+        Raises:
+            QueueFullError: If max_pending jobs are already queued or running
+        """
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                raise QueueFullError(f"{self._pending} jobs already pending")
+            job_id = uuid.uuid4().hex
+            self._jobs[job_id] = {'id': job_id, 'status': QUEUED, 'submitted_at': time.time(),
+                                  'started_at': None, 'finished_at': None, 'result': None, 'error': None}
+            self._pending += 1
+            self.submitted += 1
+            self._trim()
+        self._executor.submit(self._run, job_id, payload)
+        return job_id
+
+    def get(self, job_id):
+        """
+        Copy of a job's state, or None for an unknown or forgotten job
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def wait(self, job_id, timeout=None):
+        """
+        Block until a job finishes; returns its state as get() does
+        """
+        with self._finished:
+            self._finished.wait_for(lambda: self._jobs.get(job_id, {}).get('status', DONE) in (DONE, FAILED),
+                                    timeout)
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def stats(self):
+        with self._lock:
+            queued = sum(1 for job in self._jobs.values() if job['status'] == QUEUED)
+            return {
+                'depth': queued,
+                'processing': self._pending - queued,
+                'max_pending': self.max_pending,
+                'workers': self.max_workers,
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'failed': self.failed,
+                'rejected': self.rejected,
+                'queue_ms': latency_stats(self._queue_ms),
+                'processing_ms': latency_stats(self._processing_ms),
+            }
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+    def _run(self, job_id, payload):
+        started = time.time()
+        with self._lock:
+            job = self._jobs[job_id]
+            job['status'], job['started_at'] = PROCESSING, started
+            self._queue_ms.append((started - job['submitted_at']) * 1000)
+
+        try:
+            result, error = self.process(payload), None
+        except Exception as e:
+            print(f"Erro ao processar o envio {job_id}: {str(e)}")
+            result, error = None, str(e)
+
+        finished = time.time()
+        with self._lock:
+            job.update(status=FAILED if error is not None else DONE, finished_at=finished,
+                       result=result, error=error)
+            job['processing_ms'] = round((finished - started) * 1000, 2)
+            self._processing_ms.append((finished - started) * 1000)
+            self._pending -= 1
+            if error is not None:
+                self.failed += 1
+            else:
+                self.completed += 1
+            self._finished.notify_all()
+
+    def _trim(self):
+        # Forget the oldest finished jobs; pending ones are always kept
+        finished = [job_id for job_id, job in self._jobs.items() if job['status'] in (DONE, FAILED)]
+        for job_id in finished[:max(0, len(self._jobs) - self.history)]:
+            del self._jobs[job_id]
+
@@ -0,0 +1,172 @@
+import threading
+import time
+from collections import deque
+
+from tryon.metrics import latency_stats
+
+# End-to-end latencies kept for the percentiles in stats()
+LATENCY_SAMPLES = 300
+
+
+class LatestFrameSlot:
+    """
+    Single-slot hand-off between two threads that always holds the newest item
+
+    put() never blocks: an item nobody has taken yet is replaced and counted
+    as dropped, so a slow consumer skips frames instead of falling behind.
+    """
+
+    def __init__(self):
+        self._item = None
+        self._ready = threading.Condition()
+        self._closed = False
+        self.dropped = 0
+
+    def put(self, item):
+        with self._ready:
+            if self._item is not None:
+                self.dropped += 1
+            self._item = item
+            self._ready.notify()
+
+    def get(self, timeout=None):
+        """
+        Take the newest item, waiting for one
+
+        Returns:
+            The item, or None on timeout or once the slot is closed and empty
+        """
+        with self._ready:
+            self._ready.wait_for(lambda: self._item is not None or self._closed, timeout)
+            item, self._item = self._item, None
+            return item
+
+    def close(self):
+        with self._ready:
+            self._closed = True
+            self._ready.notify_all()
+
+    @property
+    def closed(self):
+        return self._closed
+
+
+class KioskPipeline:
+    """
+    Capture, processing and display of a local camera on separate threads
+
+    A capture thread reads the camera as fast as it delivers and leaves the
+    newest frame in a LatestFrameSlot; a processing thread composites the
+    newest frame whenever it is free; the display loop shows the newest
+    composited frame. Camera latency no longer adds onto processing time,
+    and whichever stage is slowest drops frames rather than queueing them.
+
+    The display loop runs on the thread that calls run(), because OpenCV's
+    HighGUI windows must be driven from the thread that created them.
+    """
+
+    def __init__(self, source, process, display):
+        """
+        Args:
+            source: Object with a read() -> (ret, frame) method, e.g. cv2.VideoCapture
+            process: Callable turning a captured frame into the frame to show
+            display: Callable showing a frame; returns False to stop the pipeline
+        """
+        self.source = source
+        self.process = process
+        self.display = display
+        self.captured_slot = LatestFrameSlot()
+        self.processed_slot = LatestFrameSlot()
+        self.captured = 0
+        self.processed = 0
+        self.displayed = 0
+        self.errors = 0
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+        self._stop = threading.Event()
+        self._threads = []
+        self._started_at = None
+
+    def run(self, max_frames=None, timeout=None):
+        """
+        Run until the source ends, display returns False, max_frames frames
+        were shown or timeout seconds passed
+
+        Returns:
+            stats()
+        """
+        self._started_at = time.perf_counter()
+        self._threads = [
+            threading.Thread(target=self._capture_loop, name='kiosk-capture', daemon=True),
+            threading.Thread(target=self._process_loop, name='kiosk-process', daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+        deadline = None if timeout is None else self._started_at + timeout
+        try:
+            while not self._stop.is_set():
+                if deadline is not None and time.perf_counter() > deadline:
+                    break
+                item = self.processed_slot.get(timeout=0.1)
+                if item is None:
+                    if self.processed_slot.closed:
+                        break
+                    continue
+                captured_at, frame = item
+                if self.display(frame) is False:
+                    break
+                self.latencies.append((time.perf_counter() - captured_at) * 1000)
+                self.displayed += 1
+                if max_frames is not None and self.displayed >= max_frames:
+                    break
+        finally:
+            self.stop()
+        return self.stats()
+
+    def stop(self):
+        self._stop.set()
+        self.captured_slot.close()
+        self.processed_slot.close()
+        for thread in self._threads:
+            if thread is not threading.current_thread():
+                thread.join(timeout=1)
+
+    def stats(self):
+        elapsed = time.perf_counter() - self._started_at if self._started_at else 0.0
+        return {
+            'captured': self.captured,
+            'processed': self.processed,
+            'displayed': self.displayed,
+            'dropped_before_processing': self.captured_slot.dropped,
+            'dropped_before_display': self.processed_slot.dropped,
+            'errors': self.errors,
+            'fps': round(self.displayed / elapsed, 2) if elapsed else 0.0,
+            'latency_ms': latency_stats(self.latencies),
+        }
+
+    def _capture_loop(self):
+        while not self._stop.is_set():
+            ret, frame = self.source.read()
+            if not ret:
+                # Let the frames already in flight reach the display before stopping
+                self.captured_slot.close()
+                return
+            self.captured += 1
+            self.captured_slot.put((time.perf_counter(), frame))
+
+    def _process_loop(self):
+        while not self._stop.is_set():
+            item = self.captured_slot.get()
+            if item is None:
+                self.processed_slot.close()
+                return
+            captured_at, frame = item
+            try:
+                frame = self.process(frame)
+            except Exception as e:
+                self.errors += 1
+                print(f"Erro ao processar quadro do quiosque: {str(e)}")
+                continue
+            self.processed += 1
+            self.processed_slot.put((captured_at, frame))
+
@@ -0,0 +1,28 @@
+"""
+Latency summaries shared by the stats() of the pipeline components
+
+Percentiles use np.percentile with linear interpolation, like the
+benchmarks, so the p50/p95 reported by /api/tryon/stats, the kiosk and
+benchmarks/pipeline.py are comparable.
+"""
+import numpy as np
+
+
+def latency_stats(samples):
+    """
+    Mean, percentiles and maximum of a sequence of latencies in milliseconds
+
+    Returns:
+        {'avg', 'p50', 'p95', 'max'} rounded to 2 decimals, all None when there
+        are no samples
+    """
+    values = np.asarray(list(samples), dtype=np.float64)
+    if values.size == 0:
+        return {'avg': None, 'p50': None, 'p95': None, 'max': None}
+    p50, p95 = np.percentile(values, [50, 95])
+    return {
+        'avg': round(float(values.mean()), 2),
+        'p50': round(float(p50), 2),
+        'p95': round(float(p95), 2),
+        'max': round(float(values.max()), 2),
+    }
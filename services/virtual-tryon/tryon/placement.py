@@ -0,0 +1,230 @@
+import argparse
+import copy
+import json
+import os
+
+import cv2
+
+from tryon.warp import resolve_warp
+
+# Gray level above which an upload without alpha is treated as background
+UPLOAD_BACKGROUND_THRESHOLD = 240
+
+# Catalog collections and the garment kind of their items
+CATALOG_COLLECTIONS = {
+    'shirts': 'shirt',
+    'pants': 'pant',
+    'jackets': 'jacket',
+    'accessories': 'accessory',
+    'footwear': 'footwear',
+}
+
+# Kinds worn on top of the shirt and pant, each optional
+LAYER_KINDS = ('jacket', 'accessory', 'footwear')
+
+# Garment rectangles relative to the face box: x/width in face widths, y/height in face heights
+DEFAULT_ANCHORS = {
+    'shirt': {'x': -1.0, 'y': 1.0, 'width': 3.0, 'height': 4.0},
+    'pant': {'x': -1.0, 'y': 5.0, 'width': 3.0, 'height': 5.0},
+    'jacket': {'x': -1.2, 'y': 0.9, 'width': 3.4, 'height': 4.4},
+    'accessory': {'x': 0.0, 'y': 1.0, 'width': 1.0, 'height': 0.8},
+    'footwear': {'x': -0.5, 'y': 9.5, 'width': 2.0, 'height': 1.0},
+}
+
+DEFAULT_MASKS = {
+    'shirt': {'source': 'gray', 'threshold': 0, 'invert': False},
+    'pant': {'source': 'gray', 'threshold': 50, 'invert': False},
+    'jacket': {'source': 'gray', 'threshold': 0, 'invert': False},
+    'accessory': {'source': 'gray', 'threshold': 0, 'invert': False},
+    'footwear': {'source': 'gray', 'threshold': 0, 'invert': False},
+}
+
+# Stacking order of the kinds, bottom first; an item can override it with its own 'z'
+DEFAULT_Z = {
+    'pant': 10,
+    'footwear': 15,
+    'shirt': 20,
+    'jacket': 30,
+    'accessory': 40,
+}
+
+# Catalog images that predate per-item metadata and need their own settings
+LEGACY_OVERRIDES = {
+    'shirt51.jpg': {'mask': {'source': 'gray', 'threshold': 200, 'invert': True}},
+    'pant7.jpg': {'mask': {'source': 'gray', 'threshold': 100, 'invert': False}},
+    'pant21.png': {'anchor': {'x': -0.5, 'y': 4.0, 'width': 2.0, 'height': 5.0}},
+}
+
+
+def collection_kind(collection):
+    """
+    Garment kind of a catalog collection, e.g. 'jackets' -> 'jacket'
+    """
+    return CATALOG_COLLECTIONS.get(collection, collection[:-1] if collection.endswith('s') else collection)
+
+
+def kind_collection(kind):
+    """
+    Catalog collection holding a garment kind, e.g. 'accessory' -> 'accessories'
+    """
+    for collection, item_kind in CATALOG_COLLECTIONS.items():
+        if item_kind == kind:
+            return collection
+    return f'{kind}s'
+
+
+def default_placement(kind):
+    """
+    Placement record used for a garment kind when nothing more specific is known
+    """
+    kind = kind if kind in DEFAULT_ANCHORS else 'shirt'
+    return {'mask': dict(DEFAULT_MASKS[kind]), 'anchor': dict(DEFAULT_ANCHORS[kind]), 'z': DEFAULT_Z[kind]}
+
+
+def legacy_placement(path, kind):
+    """
+    Placement for a catalog item without stored metadata, derived from its file name
+
+    Args:
+        path: Path of the garment image
+        kind: Garment kind, e.g. 'shirt' or 'pant'
+
+    Returns:
+        Placement record without a bounding box
+    """
+    placement = default_placement(kind)
+    normalized = path.replace('\\', '/')
+    if 'user-uploads' in normalized:
+        # Uploads carry transparency from remove_background
+        placement['mask'] = {'source': 'alpha', 'threshold': 127, 'invert': False}
+    for filename, override in LEGACY_OVERRIDES.items():
+        if os.path.basename(normalized) == filename:
+            placement.update(copy.deepcopy(override))
+    return placement
+
+
+def read_flag(placement):
+    """
+    imread flag that keeps the channels the placement's mask needs
+    """
+    return cv2.IMREAD_UNCHANGED if placement['mask']['source'] == 'alpha' else cv2.IMREAD_COLOR
+
+
+def build_masks(image, mask_spec):
+    """
+    Foreground mask and its inverse for a garment image
+
+    Args:
+        image: BGR or BGRA garment image
+        mask_spec: {'source': 'gray' | 'alpha', 'threshold': int, 'invert': bool}
+
+    Returns:
+        (mask, mask_inv), uint8 arrays with 255 on the garment
+    """
+    if mask_spec['source'] == 'alpha' and image.ndim == 3 and image.shape[2] == 4:
+        channel = cv2.extractChannel(image, 3)
+        threshold, invert = mask_spec['threshold'], mask_spec['invert']
+    else:
+        channel = cv2.cvtColor(image[:, :, 0:3], cv2.COLOR_BGR2GRAY)
+        if mask_spec['source'] == 'alpha':
+            # Alpha was expected but the file has none: treat near-white as background
+            threshold, invert = UPLOAD_BACKGROUND_THRESHOLD, True
+        else:
+            threshold, invert = mask_spec['threshold'], mask_spec['invert']
+
+    mode = cv2.THRESH_BINARY_INV if invert else cv2.THRESH_BINARY
+    _, mask = cv2.threshold(channel, threshold, 255, mode)
+    return mask, cv2.bitwise_not(mask)
+
+
+def garment_placement(image, kind, mask=None, anchor=None, warp=None):
+    """
+    Compute the placement record stored with a catalog item
+
+    Args:
+        image: Garment image as read with IMREAD_UNCHANGED
+        kind: 'shirt', 'pant' or another catalog item type
+        mask: Mask spec; defaults to alpha when the image has it, else the kind's default
+        anchor: Anchor offsets; defaults to the kind's default
+        warp: Mesh warp control rows, or 'default' for the kind's preset;
+            the garment is stretched to its rectangle when None
+
+    Returns:
+        {'mask': ..., 'anchor': ..., 'z': int, 'bbox': [x, y, w, h]}, plus
+        'warp' when the garment is fitted
+
+    Raises:
+        ValueError: If the warp is malformed
+    """
+    placement = default_placement(kind)
+    if mask is not None:
+        placement['mask'] = dict(mask)
+    elif image.ndim == 3 and image.shape[2] == 4:
+        placement['mask'] = {'source': 'alpha', 'threshold': 127, 'invert': False}
+    if anchor is not None:
+        placement['anchor'] = dict(anchor)
+    if warp is not None:
+        rows = resolve_warp(warp, kind)
+        if rows is not None:
+            placement['warp'] = rows
+
+    garment_mask, _ = build_masks(image, placement['mask'])
+    placement['bbox'] = [int(v) for v in cv2.boundingRect(garment_mask)]
+    return placement
+
+
+def garment_region(face, anchor):
+    """
+    Rectangle (x1, y1, x2, y2) a garment covers for a face box (x, y, w, h)
+
+    The rectangle may extend past the frame; compositing clips it.
+    """
+    x, y, w, h = face
+    x1 = x + anchor['x'] * w
+    x2 = x1 + anchor['width'] * w
+    y1 = y + anchor['y'] * h
+    y2 = y1 + anchor['height'] * h
+    return int(x1), int(y1), int(x2), int(y2)
+
+
+def backfill_catalog(catalog_data, root_path):
+    """
+    Add placement records to catalog items that do not have one yet
+
+    Returns:
+        Number of items updated
+    """
+    updated = 0
+    for collection, items in catalog_data.items():
+        kind = collection_kind(collection)
+        for item in items:
+            if 'placement' in item:
+                continue
+            path = os.path.join(root_path, item['image'].replace('\\', '/').lstrip('/'))
+            placement = legacy_placement(path, kind)
+            image = cv2.imread(path, read_flag(placement))
+            if image is None:
+                print(f"Erro: Não foi possível ler a imagem em {path}")
+                continue
+            item['placement'] = garment_placement(image, kind, placement['mask'], placement['anchor'])
+            updated += 1
+    return updated
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Store placement metadata for catalog items that lack it")
+    parser.add_argument('catalog', help="Path of catalog.json")
+    parser.add_argument('--root', default=None, help="Application root (defaults to the catalog's parent directory)")
+    args = parser.parse_args(argv)
+
+    root_path = args.root or os.path.dirname(os.path.dirname(os.path.abspath(args.catalog)))
+    with open(args.catalog, 'r') as f:
+        catalog_data = json.load(f)
+    updated = backfill_catalog(catalog_data, root_path)
+    with open(args.catalog, 'w') as f:
+        json.dump(catalog_data, f, indent=4)
+    print(f"{updated} item(s) updated")
+
+
+if __name__ == '__main__':
+    main()
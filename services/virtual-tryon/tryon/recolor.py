@@ -0,0 +1,90 @@
+import cv2
+import numpy as np
+
+from tryon.compositor import Garment
+
+# Garments with less saturation than this are treated as gray: their hue is meaningless
+MIN_GARMENT_SATURATION = 16
+
+
+def parse_hex_color(color):
+    """
+    BGR tuple of a '#RRGGBB' (or 'RRGGBB') color
+
+    Raises:
+        ValueError: If the string is not a 6-digit hex color
+    """
+    value = color.strip().lstrip('#')
+    if len(value) != 6:
+        raise ValueError(f"Invalid hex color: {color!r}")
+    r, g, b = (int(value[i:i + 2], 16) for i in (0, 2, 4))
+    return b, g, r
+
+
+def normalize_hex_color(color):
+    """
+    Canonical '#rrggbb' form of a hex color, used in cache keys
+    """
+    b, g, r = parse_hex_color(color)
+    return f'#{r:02x}{g:02x}{b:02x}'
+
+
+def recolor_lut(hsv, mask, target_bgr):
+    """
+    Per-channel lookup table that moves a garment's colors to a target color
+
+    The garment's median hue, saturation and value under the mask are moved
+    onto the target's: hue is rotated, saturation shifted and value scaled,
+    so folds and shading keep their relative contrast.
+
+    Args:
+        hsv: Garment image in OpenCV HSV (hue 0-179)
+        mask: Foreground mask, 255 on the garment
+        target_bgr: Target color as a BGR tuple
+
+    Returns:
+        uint8 array of shape (256, 1, 3) for cv2.LUT
+    """
+    target = cv2.cvtColor(np.uint8([[target_bgr]]), cv2.COLOR_BGR2HSV)[0, 0].astype(np.int32)
+    pixels = hsv[mask > 0]
+    if len(pixels) == 0:
+        pixels = hsv.reshape(-1, 3)
+    hue, saturation, value = (int(v) for v in np.median(pixels, axis=0))
+
+    levels = np.arange(256, dtype=np.int32)
+    if saturation < MIN_GARMENT_SATURATION:
+        # A gray garment has no hue of its own to rotate: paint every pixel with the target hue
+        hue_lut = np.full(256, target[0], dtype=np.int32)
+    else:
+        hue_lut = (levels + target[0] - hue) % 180
+    saturation_lut = np.clip(levels + target[1] - saturation, 0, 255)
+    value_lut = np.clip(levels * (target[2] / max(value, 1)), 0, 255)
+    return np.stack([hue_lut, saturation_lut, value_lut], axis=1).astype(np.uint8).reshape(256, 1, 3)
+
+
+def recolor_image(image, mask, color):
+    """
+    Recolor the masked part of a BGR image in a single LUT pass
+
+    Args:
+        image: BGR garment image
+        mask: Foreground mask, 255 on the garment
+        color: Target color, '#RRGGBB'
+
+    Returns:
+        New BGR image; pixels outside the mask are left unchanged
+    """
+    hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+    recolored = cv2.cvtColor(cv2.LUT(hsv, recolor_lut(hsv, mask, parse_hex_color(color))), cv2.COLOR_HSV2BGR)
+    result = image.copy()
+    cv2.copyTo(recolored, mask, result)
+    return result
+
+
+def recolor_garment(garment, color):
+    """
+    A copy of the garment in another color, sharing its masks and placement
+    """
+    recolored = recolor_image(garment.image, garment.mask, color)
+    return Garment(garment.path, recolored, garment.mask, garment.mask_inv, feather=garment.feather,
+                   anchor=garment.anchor, kind=garment.kind, z=garment.z, warp=garment.warp)
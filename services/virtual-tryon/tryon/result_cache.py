@@ -0,0 +1,216 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict, namedtuple
+
+# Default memory budget for encoded try-on results
+DEFAULT_MEMORY_BYTES = 32 * 1024 * 1024
+# Default budget for the on-disk tier
+DEFAULT_DISK_BYTES = 256 * 1024 * 1024
+
+ResultKey = namedtuple('ResultKey', ['shirt_id', 'pant_id', 'digest', 'extension'])
+
+
+def result_key(frame_bytes, shirt_id, pant_id, garment_mtimes=(), variant='', extension='.jpg'):
+    """
+    Content address of a rendered try-on
+
+    The digest covers the uploaded image bytes, both garment ids, the mtimes
+    of the garment files and any render options in `variant`, so a garment
+    re-uploaded under the same id never serves a stale result.
+    """
+    digest = hashlib.sha256(frame_bytes)
+    digest.update(f'|{shirt_id}|{pant_id}|{garment_mtimes!r}|{variant}'.encode())
+    return ResultKey(str(shirt_id), str(pant_id), digest.hexdigest(), extension)
+
+
+class TryOnResultCache:
+    """
+    Two-tier cache of encoded try-on results
+
+    Recent results live in an in-memory LRU bounded by bytes; every result is
+    also written under `directory` so it survives restarts and is shared by
+    the worker processes. Files are named s{shirt}_p{pant}_{digest}{ext}, which
+    lets a catalog change evict every result of one garment by name alone.
+    """
+
+    def __init__(self, directory=None, max_memory_bytes=DEFAULT_MEMORY_BYTES, max_disk_bytes=DEFAULT_DISK_BYTES):
+        self.directory = directory
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._disk_bytes = None
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """
+        Return the encoded result for a ResultKey, or None on a miss
+        """
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+                return data
+
+        data = self._read(key)
+        with self._lock:
+            if data is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._remember(key, data)
+        return data
+
+    def put(self, key, data):
+        with self._lock:
+            self._remember(key, data)
+        self._write(key, data)
+
+    def invalidate(self, collection, item_id):
+        """
+        Evict every result rendered with a catalog item
+
+        Args:
+            collection: 'shirts' or 'pants'
+            item_id: Catalog item id
+
+        Returns:
+            Number of memory entries and files removed
+        """
+        field = {'shirts': 'shirt_id', 'pants': 'pant_id'}.get(collection)
+        if field is None:
+            return 0
+        item_id = str(item_id)
+
+        removed = 0
+        with self._lock:
+            for key in [key for key in self._entries if getattr(key, field) == item_id]:
+                self._bytes -= len(self._entries.pop(key))
+                removed += 1
+
+        for entry in self._scan():
+            key = parse_filename(entry.name)
+            if key is not None and getattr(key, field) == item_id:
+                removed += self._unlink(entry.path, entry.stat().st_size)
+        return removed
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+        for entry in self._scan():
+            self._unlink(entry.path, entry.stat().st_size)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_memory_bytes': self.max_memory_bytes,
+                'disk_bytes': self._disk_bytes,
+                'max_disk_bytes': self.max_disk_bytes,
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': round((self.memory_hits + self.disk_hits) / lookups, 3) if lookups else 0.0,
+            }
+
+    def _remember(self, key, data):
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= len(previous)
+        self._entries[key] = data
+        self._bytes += len(data)
+        while self._bytes > self.max_memory_bytes and len(self._entries) > 1:
+            _, oldest = self._entries.popitem(last=False)
+            self._bytes -= len(oldest)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f's{key.shirt_id}_p{key.pant_id}_{key.digest}{key.extension}')
+
+    def _read(self, key):
+        if self.directory is None:
+            return None
+        try:
+            with open(self._path(key), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _write(self, key, data):
+        if self.directory is None:
+            return
+        path = self._path(key)
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Erro ao gravar resultado em cache: {str(e)}")
+            return
+
+        with self._lock:
+            if self._disk_bytes is not None:
+                self._disk_bytes += len(data)
+        if self._disk_usage() > self.max_disk_bytes:
+            self._prune_disk()
+
+    def _scan(self):
+        if self.directory is None:
+            return []
+        try:
+            return [entry for entry in os.scandir(self.directory)
+                    if entry.is_file() and parse_filename(entry.name) is not None]
+        except OSError:
+            return []
+
+    def _disk_usage(self):
+        with self._lock:
+            if self._disk_bytes is not None:
+                return self._disk_bytes
+        usage = sum(entry.stat().st_size for entry in self._scan())
+        with self._lock:
+            self._disk_bytes = usage
+        return usage
+
+    def _prune_disk(self):
+        """
+        Delete the least recently written results until the disk tier fits its budget
+        """
+        entries = sorted(self._scan(), key=lambda entry: entry.stat().st_mtime)
+        usage = sum(entry.stat().st_size for entry in entries)
+        with self._lock:
+            self._disk_bytes = usage
+        for entry in entries:
+            if self._disk_usage() <= self.max_disk_bytes:
+                break
+            self._unlink(entry.path, entry.stat().st_size)
+
+    def _unlink(self, path, size):
+        try:
+            os.remove(path)
+        except OSError:
+            return 0
+        with self._lock:
+            if self._disk_bytes is not None:
+                self._disk_bytes -= size
+        return 1
+
+
+def parse_filename(name):
+    """
+    Recover the ResultKey from a cache file name, or None for foreign files
+    """
+    stem, extension = os.path.splitext(name)
+    parts = stem.split('_')
+    if len(parts) != 3 or not parts[0].startswith('s') or not parts[1].startswith('p') or len(parts[2]) != 64:
+        return None
+    return ResultKey(parts[0][1:], parts[1][1:], parts[2], extension)
@@ -0,0 +1,232 @@
+import threading
+import time
+import uuid
+from collections import deque
+
+import cv2
+import numpy as np
+
+from tryon.assets import DEFAULT_SIZE_BUCKET, ScaledGarmentCache
+from tryon.compositor import render_tryon
+from tryon.detection import DEFAULT_DETECT_MAX_SIDE
+from tryon.governor import DEFAULT_TARGET_FPS, FrameGovernor
+from tryon.tracking import DEFAULT_DETECT_INTERVAL, FaceTracker
+
+# Streaming sessions a single worker process accepts at once
+DEFAULT_MAX_SESSIONS = 8
+# Sessions without frames for this long are closed to free their slot
+DEFAULT_IDLE_TIMEOUT = 60
+DEFAULT_JPEG_QUALITY = 80
+# Window, in seconds, over which the session FPS is measured
+FPS_WINDOW = 5.0
+
+
+class SessionLimitError(Exception):
+    """
+    Raised when a worker already runs its maximum number of sessions
+    """
+
+
+class TryOnSession:
+    """
+    State kept between the frames of one streaming try-on
+
+    Holds the face tracker and the scaled garment cache, renders one frame at
+    a time and keeps the latest composited JPEG for MJPEG viewers. A frame
+    that arrives while the previous one is still rendering is dropped rather
+    than queued, so a slow server never builds up latency. A FrameGovernor
+    trades detection interval, output resolution and JPEG quality to keep
+    each frame within the target frame rate.
+    """
+
+    def __init__(self, session_id, shirt, pant, detect_interval=DEFAULT_DETECT_INTERVAL,
+                 detect_max_side=DEFAULT_DETECT_MAX_SIDE, size_bucket=DEFAULT_SIZE_BUCKET,
+                 blur=True, jpeg_quality=DEFAULT_JPEG_QUALITY, target_fps=DEFAULT_TARGET_FPS, adaptive=True,
+                 layers=()):
+        self.session_id = session_id
+        self.shirt = shirt
+        self.pant = pant
+        self.layers = list(layers)
+        self.blur = blur
+        self.governor = FrameGovernor(target_fps=target_fps, detect_interval=detect_interval,
+                                      jpeg_quality=jpeg_quality, adaptive=adaptive)
+        self.tracker = FaceTracker(detect_interval=detect_interval, detect_max_side=detect_max_side)
+        self.scaled_cache = ScaledGarmentCache(bucket=size_bucket)
+        self.created_at = time.time()
+        self.last_activity = self.created_at
+        self.frames_received = 0
+        self.frames_rendered = 0
+        self.frames_dropped = 0
+        self.render_seconds = 0.0
+        self.closed = False
+        self._busy = threading.Lock()
+        self._latest = threading.Condition()
+        self._latest_frame = None
+        self._latest_seq = 0
+        self._rendered_at = deque()
+
+    def set_garments(self, shirt=None, pant=None, layers=None):
+        if shirt is not None:
+            self.shirt = shirt
+        if pant is not None:
+            self.pant = pant
+        if layers is not None:
+            self.layers = list(layers)
+
+    def process(self, frame_bytes):
+        """
+        Composite one client frame
+
+        Returns:
+            The composited JPEG bytes, or None if the frame was dropped
+
+        Raises:
+            ValueError: If the bytes are not a decodable image
+        """
+        self.frames_received += 1
+        self.last_activity = time.time()
+        if not self._busy.acquire(blocking=False):
+            self.frames_dropped += 1
+            return None
+
+        try:
+            started = time.perf_counter()
+            governor = self.governor
+            governor.begin_frame()
+            with governor.stage('decode'):
+                img = cv2.imdecode(np.frombuffer(frame_bytes, np.uint8), cv2.IMREAD_COLOR)
+            if img is None:
+                raise ValueError("Could not decode frame")
+
+            # Tracking runs at full resolution so output scale changes do not disturb it
+            self.tracker.detect_interval = governor.detect_interval
+            with governor.stage('detect'):
+                faces = self.tracker.update(img)
+            with governor.stage('composite'):
+                img = governor.resize(img)
+                render_tryon(img, self.shirt, self.pant, faces=governor.scale_boxes(faces),
+                             blur=self.blur, scaled_cache=self.scaled_cache, layers=self.layers)
+            with governor.stage('encode'):
+                ok, encoded = cv2.imencode('.jpg', img, [cv2.IMWRITE_JPEG_QUALITY, governor.jpeg_quality])
+            if not ok:
+                raise ValueError("Could not encode frame")
+            jpeg = encoded.tobytes()
+            governor.end_frame()
+
+            finished = time.perf_counter()
+            self.render_seconds += finished - started
+            self.frames_rendered += 1
+            self._rendered_at.append(finished)
+        finally:
+            self._busy.release()
+
+        with self._latest:
+            self._latest_frame = jpeg
+            self._latest_seq += 1
+            self._latest.notify_all()
+        return jpeg
+
+    def wait_frame(self, after_seq=0, timeout=None):
+        """
+        Block until a frame newer than after_seq is available
+
+        Returns:
+            (seq, jpeg), with jpeg None on timeout or when the session closes
+        """
+        with self._latest:
+            self._latest.wait_for(lambda: self._latest_seq > after_seq or self.closed, timeout)
+            if self._latest_seq > after_seq:
+                return self._latest_seq, self._latest_frame
+            return self._latest_seq, None
+
+    def close(self):
+        with self._latest:
+            self.closed = True
+            self._latest.notify_all()
+
+    def fps(self):
+        now = time.perf_counter()
+        while self._rendered_at and now - self._rendered_at[0] > FPS_WINDOW:
+            self._rendered_at.popleft()
+        return len(self._rendered_at) / FPS_WINDOW
+
+    def stats(self):
+        rendered = self.frames_rendered
+        return {
+            'session_id': self.session_id,
+            'age_seconds': round(time.time() - self.created_at, 1),
+            'frames_received': self.frames_received,
+            'frames_rendered': rendered,
+            'frames_dropped': self.frames_dropped,
+            'fps': round(self.fps(), 2),
+            'avg_render_ms': round(self.render_seconds / rendered * 1000, 2) if rendered else 0.0,
+            'tracker': self.tracker.stats(),
+            'scaled_cache': self.scaled_cache.stats(),
+            'governor': self.governor.stats(),
+        }
+
+
+class SessionManager:
+    """
+    Streaming sessions of one worker process, with an admission limit
+    """
+
+    def __init__(self, max_sessions=DEFAULT_MAX_SESSIONS, idle_timeout=DEFAULT_IDLE_TIMEOUT):
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.rejected = 0
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def create(self, shirt, pant, **options):
+        """
+        Open a new session
+
+        Raises:
+            SessionLimitError: If the worker is already at max_sessions
+        """
+        self.expire_idle()
+        with self._lock:
+            if len(self._sessions) >= self.max_sessions:
+                self.rejected += 1
+                raise SessionLimitError(f"Worker already runs {self.max_sessions} sessions")
+            session = TryOnSession(uuid.uuid4().hex, shirt, pant, **options)
+            self._sessions[session.session_id] = session
+        return session
+
+    def get(self, session_id):
+        # Abandoned sessions give their slot back on any lookup, not only when a new one opens
+        self.expire_idle()
+        with self._lock:
+            return self._sessions.get(session_id)
+
+    def close(self, session_id):
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+        if session is not None:
+            session.close()
+        return session
+
+    def expire_idle(self):
+        now = time.time()
+        with self._lock:
+            expired = [s for s in self._sessions.values() if now - s.last_activity > self.idle_timeout]
+            for session in expired:
+                del self._sessions[session.session_id]
+        for session in expired:
+            session.close()
+        return len(expired)
+
+    def stats(self):
+        self.expire_idle()
+        with self._lock:
+            active = len(self._sessions)
+        return {
+            'active': active,
+            'max_sessions': self.max_sessions,
+            'rejected': self.rejected,
+        }
+
+
+# Sessions served by this process
+session_manager = SessionManager()
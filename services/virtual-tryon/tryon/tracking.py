@@ -0,0 +1,153 @@
+import cv2
+import numpy as np
+
+from tryon.detection import DEFAULT_DETECT_MAX_SIDE, detect_faces_gray
+
+# Run the cascade every N frames by default
+DEFAULT_DETECT_INTERVAL = 5
+# Template match score below which the track is considered lost
+DEFAULT_MIN_CONFIDENCE = 0.6
+
+
+class BoxSmoother:
+    """
+    Constant-velocity Kalman filter over a face box (x, y, w, h)
+
+    Removes the frame-to-frame jitter of the cascade and of the template
+    tracker, which otherwise makes the garment overlay shake.
+    """
+
+    def __init__(self, process_noise=1e-2, measurement_noise=1e-1):
+        kalman = cv2.KalmanFilter(8, 4)
+        kalman.transitionMatrix = np.eye(8, dtype=np.float32)
+        for i in range(4):
+            kalman.transitionMatrix[i, i + 4] = 1.0
+        kalman.measurementMatrix = np.eye(4, 8, dtype=np.float32)
+        kalman.processNoiseCov = np.eye(8, dtype=np.float32) * process_noise
+        kalman.measurementNoiseCov = np.eye(4, dtype=np.float32) * measurement_noise
+        self._kalman = kalman
+        self._initialized = False
+
+    def reset(self):
+        self._initialized = False
+
+    def update(self, box):
+        """
+        Feed a measured box and return the smoothed box as integers
+        """
+        measurement = np.array(box, dtype=np.float32).reshape(4, 1)
+        if not self._initialized:
+            self._kalman.statePre = np.vstack([measurement, np.zeros((4, 1), np.float32)])
+            self._kalman.statePost = self._kalman.statePre.copy()
+            self._kalman.errorCovPost = np.eye(8, dtype=np.float32)
+            self._initialized = True
+            return tuple(int(v) for v in box)
+
+        self._kalman.predict()
+        state = self._kalman.correct(measurement)
+        return tuple(int(round(float(v))) for v in state[:4, 0])
+
+
+class FaceTracker:
+    """
+    Follow one face across frames, running full detection only now and then
+
+    The cascade runs every `detect_interval` frames, or as soon as the
+    template match in between scores below `min_confidence`. Other frames
+    locate the face by matching the last detected face patch inside a small
+    search window around its previous position, and every box goes through a
+    BoxSmoother. An interval of 1 disables tracking.
+    """
+
+    def __init__(self, detect_interval=DEFAULT_DETECT_INTERVAL,
+                 min_confidence=DEFAULT_MIN_CONFIDENCE, search_margin=0.5, smooth=True,
+                 detect_max_side=DEFAULT_DETECT_MAX_SIDE):
+        self.detect_interval = max(1, int(detect_interval))
+        self.detect_max_side = detect_max_side
+        self.min_confidence = min_confidence
+        self.search_margin = search_margin
+        self.smoother = BoxSmoother() if smooth else None
+        self.frames = 0
+        self.detections = 0
+        self.tracked = 0
+        self.confidence = 0.0
+        self._template = None
+        self._box = None
+        self._since_detection = 0
+
+    def reset(self):
+        self._template = None
+        self._box = None
+        self._since_detection = 0
+        if self.smoother is not None:
+            self.smoother.reset()
+
+    def update(self, img):
+        """
+        Locate the face in a BGR frame
+
+        Returns:
+            A list with the face box (x, y, w, h), or an empty list
+        """
+        self.frames += 1
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+
+        box = None
+        if self._box is not None and self._since_detection < self.detect_interval - 1:
+            box = self._track(gray)
+            if box is not None:
+                self.tracked += 1
+                self._since_detection += 1
+
+        if box is None:
+            box = self._detect(gray)
+            if box is None:
+                self.reset()
+                return []
+
+        if self.smoother is not None:
+            box = self.smoother.update(box)
+        self._box = box
+        return [box]
+
+    def stats(self):
+        return {
+            'frames': self.frames,
+            'detections': self.detections,
+            'tracked': self.tracked,
+            'detect_ratio': round(self.detections / self.frames, 3) if self.frames else 0.0,
+            'detect_interval': self.detect_interval,
+            'confidence': round(self.confidence, 3),
+        }
+
+    def _detect(self, gray):
+        self.detections += 1
+        self._since_detection = 0
+        faces = detect_faces_gray(gray, max_side=self.detect_max_side)
+        if len(faces) == 0:
+            return None
+        x, y, w, h = (int(v) for v in faces[0])
+        self._template = gray[y:y+h, x:x+w].copy()
+        self.confidence = 1.0
+        return x, y, w, h
+
+    def _track(self, gray):
+        x, y = self._box[:2]
+        th, tw = self._template.shape[:2]
+        margin_x = int(tw * self.search_margin)
+        margin_y = int(th * self.search_margin)
+
+        sx1 = max(0, x - margin_x)
+        sy1 = max(0, y - margin_y)
+        sx2 = min(gray.shape[1], x + tw + margin_x)
+        sy2 = min(gray.shape[0], y + th + margin_y)
+        window = gray[sy1:sy2, sx1:sx2]
+        if window.shape[0] < th or window.shape[1] < tw:
+            return None
+
+        scores = cv2.matchTemplate(window, self._template, cv2.TM_CCOEFF_NORMED)
+        _, best, _, location = cv2.minMaxLoc(scores)
+        self.confidence = float(best)
+        if best < self.min_confidence:
+            return None
+        return sx1 + location[0], sy1 + location[1], tw, th
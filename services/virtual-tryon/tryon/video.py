@@ -0,0 +1,244 @@
+"""
+Offline try-on for recorded videos
+
+The video is split into contiguous frame ranges that are rendered in a
+process pool, each with its own face tracker and scaled garment cache, and
+written back in order as soon as each range is done.
+
+    python -m tryon.video input.mp4 output.mp4 --shirt 2 --pant 1 --workers 4
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+
+from tryon.assets import ScaledGarmentCache, garment_cache
+from tryon.compositor import render_tryon
+from tryon.derivatives import derivative_path
+from tryon.detection import SERVICE_ROOT
+from tryon.placement import collection_kind
+from tryon.tracking import DEFAULT_DETECT_INTERVAL, FaceTracker
+
+DEFAULT_FOURCC = 'mp4v'
+# Chunk files use Motion JPEG: cheap to decode again when they are joined
+CHUNK_FOURCC = 'MJPG'
+# Chunks per worker, so a slow chunk does not leave the other workers idle at the end
+CHUNKS_PER_WORKER = 2
+DEFAULT_VIDEO_WORKERS = os.cpu_count() or 1
+
+
+def video_info(path):
+    """
+    Frame count, frame rate and size of a video file
+
+    Raises:
+        IOError: If the file cannot be opened as a video
+    """
+    cap = cv2.VideoCapture(path)
+    try:
+        if not cap.isOpened():
+            raise IOError(f"Could not open video {path}")
+        return {
+            'frames': int(cap.get(cv2.CAP_PROP_FRAME_COUNT)),
+            'fps': cap.get(cv2.CAP_PROP_FPS) or 25.0,
+            'width': int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            'height': int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        }
+    finally:
+        cap.release()
+
+
+def chunk_ranges(frames, chunks):
+    """
+    Split [0, frames) into at most `chunks` contiguous (start, stop) ranges
+
+    `frames` is the container's estimate, which can be short (webm, mkv), so
+    the last range has stop None: it reads until the video ends.
+    """
+    chunks = max(1, min(chunks, frames))
+    bounds = [frames * index // chunks for index in range(chunks + 1)]
+    ranges = [(start, stop) for start, stop in zip(bounds, bounds[1:]) if stop > start]
+    if not ranges:
+        return [(0, None)]
+    ranges[-1] = (ranges[-1][0], None)
+    return ranges
+
+
+def catalog_garment(catalog_data, collection, item_id, root_path=SERVICE_ROOT):
+    """
+    What a worker needs to load a catalog garment, as a picklable dict
+
+    Falls back to the first item of the collection, like the web routes.
+    """
+    items = catalog_data[collection]
+    item = next((entry for entry in items if entry['id'] == str(item_id)), items[0])
+    return {
+        'collection': collection,
+        'id': item['id'],
+        'path': os.path.join(root_path, item['image'].replace('\\', '/').lstrip('/')),
+        'kind': collection_kind(collection),
+        'root_path': root_path,
+        'placement': item.get('placement'),
+        'mask_path': derivative_path(item, 'mask', root_path),
+    }
+
+
+def _load(spec):
+    return garment_cache.get(spec['collection'], spec['id'], spec['path'], spec['kind'],
+                             spec['root_path'], spec['placement'], mask_path=spec.get('mask_path'))
+
+
+def render_chunk(job):
+    """
+    Render one frame range of a video into its own chunk file
+
+    A range whose stop is None runs until the video ends.
+
+    Runs in a worker process. Garments come from that process's garment
+    cache, so a worker that renders several chunks decodes them only once.
+
+    Returns:
+        (chunk path, frames written)
+    """
+    cap = cv2.VideoCapture(job['input'])
+    cap.set(cv2.CAP_PROP_POS_FRAMES, job['start'])
+    writer = cv2.VideoWriter(job['output'], cv2.VideoWriter_fourcc(*CHUNK_FOURCC), job['fps'],
+                             (job['width'], job['height']))
+    shirt, pant = _load(job['shirt']), _load(job['pant'])
+    tracker = FaceTracker(detect_interval=job['detect_interval'])
+    scaled_cache = ScaledGarmentCache()
+
+    written = 0
+    try:
+        while job['stop'] is None or job['start'] + written < job['stop']:
+            ret, img = cap.read()
+            if not ret:
+                break
+            render_tryon(img, shirt, pant, faces=tracker.update(img), draw_face=job['draw_face'],
+                         blur=job['blur'], scaled_cache=scaled_cache)
+            writer.write(img)
+            written += 1
+    finally:
+        cap.release()
+        writer.release()
+    return job['output'], written
+
+
+def append_chunk(writer, path):
+    """
+    Copy the frames of a chunk file into the output writer
+    """
+    cap = cv2.VideoCapture(path)
+    frames = 0
+    try:
+        while True:
+            ret, img = cap.read()
+            if not ret:
+                break
+            writer.write(img)
+            frames += 1
+    finally:
+        cap.release()
+    return frames
+
+
+def render_video(input_path, output_path, shirt, pant, workers=DEFAULT_VIDEO_WORKERS, chunks=None,
+                 detect_interval=DEFAULT_DETECT_INTERVAL, blur=True, draw_face=False, fourcc=DEFAULT_FOURCC):
+    """
+    Render a try-on over a whole video file
+
+    Args:
+        input_path: Source video
+        output_path: Video written with the composited frames
+        shirt: Shirt spec from catalog_garment
+        pant: Pant spec from catalog_garment
+        workers: Worker processes; 1 renders in this process
+        chunks: Frame ranges to split the video into; CHUNKS_PER_WORKER per worker when None
+        detect_interval: Full detection interval of each chunk's tracker
+        blur: Whether to blur the background outside the face
+        draw_face: Whether to draw the face rectangle
+        fourcc: Codec of the output video
+
+    Returns:
+        Dict with the frames written, the elapsed seconds and the frames per second
+    """
+    started = time.perf_counter()
+    info = video_info(input_path)
+    ranges = chunk_ranges(info['frames'], chunks or max(1, workers) * CHUNKS_PER_WORKER)
+    tmp_dir = tempfile.mkdtemp(prefix='tryon-video-')
+    jobs = [{
+        'input': input_path,
+        'output': os.path.join(tmp_dir, f'chunk_{index:04d}.avi'),
+        'start': start,
+        'stop': stop,
+        'fps': info['fps'],
+        'width': info['width'],
+        'height': info['height'],
+        'shirt': shirt,
+        'pant': pant,
+        'detect_interval': detect_interval,
+        'blur': blur,
+        'draw_face': draw_face,
+    } for index, (start, stop) in enumerate(ranges)]
+
+    writer = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*fourcc), info['fps'],
+                             (info['width'], info['height']))
+    frames = 0
+    try:
+        if workers <= 1:
+            results = map(render_chunk, jobs)
+            frames = sum(append_chunk(writer, path) for path, _ in results)
+        else:
+            # spawn: forking a threaded server process can deadlock in the children
+            context = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+                # map() yields in submission order, so chunks are joined while later ones still render
+                for path, _ in executor.map(render_chunk, jobs):
+                    frames += append_chunk(writer, path)
+    finally:
+        writer.release()
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    elapsed = time.perf_counter() - started
+    return {
+        'frames': frames,
+        'chunks': len(jobs),
+        'workers': workers,
+        'seconds': round(elapsed, 3),
+        'fps': round(frames / elapsed, 2) if elapsed else 0.0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render a try-on over a recorded video")
+    parser.add_argument('input', help="Source video")
+    parser.add_argument('output', help="Output video")
+    parser.add_argument('--shirt', default='1', help="Shirt id in the catalog")
+    parser.add_argument('--pant', default='1', help="Pant id in the catalog")
+    parser.add_argument('--catalog', default=os.path.join(SERVICE_ROOT, 'static', 'catalog.json'))
+    parser.add_argument('--workers', type=int, default=DEFAULT_VIDEO_WORKERS)
+    parser.add_argument('--chunks', type=int, default=None)
+    parser.add_argument('--detect-interval', type=int, default=DEFAULT_DETECT_INTERVAL)
+    parser.add_argument('--no-blur', action='store_true')
+    args = parser.parse_args(argv)
+
+    with open(args.catalog, 'r') as f:
+        catalog_data = json.load(f)
+    root_path = os.path.dirname(os.path.dirname(os.path.abspath(args.catalog)))
+    result = render_video(args.input, args.output,
+                          catalog_garment(catalog_data, 'shirts', args.shirt, root_path),
+                          catalog_garment(catalog_data, 'pants', args.pant, root_path),
+                          workers=args.workers, chunks=args.chunks,
+                          detect_interval=args.detect_interval, blur=not args.no_blur)
+    print(f"{result['frames']} frames in {result['seconds']} s ({result['fps']} fps, "
+          f"{result['chunks']} chunks on {result['workers']} workers)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,209 @@
+"""
+Mesh warps that fit a garment to the body instead of stretching it
+
+A warp is a list of control rows, top to bottom. Each row takes a row of
+the garment image (`source_y`, a fraction of its height) to a row of the
+frame rectangle (`y`, a fraction of its height) where the garment spans
+from `left` to `right` (fractions of its width). Between control rows the
+garment is interpolated linearly, so a few rows at the shoulders, waist
+and hips taper or flare it.
+
+The cv2.remap maps of a warp depend only on the control rows, the source
+size and the target size, so they are computed once and cached. Target
+sizes are already bucketed by ScaledGarmentCache: a fitted garment costs
+one remap per size bucket, and frames served from that cache cost the
+same as with a plain resize.
+"""
+import json
+import threading
+import weakref
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+# Warp maps kept per process; each holds a few bytes per target pixel
+DEFAULT_MAX_WARP_MAPS = 64
+
+# Control rows for each garment kind when an upload asks for the default fit
+DEFAULT_WARPS = {
+    'shirt': [
+        {'source_y': 0.0, 'y': 0.0, 'left': 0.08, 'right': 0.92},
+        {'source_y': 0.25, 'y': 0.22, 'left': 0.0, 'right': 1.0},
+        {'source_y': 0.7, 'y': 0.7, 'left': 0.1, 'right': 0.9},
+        {'source_y': 1.0, 'y': 1.0, 'left': 0.06, 'right': 0.94},
+    ],
+    'jacket': [
+        {'source_y': 0.0, 'y': 0.0, 'left': 0.06, 'right': 0.94},
+        {'source_y': 0.25, 'y': 0.2, 'left': 0.0, 'right': 1.0},
+        {'source_y': 1.0, 'y': 1.0, 'left': 0.04, 'right': 0.96},
+    ],
+    'pant': [
+        {'source_y': 0.0, 'y': 0.0, 'left': 0.05, 'right': 0.95},
+        {'source_y': 0.3, 'y': 0.3, 'left': 0.0, 'right': 1.0},
+        {'source_y': 1.0, 'y': 1.0, 'left': 0.08, 'right': 0.92},
+    ],
+}
+
+
+def resolve_warp(value, kind):
+    """
+    Control rows for a warp given in an upload or a placement record
+
+    Args:
+        value: List of control rows, a JSON string of one, or 'default' for
+            the preset of the garment kind
+        kind: Garment kind, e.g. 'shirt'
+
+    Returns:
+        Validated control rows, or None when the kind has no preset
+
+    Raises:
+        ValueError: If the control rows are malformed
+    """
+    if value == 'default':
+        preset = DEFAULT_WARPS.get(kind)
+        return [dict(row) for row in preset] if preset else None
+    if isinstance(value, str):
+        value = json.loads(value)
+    return validate_warp(value)
+
+
+def validate_warp(rows):
+    """
+    Check and normalize control rows
+
+    `source_y` defaults to `y`. Rows must be sorted top to bottom, cover at
+    least two heights and keep `left` before `right`.
+
+    Raises:
+        ValueError: If the control rows are malformed
+    """
+    if not isinstance(rows, list) or len(rows) < 2:
+        raise ValueError("A warp needs at least two control rows")
+
+    normalized = []
+    for row in rows:
+        try:
+            y = float(row['y'])
+            source_y = float(row.get('source_y', y))
+            left, right = float(row['left']), float(row['right'])
+        except (KeyError, TypeError, ValueError, AttributeError):
+            raise ValueError(f"Invalid control row: {row!r}")
+        if not (0.0 <= y <= 1.0 and 0.0 <= source_y <= 1.0 and left < right):
+            raise ValueError(f"Control row out of range: {row!r}")
+        normalized.append({'source_y': source_y, 'y': y, 'left': left, 'right': right})
+
+    if any(b['y'] <= a['y'] or b['source_y'] < a['source_y'] for a, b in zip(normalized, normalized[1:])):
+        raise ValueError("Control rows must go from top to bottom")
+    return normalized
+
+
+def warp_maps(rows, source_size, target_size):
+    """
+    cv2.remap maps that warp a source image into a target rectangle
+
+    Args:
+        rows: Validated control rows
+        source_size: (width, height) of the source image
+        target_size: (width, height) of the warped image
+
+    Returns:
+        (map1, map2) in the fixed-point format of cv2.convertMaps. Target
+        pixels outside the garment map outside the source, so remap with a
+        constant border leaves them transparent.
+    """
+    sw, sh = source_size
+    tw, th = target_size
+    ys = [row['y'] for row in rows]
+
+    # Sample at pixel centres
+    ty = (np.arange(th, dtype=np.float32) + 0.5) / th
+    tx = np.arange(tw, dtype=np.float32) + 0.5
+    # Every target row lies within the garment, so its source row is clamped inside the image
+    sy = np.clip(np.interp(ty, ys, [row['source_y'] for row in rows]) * sh - 0.5, 0, sh - 1)
+    left = np.interp(ty, ys, [row['left'] for row in rows]) * tw
+    right = np.interp(ty, ys, [row['right'] for row in rows]) * tw
+
+    map_x = ((tx[None, :] - left[:, None]) / (right - left)[:, None] * sw - 0.5).astype(np.float32)
+    map_y = np.repeat(sy.astype(np.float32)[:, None], tw, axis=1)
+    return cv2.convertMaps(map_x, map_y, cv2.CV_16SC2)
+
+
+class WarpMapCache:
+    """
+    Process-wide LRU of warp maps, keyed by control rows and sizes
+
+    Shared by every session, since garments of the same catalog image and
+    size bucket need the same maps.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_WARP_MAPS):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, rows, source_size, target_size):
+        key = (json.dumps(rows, sort_keys=True), tuple(source_size), tuple(target_size))
+        with self._lock:
+            maps = self._entries.get(key)
+            if maps is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return maps
+            self.misses += 1
+
+        maps = warp_maps(rows, source_size, target_size)
+        with self._lock:
+            self._entries[key] = maps
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return maps
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': sum(map1.nbytes + map2.nbytes for map1, map2 in self._entries.values()),
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+
+warp_map_cache = WarpMapCache()
+
+# Halved copies of each garment, built on first use and dropped with the garment
+_levels = weakref.WeakKeyDictionary()
+_levels_lock = threading.Lock()
+
+
+def source_level(garment, width, height):
+    """
+    The smallest halving of the garment's BGRA image still at least as large
+    as the target, so bilinear remapping never skips source pixels
+    """
+    with _levels_lock:
+        levels = _levels.setdefault(garment, [garment.bgra])
+        level = levels[0]
+        for index in range(1, 8):
+            if level.shape[1] < 2 * width or level.shape[0] < 2 * height:
+                break
+            if index == len(levels):
+                levels.append(cv2.pyrDown(level))
+            level = levels[index]
+        return level
+
+
+def warp_garment(garment, width, height, cache=warp_map_cache):
+    """
+    Fit the garment's BGRA image into a width x height rectangle along its warp
+    """
+    level = source_level(garment, width, height)
+    map1, map2 = cache.get(garment.warp, (level.shape[1], level.shape[0]), (width, height))
+    return cv2.remap(level, map1, map2, cv2.INTER_LINEAR, borderMode=cv2.BORDER_CONSTANT, borderValue=0)